@@ -39,6 +39,7 @@ from flask_limiter.util import get_remote_address
 from flask_socketio import SocketIO
 
 from helpers import register_error_handlers, logger
+from utils.json_provider import MongoJSONProvider
 import db  # noqa: F401  # Ensures indexes are created on import
 
 
@@ -66,6 +67,8 @@ app = Flask(
     static_folder=os.path.join(os.path.dirname(__file__), ".."),
     static_url_path="",
 )
+# Encodes ObjectId/datetime/Decimal128 natively (orjson when available)
+app.json = MongoJSONProvider(app)
 app_env = os.environ.get("APP_ENV") or os.environ.get("FLASK_ENV") or "development"
 app_env = app_env.lower()
 testing_mode = is_truthy(os.environ.get("TESTING_MODE", "0"))
@@ -202,6 +205,15 @@ app.register_blueprint(
 )
 app.register_blueprint(payments_bp, url_prefix="/api/v1/payments", name="payments_v1")
 
+# Warm the in-memory menu search index so the first search is fast
+try:
+    from db import menu_col
+    from routes.menu import build_public_menu_query, menu_search_index
+
+    menu_search_index.rebuild(menu_col, build_public_menu_query())
+except Exception as e:
+    logger.warning("Menu search index warm-up failed; will build lazily: %s", e)
+
 # Make socketio available to blueprints via app config
 app.config["socketio"] = socketio
 
@@ -210,6 +222,11 @@ from routes.realtime import register_socketio_events
 
 register_socketio_events(socketio)
 
+# ─── Background Jobs (emails, socket emits) ─────────
+from jobs import job_queue
+
+job_queue.init_app(app)
+
 # ─── Apply Rate Limits (Anti-Brute-Force, Anti-Spam) ───────────────────────
 try:
     # Auth endpoints - brute force protection
@@ -0,0 +1,179 @@
+# ============================================
+# FLAVOUR FLEET — Order Archive
+# ============================================
+# Delivered and cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS move
+# from ``orders`` to ``orders_archive`` in batches, keeping the hot
+# collection (and its indexes) sized to the orders still in flight.
+#
+# Each batch is copied with idempotent upserts before it is deleted, so
+# an interrupted run leaves at most duplicates that the next run removes
+# from the hot side. Lookups by order id and user history read both
+# collections; the archive's order count, revenue and status, item and
+# restaurant tallies are kept in a summary document so admin stats and
+# analytics don't scan it.
+#
+#   python backend/manage.py archive-orders
+# ============================================
+
+import os
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReplaceOne
+
+from db import orders_archive_col, orders_col, settings_col
+from utils.logger import logger
+
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_STATUSES = ('delivered', 'cancelled')  # final; never updated again
+ARCHIVE_SUMMARY_KEY = 'orders_archive'
+
+
+def find_order(query, projection=None):
+    """``find_one`` on the hot orders, falling back to the archive."""
+    return (
+        orders_col.find_one(query, projection)
+        or orders_archive_col.find_one(query, projection)
+    )
+
+
+def aggregate_orders(pipeline, match=None):
+    """Run ``pipeline`` over current and archived orders together."""
+    head = [{'$match': match}] if match else []
+    union = {'$unionWith': {'coll': orders_archive_col.name, 'pipeline': head}}
+    return orders_col.aggregate([*head, union, *pipeline])
+
+
+# Per-status, per-item and per-restaurant tallies, as ``{'name', ...}``
+# rows so they can be stored and summed across collections.
+BREAKDOWN_FACETS = {
+    'status': [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}],
+    'items': [
+        {'$unwind': '$items'},
+        {'$group': {
+            '_id': '$items.name',
+            'count': {'$sum': '$items.quantity'},
+            'revenue': {'$sum': {'$multiply': ['$items.price', '$items.quantity']}},
+        }},
+    ],
+    'restaurants': [
+        {'$group': {'_id': '$restaurant', 'orders': {'$sum': 1}, 'revenue': {'$sum': '$total'}}},
+    ],
+}
+
+
+def _breakdowns(collection, facets=None):
+    """Run BREAKDOWN_FACETS (plus ``facets``) over ``collection`` in one pass."""
+    result = next(collection.aggregate([{'$facet': {**BREAKDOWN_FACETS, **(facets or {})}}]))
+    for key in BREAKDOWN_FACETS:
+        result[key] = [{'name': row.pop('_id'), **row} for row in result[key]]
+    return result
+
+
+def _combine(*tables):
+    merged = {}
+    for rows in tables:
+        for row in rows:
+            into = merged.setdefault(row['name'], {'name': row['name']})
+            for field, value in row.items():
+                if field != 'name':
+                    into[field] = into.get(field, 0) + value
+    return list(merged.values())
+
+
+def order_breakdowns():
+    """Status, item and restaurant tallies over current and archived orders.
+
+    Only the hot collection is aggregated; the archive's tallies come from
+    its summary document, which each archive run refreshes.
+    """
+    hot = _breakdowns(orders_col)
+    archived = archive_summary()
+    return {key: _combine(hot[key], archived[key]) for key in BREAKDOWN_FACETS}
+
+
+def archive_summary():
+    """``{'count', 'revenue', 'status', 'items', 'restaurants'}`` of
+    archived orders as of the last run."""
+    doc = settings_col.find_one({'key': ARCHIVE_SUMMARY_KEY}) or {}
+    return {
+        'count': doc.get('count', 0),
+        'revenue': doc.get('revenue', 0),
+        **{key: doc.get(key, []) for key in BREAKDOWN_FACETS},
+    }
+
+
+def refresh_archive_summary():
+    result = _breakdowns(orders_archive_col, {'totals': [
+        {'$group': {'_id': None, 'count': {'$sum': 1}, 'revenue': {'$sum': '$total'}}}
+    ]})
+    totals = result.pop('totals')
+    summary = {
+        'count': totals[0]['count'] if totals else 0,
+        'revenue': round(totals[0]['revenue'], 2) if totals else 0,
+        **result,
+    }
+    settings_col.update_one(
+        {'key': ARCHIVE_SUMMARY_KEY},
+        {'$set': {**summary, 'key': ARCHIVE_SUMMARY_KEY, 'updated_at': datetime.utcnow()}},
+        upsert=True,
+    )
+    return summary
+
+
+def archive_orders(older_than_days=ORDER_ARCHIVE_AFTER_DAYS, batch_size=500):
+    """Move final orders created before the cutoff; returns the number moved.
+
+    Orders whose ``created_at`` is still an ISO string are skipped until
+    ``manage.py migrate-timestamps`` has converted them.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    query = {'status': {'$in': list(ARCHIVE_STATUSES)}, 'created_at': {'$lt': cutoff}}
+    moved = 0
+    while True:
+        docs = list(orders_col.find(query).sort('created_at', 1).limit(batch_size))
+        if not docs:
+            break
+        now = datetime.utcnow()
+        orders_archive_col.bulk_write(
+            [ReplaceOne({'_id': doc['_id']}, {**doc, 'archived_at': now}, upsert=True) for doc in docs],
+            ordered=False,
+        )
+        moved += orders_col.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}}).deleted_count
+        logger.info('Order archive: moved %s orders (%s so far)', len(docs), moved)
+    refresh_archive_summary()
+    return moved
+
+
+# Representative hot-collection reads, timed before and after a run.
+LATENCY_PROBES = {
+    'admin_recent': lambda: list(orders_col.find().sort('created_at', -1).limit(20)),
+    'admin_by_status': lambda: list(
+        orders_col.find({'status': 'preparing'}).sort('created_at', -1).limit(20)
+    ),
+    'admin_status_counts': lambda: list(
+        orders_col.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+    ),
+    'admin_revenue': lambda: list(
+        orders_col.aggregate([{'$group': {'_id': None, 'total': {'$sum': '$total'}}}])
+    ),
+}
+
+
+def hot_collection_report(runs=5):
+    """Document count, data/index size (bytes) and probe latency (best-of ms)."""
+    stats = next(orders_col.aggregate([{'$collStats': {'storageStats': {}}}]))['storageStats']
+    latency = {}
+    for name, probe in LATENCY_PROBES.items():
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            probe()
+            timings.append(time.perf_counter() - start)
+        latency[name] = round(min(timings) * 1000, 2)
+    return {
+        'count': stats.get('count', 0),
+        'size': stats.get('size', 0),
+        'total_index_size': stats.get('totalIndexSize', 0),
+        'latency_ms': latency,
+    }
@@ -0,0 +1,189 @@
+# ============================================
+# FLAVOUR FLEET — Micro-benchmarks
+# ============================================
+# Usage: python backend/benchmarks.py <name> [--items N] [--rounds N]
+# Importing the route modules runs db.py, so MongoDB must be reachable
+# even for benchmarks that only measure Python-side work.
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+# Must be imported before db.py creates the MongoClient.
+from utils.command_counter import command_counter  # noqa: E402
+
+
+def _timeit(fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def synthetic_menu(count):
+    return [
+        {
+            "item_id": f"p{i % 5 + 1}" if i % 3 == 0 else f"item_{i:06x}",
+            "name": f"Menu item {i}",
+            "price": 100 + i % 400,
+            "category": ("pizza", "burger", "sushi", "dessert")[i % 4],
+            "restaurant": f"Restaurant {i % 50}",
+            "badge": ("Veg", "Bestseller", "", "Vegan")[i % 4],
+            "description": "Synthetic benchmark item with a realistic description",
+            "rating": 4.5,
+        }
+        for i in range(count)
+    ]
+
+
+def bench_menu_normalize(args):
+    """Per-request CPU spent in read-time normalize_menu_item (retired)."""
+    from routes.menu import normalize_menu_item
+
+    items = synthetic_menu(args.items)
+    elapsed = _timeit(
+        lambda: [normalize_menu_item(dict(i)) for i in items], args.rounds
+    )
+    print(
+        f"normalize_menu_item: {args.items} items -> {elapsed * 1000:.3f} ms/request "
+        f"({elapsed / args.items * 1e6:.2f} us/item) saved by write-time materialization"
+    )
+
+
+def synthetic_orders(count):
+    from datetime import datetime, timedelta
+
+    from bson import ObjectId
+
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "order_id": f"ORD-{i:08X}",
+            "user_id": str(ObjectId()),
+            "items": [
+                {"id": f"p{j}", "item_id": f"p{j}", "name": f"Item {j}", "price": 199.0,
+                 "image": "assets/images/pizza.png", "restaurant": "Pizza Paradise", "quantity": 2}
+                for j in range(5)
+            ],
+            "items_summary": "Item 0, Item 1, Item 2, Item 3, Item 4",
+            "subtotal": 1990.0, "delivery_fee": 0, "tax": 99.5, "discount": 0, "total": 2089.5,
+            "status": "delivered",
+            "status_history": [
+                {"status": s, "timestamp": now - timedelta(minutes=k)}
+                for k, s in enumerate(("preparing", "out_for_delivery", "delivered"))
+            ],
+            "created_at": now - timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+
+
+def bench_json_encode(args):
+    """Encode time for large menu/order payloads: stdlib + _id loop vs provider."""
+    import copy
+
+    from bson import ObjectId
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+
+    from utils.json_provider import MongoJSONProvider, orjson
+
+    menu = [{"_id": ObjectId(), **item} for item in synthetic_menu(args.items)]
+    orders = synthetic_orders(args.items // 5)
+    payloads = {"menu": menu, "orders": orders}
+
+    legacy = DefaultJSONProvider(Flask("legacy"))
+    fast = MongoJSONProvider(Flask("fast"))
+
+    for name, docs in payloads.items():
+        def stdlib_with_loop():
+            copies = copy.copy(docs)
+            for i, doc in enumerate(copies):
+                doc = dict(doc)
+                doc["_id"] = str(doc["_id"])
+                copies[i] = doc
+            legacy.dumps({"success": True, name: copies}, separators=(",", ":"))
+
+        before = _timeit(stdlib_with_loop, args.rounds)
+        after = _timeit(lambda: fast.dumps({"success": True, name: docs}), args.rounds)
+        print(
+            f"{name:6s} x{len(docs)}: stdlib+_id loop {before * 1000:.2f} ms -> "
+            f"{'orjson' if orjson else 'stdlib'} provider {after * 1000:.2f} ms "
+            f"({before / after:.1f}x)"
+        )
+
+
+def bench_cart_round_trips(args):
+    """Mongo round trips for GET /api/cart and checkout as cart size grows.
+
+    Each cart is stored without a catalog version stamp, so every GET
+    re-prices all of its lines against the menu, as after an admin edit.
+    """
+    os.environ.setdefault("TESTING_MODE", "1")
+    os.environ.setdefault("JOB_WORKERS", "0")
+    from app import app
+    from cart_store import cart_store
+    from db import jobs_col, menu_col, orders_col, payments_col
+
+    prefix = "bench_rt_"
+    menu_col.insert_many(
+        [
+            {"item_id": f"{prefix}{i}", "name": f"Bench item {i}", "price": 100 + i,
+             "category": "bench", "restaurant": "Bench Kitchen", "is_veg": False}
+            for i in range(args.lines)
+        ]
+    )
+    uid = "64b000000000000000000000"
+    checkout = {"address": "1 Bench Lane", "phone": "9999999999", "name": "Bench",
+                "city": "Benchville", "zip": "000000", "payment_method": "UPI"}
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+    try:
+        for lines in sorted({1, 5, args.lines // 2, args.lines}):
+            items = [
+                {"id": f"{prefix}{i}", "name": f"Bench item {i}", "price": 100.0 + i,
+                 "image": "", "restaurant": "Bench Kitchen", "quantity": 1}
+                for i in range(lines)
+            ]
+            cart_store.replace(uid, items)
+            for label, send in (
+                ("GET /api/cart", lambda: client.get("/api/cart")),
+                ("POST /api/orders", lambda: client.post("/api/orders", json=checkout)),
+            ):
+                command_counter.reset()
+                send()
+                print(f"{label:16s} with {lines:3d} lines -> {command_counter.total} round trips "
+                      f"{dict(command_counter.commands)}")
+    finally:
+        order_ids = [o["order_id"] for o in orders_col.find({"user_id": uid}, {"order_id": 1})]
+        jobs_col.delete_many({"payload.order_id": {"$in": order_ids}})
+        payments_col.delete_many({"user_id": uid})
+        orders_col.delete_many({"user_id": uid})
+        menu_col.delete_many({"item_id": {"$regex": f"^{prefix}"}})
+        cart_store.delete(uid)
+
+
+BENCHMARKS = {
+    "menu-normalize": bench_menu_normalize,
+    "cart-round-trips": bench_cart_round_trips,
+    "json-encode": bench_json_encode,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flavour Fleet micro-benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=20)
+    cli_args = parser.parse_args()
+    BENCHMARKS[cli_args.name](cli_args)
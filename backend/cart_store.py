@@ -0,0 +1,733 @@
+# ============================================
+# FLAVOUR FLEET — Cart Storage
+# ============================================
+# Carts are the highest-write data in the app, so route handlers go
+# through a CartStore instead of touching carts_col directly.
+#
+#   CART_STORE=mongo   (default) every mutation is one carts_col write
+#   CART_STORE=redis   Redis hash per cart (CART_REDIS_URL / REDIS_URL)
+#   CART_STORE=memory  per-process dict; a stand-in for tests/dev
+#
+# The redis and memory stores serve reads and writes from the hot tier
+# and persist dirty carts to carts_col in the background every
+# CART_FLUSH_INTERVAL_SECONDS (write-behind). A cart missing from the
+# hot tier is loaded from carts_col on first touch.
+# ============================================
+
+import atexit
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+
+from db import carts_col, guest_cart_ttl_seconds, run_in_transaction
+from helpers import GUEST_ID_PREFIX, is_guest_id
+from pricing import TOTAL_FIELDS, cart_totals, cart_totals_stages
+from utils.logger import logger
+
+CART_STORE = os.getenv('CART_STORE', 'mongo').strip().lower()
+FLUSH_INTERVAL_SECONDS = float(os.getenv('CART_FLUSH_INTERVAL_SECONDS', '5'))
+REDIS_CART_TTL_SECONDS = int(os.getenv('CART_REDIS_TTL_SECONDS', str(7 * 24 * 3600)))
+FLUSH_BATCH_SIZE = 500
+# A standalone merge claim older than this is from a worker that died.
+MERGE_CLAIM_TIMEOUT_SECONDS = int(os.getenv('CART_MERGE_CLAIM_TIMEOUT_SECONDS', '60'))
+
+
+def make_cart(items, catalog_version=None):
+    return {'items': items, 'catalog_version': catalog_version, **cart_totals(items)}
+
+
+def empty_cart():
+    return make_cart([])
+
+
+def _touch(uid):
+    """Fields refreshed on every carts_col write (drive guest-cart TTL)."""
+    return {'updated_at': datetime.utcnow(), 'is_guest': is_guest_id(uid)}
+
+
+def merged_version(had_lines, current, incoming):
+    """Catalog version of a cart after merging in lines validated at ``incoming``."""
+    if not had_lines:
+        return incoming
+    return current if current == incoming else None
+
+
+def _merge_lines(items, lines):
+    """``items`` plus ``lines``, summing quantities by id (O(n + m))."""
+    merged = {item['id']: dict(item) for item in items}
+    for line in lines:
+        if line['id'] in merged:
+            merged[line['id']]['quantity'] += line['quantity']
+        else:
+            merged[line['id']] = dict(line)
+    return list(merged.values())
+
+
+def _same_cart(cart, expected):
+    """True if ``cart`` still has ``expected``'s lines and catalog version."""
+    if not cart or not expected:
+        return not cart and not expected
+    return (cart['catalog_version'] == expected['catalog_version']
+            and {i['id']: i for i in cart['items']} == {i['id']: i for i in expected['items']})
+
+
+def _merge_line(items, item):
+    for i, line in enumerate(items):
+        if line.get('id') == item['id']:
+            items[i] = {**line, 'quantity': line.get('quantity', 0) + item['quantity']}
+            return items
+    items.append(item)
+    return items
+
+
+class CartStore:
+    """Storage interface for carts.
+
+    A cart is ``{'items': [...], 'catalog_version': int | None}`` plus
+    the ``pricing.cart_totals`` fields, kept in step with the items on
+    every write. Item mutations return the cart after the change, or
+    ``None`` when the user has no cart.
+    """
+
+    # Whether ``claim`` honours a MongoDB session (and so rolls back with it).
+    transactional = False
+
+    def get(self, uid):
+        raise NotImplementedError
+
+    def apply_ops(self, uid, ops, version=None):
+        """Apply cart ops atomically, in order, as one write.
+
+        ``ops`` is a list of ``('add', item)`` (merge a priced line by
+        id), ``('set', item_id, quantity)`` (no-op if the line is absent)
+        and ``('remove', item_id)``. A cart with no lines beforehand is
+        stamped with ``version``, since its lines all come from freshly
+        priced adds.
+        """
+        raise NotImplementedError
+
+    def add_item(self, uid, item, version):
+        return self.apply_ops(uid, [('add', item)], version)
+
+    def set_quantity(self, uid, item_id, quantity):
+        return self.apply_ops(uid, [('set', item_id, quantity)])
+
+    def remove_item(self, uid, item_id):
+        return self.apply_ops(uid, [('remove', item_id)])
+
+    def merge_lines(self, uid, lines, version=None):
+        """Fold ``lines`` (validated at ``version``) into a cart in one write.
+
+        The result stays stamped only if both sides were validated at
+        the same catalog version.
+        """
+        raise NotImplementedError
+
+    def take(self, uid):
+        """Atomically read and delete a cart; only one caller gets it."""
+        raise NotImplementedError
+
+    def claim(self, uid, session=None):
+        """Atomically empty a cart for checkout and return its prior contents.
+
+        Only transactional stores use ``session``. Claim from other
+        stores before starting a transaction (its callback may be re-run)
+        and put the lines back with ``merge_lines`` if checkout fails.
+        """
+        return self.take(uid)
+
+    def merge(self, from_uid, into_uid):
+        """Move ``from_uid``'s lines into ``into_uid``'s cart, exactly once.
+
+        The lines are written to the target before the source is deleted,
+        so a failure in between never loses the guest cart. Stores make
+        the pair atomic against concurrent merges (e.g. logins from two
+        tabs) in their own way.
+        """
+        raise NotImplementedError
+
+    def replace(self, uid, items, version=None):
+        """Overwrite all lines and the validated catalog version."""
+        raise NotImplementedError
+
+    def replace_if_unchanged(self, uid, expected, items, version=None):
+        """``replace`` only if the cart still matches ``expected`` (as read).
+
+        Returns False, writing nothing, when a concurrent change got there
+        first; the caller should re-read and try again.
+        """
+        raise NotImplementedError
+
+    def delete(self, uid):
+        raise NotImplementedError
+
+    def flush(self):
+        """Persist pending changes to carts_col; returns carts written."""
+        return 0
+
+
+# ─── MongoDB ─────────────────────────────────────────
+class MongoCartStore(CartStore):
+    """Carts live only in carts_col; each mutation is one atomic write."""
+
+    PROJECTION = {'_id': 0, 'items': 1, 'catalog_version': 1, **dict.fromkeys(TOTAL_FIELDS, 1)}
+    transactional = True
+
+    def __init__(self, collection=carts_col):
+        self.collection = collection
+
+    @staticmethod
+    def _cart(doc):
+        if not doc:
+            return None
+        if all(field in doc for field in TOTAL_FIELDS):
+            return {'items': doc.get('items', []), 'catalog_version': doc.get('catalog_version'),
+                    **{field: doc[field] for field in TOTAL_FIELDS}}
+        return make_cart(doc.get('items', []), doc.get('catalog_version'))  # pre-totals cart
+
+    def _mutate(self, uid, update, upsert=False, session=None):
+        return self._cart(self.collection.find_one_and_update(
+            {'user_id': uid},
+            update,
+            projection=self.PROJECTION,
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        ))
+
+    def get(self, uid):
+        return self._cart(self.collection.find_one({'user_id': uid}, self.PROJECTION))
+
+    @staticmethod
+    def _op_stage(op):
+        items = {'$ifNull': ['$items', []]}
+        item_id = {'$literal': op[1]['id'] if op[0] == 'add' else op[1]}
+        if op[0] == 'add':
+            item = op[1]
+            value = {'$cond': [
+                {'$in': [item_id, {'$map': {'input': items, 'as': 'i', 'in': '$$i.id'}}]},
+                {'$map': {'input': items, 'as': 'i', 'in': {'$cond': [
+                    {'$eq': ['$$i.id', item_id]},
+                    {'$mergeObjects': ['$$i', {'quantity': {'$add': ['$$i.quantity', item['quantity']]}}]},
+                    '$$i',
+                ]}}},
+                {'$concatArrays': [items, {'$literal': [item]}]},
+            ]}
+        elif op[0] == 'set':
+            value = {'$map': {'input': items, 'as': 'i', 'in': {'$cond': [
+                {'$eq': ['$$i.id', item_id]},
+                {'$mergeObjects': ['$$i', {'quantity': op[2]}]},
+                '$$i',
+            ]}}}
+        else:
+            value = {'$filter': {'input': items, 'as': 'i', 'cond': {'$ne': ['$$i.id', item_id]}}}
+        return {'$set': {'items': value}}
+
+    def apply_ops(self, uid, ops, version=None):
+        pipeline = [self._op_stage(op) for op in ops]
+        pipeline += cart_totals_stages()
+        pipeline.append({'$set': _touch(uid)})
+        if version is not None:
+            items = {'$ifNull': ['$items', []]}
+            pipeline.insert(0, {'$set': {'catalog_version': {
+                '$cond': [{'$gt': [{'$size': items}, 0]}, '$catalog_version', version]
+            }}})
+        return self._mutate(uid, pipeline, upsert=any(op[0] == 'add' for op in ops))
+
+    def merge_lines(self, uid, lines, version=None, session=None):
+        items = {'$ifNull': ['$items', []]}
+        merged = {'$reduce': {
+            'input': {'$literal': lines},
+            'initialValue': items,
+            'in': {'$cond': [
+                {'$in': ['$$this.id', '$$value.id']},
+                {'$map': {'input': '$$value', 'as': 'i', 'in': {'$cond': [
+                    {'$eq': ['$$i.id', '$$this.id']},
+                    {'$mergeObjects': ['$$i', {'quantity': {'$add': ['$$i.quantity', '$$this.quantity']}}]},
+                    '$$i',
+                ]}}},
+                {'$concatArrays': ['$$value', ['$$this']]},
+            ]},
+        }}
+        pipeline = [
+            {'$set': {
+                'items': merged,
+                'catalog_version': {'$cond': [
+                    {'$eq': [{'$size': items}, 0]},
+                    version,
+                    {'$cond': [{'$eq': ['$catalog_version', version]}, version, None]},
+                ]},
+            }},
+            *cart_totals_stages(),
+            {'$set': _touch(uid)},
+        ]
+        return self._mutate(uid, pipeline, upsert=True, session=session)
+
+    def take(self, uid):
+        return self._cart(self.collection.find_one_and_delete({'user_id': uid}, projection=self.PROJECTION))
+
+    def merge(self, from_uid, into_uid):
+        """Claim, merge and delete the source in one transaction.
+
+        Standalone servers have no transactions; there the source is
+        claimed with ``merging_into``/``merging_at`` (only one caller can),
+        merged, then deleted. A failed merge releases the claim, and one
+        left by a worker that died is taken over after
+        MERGE_CLAIM_TIMEOUT_SECONDS, so the guest cart is never stuck.
+        """
+        def move(session):
+            now = datetime.utcnow()
+            stale = now - timedelta(seconds=MERGE_CLAIM_TIMEOUT_SECONDS)
+            source = self.collection.find_one_and_update(
+                {'user_id': from_uid, '$or': [
+                    {'merging_into': {'$exists': False}},
+                    {'merging_at': {'$not': {'$gte': stale}}},
+                ]},
+                {'$set': {'merging_into': into_uid, 'merging_at': now}},
+                projection=self.PROJECTION,
+                session=session,
+            )
+            claimed = {'user_id': from_uid, 'merging_at': now}
+            cart = self._cart(source)
+            try:
+                if cart and cart['items']:
+                    cart = self.merge_lines(into_uid, cart['items'], cart['catalog_version'], session=session)
+                else:
+                    cart = None
+            except Exception:
+                if session is None:  # let a later login retry the merge
+                    self.collection.update_one(claimed, {'$unset': {'merging_into': '', 'merging_at': ''}})
+                raise
+            if source:
+                self.collection.delete_one(claimed, session=session)
+            return cart
+
+        return run_in_transaction(move) or self.get(into_uid)
+
+    def claim(self, uid, session=None):
+        return self._cart(self.collection.find_one_and_update(
+            {'user_id': uid},
+            {'$set': {**empty_cart(), **_touch(uid)}},
+            projection=self.PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+            session=session,
+        ))
+
+    def replace(self, uid, items, version=None):
+        self.collection.update_one(
+            {'user_id': uid},
+            {'$set': {**make_cart(items, version), **_touch(uid)}},
+            upsert=True,
+        )
+
+    def replace_if_unchanged(self, uid, expected, items, version=None):
+        result = self.collection.update_one(
+            {'user_id': uid, 'items': expected['items'], 'catalog_version': expected['catalog_version']},
+            {'$set': {**make_cart(items, version), **_touch(uid)}},
+        )
+        return result.matched_count == 1
+
+    def delete(self, uid):
+        self.collection.delete_one({'user_id': uid})
+
+
+# ─── Write-behind hot tiers ──────────────────────────
+class WriteBehindCartStore(CartStore):
+    """Base for stores that persist dirty carts to carts_col later.
+
+    Subclasses implement ``_pop_dirty``/``_mark_dirty`` and ``_peek``
+    (hot-tier read without the cold load). ``flush_interval`` starts a
+    daemon thread; pass ``None`` to flush only on demand.
+    """
+
+    def __init__(self, collection=carts_col, flush_interval=None):
+        self.collection = collection
+        self._stop = threading.Event()
+        if flush_interval:
+            thread = threading.Thread(
+                target=self._flush_loop, args=(flush_interval,),
+                name='cart-write-behind', daemon=True,
+            )
+            thread.start()
+            atexit.register(self.close)
+
+    def _load(self, uid):
+        doc = self.collection.find_one({'user_id': uid}, MongoCartStore.PROJECTION)
+        return MongoCartStore._cart(doc) or empty_cart()
+
+    def flush(self):
+        written = 0
+        while True:
+            uids = self._pop_dirty(FLUSH_BATCH_SIZE)
+            if not uids:
+                return written
+            ops = []
+            for uid in uids:
+                cart = self._peek(uid)
+                if cart is None:
+                    ops.append(DeleteOne({'user_id': uid}))
+                else:
+                    ops.append(UpdateOne(
+                        {'user_id': uid}, {'$set': {**cart, **_touch(uid)}}, upsert=True,
+                    ))
+            try:
+                self.collection.bulk_write(ops, ordered=False)
+            except Exception:
+                self._mark_dirty(uids)
+                raise
+            written += len(ops)
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Cart write-behind flush failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Final cart flush failed: {e}")
+
+
+class MemoryCartStore(WriteBehindCartStore):
+    """Per-process carts; only suitable for a single worker or tests."""
+
+    def __init__(self, collection=carts_col, flush_interval=None):
+        self._lock = threading.RLock()
+        self._carts = {}
+        self._dirty = set()
+        super().__init__(collection, flush_interval)
+
+    def _cart(self, uid):
+        cart = self._carts.get(uid)
+        if cart is None:
+            cart = self._carts[uid] = self._load(uid)
+        return cart
+
+    @staticmethod
+    def _copy(cart):
+        if not cart or (not cart['items'] and cart['catalog_version'] is None):
+            return None
+        return {**cart, 'items': [dict(i) for i in cart['items']]}
+
+    def _peek(self, uid):
+        with self._lock:
+            return self._copy(self._carts.get(uid))
+
+    def _mark_dirty(self, uids):
+        with self._lock:
+            self._dirty.update(uids)
+
+    def _pop_dirty(self, count):
+        with self._lock:
+            uids = [self._dirty.pop() for _ in range(min(count, len(self._dirty)))]
+        return uids
+
+    def get(self, uid):
+        with self._lock:
+            return self._copy(self._cart(uid))
+
+    def apply_ops(self, uid, ops, version=None):
+        with self._lock:
+            cart = self._cart(uid)
+            items = [dict(i) for i in cart['items']]
+            if not items and version is not None:
+                cart['catalog_version'] = version
+            for op in ops:
+                if op[0] == 'add':
+                    items = _merge_line(items, dict(op[1]))
+                elif op[0] == 'set':
+                    items = [{**i, 'quantity': op[2]} if i.get('id') == op[1] else i for i in items]
+                else:
+                    items = [i for i in items if i.get('id') != op[1]]
+            if items != cart['items']:
+                cart.update(make_cart(items, cart['catalog_version']))
+                self._dirty.add(uid)
+            return self._copy(cart)
+
+    def merge_lines(self, uid, lines, version=None):
+        with self._lock:
+            cart = self._cart(uid)
+            cart.update(make_cart(
+                _merge_lines(cart['items'], lines),
+                merged_version(bool(cart['items']), cart['catalog_version'], version),
+            ))
+            self._dirty.add(uid)
+            return self._copy(cart)
+
+    def take(self, uid):
+        with self._lock:
+            cart = self._copy(self._cart(uid))
+            self.delete(uid)
+            return cart
+
+    def merge(self, from_uid, into_uid):
+        with self._lock:
+            source = self._copy(self._cart(from_uid))
+            if not source or not source['items']:
+                return self.get(into_uid)
+            cart = self.merge_lines(into_uid, source['items'], source['catalog_version'])
+            self.delete(from_uid)
+            return cart
+
+    def replace(self, uid, items, version=None):
+        with self._lock:
+            self._carts[uid] = make_cart([dict(i) for i in items], version)
+            self._dirty.add(uid)
+
+    def replace_if_unchanged(self, uid, expected, items, version=None):
+        with self._lock:
+            if not _same_cart(self._copy(self._cart(uid)), expected):
+                return False
+            self.replace(uid, items, version)
+            return True
+
+    def delete(self, uid):
+        with self._lock:
+            # Keep an empty entry so reads don't reload the stale Mongo copy.
+            self._carts[uid] = empty_cart()
+            self._dirty.add(uid)
+
+
+class RedisCartStore(WriteBehindCartStore):
+    """One Redis hash per cart, shared by all workers.
+
+    ``cart:<uid>`` holds ``line:<id>`` (JSON line without quantity),
+    ``qty:<id>`` (integer, so adds are an atomic HINCRBY) and
+    ``@catalog_version`` ('' when unvalidated). Dirty user ids are kept
+    in the ``carts:dirty`` set so any worker can flush them.
+    """
+
+    DIRTY_KEY = 'carts:dirty'
+    VERSION_FIELD = '@catalog_version'
+
+    # Only touch quantities of lines that still exist.
+    _SET_QUANTITY = """
+    if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+        redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+    end
+    """
+
+    def __init__(self, url, collection=carts_col, flush_interval=None):
+        import redis
+
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self._set_quantity = self.redis.register_script(self._SET_QUANTITY)
+        super().__init__(collection, flush_interval)
+
+    @staticmethod
+    def _key(uid):
+        return f'cart:{uid}'
+
+    @classmethod
+    def _mapping(cls, cart):
+        mapping = {cls.VERSION_FIELD: '' if cart['catalog_version'] is None else str(cart['catalog_version'])}
+        for item in cart['items']:
+            line = {k: v for k, v in item.items() if k != 'quantity'}
+            mapping[f"line:{item['id']}"] = json.dumps(line)
+            mapping[f"qty:{item['id']}"] = int(item.get('quantity', 1))
+        return mapping
+
+    @classmethod
+    def _decode(cls, fields):
+        if not fields:
+            return None
+        version = fields.get(cls.VERSION_FIELD)
+        items = []
+        for field, value in fields.items():
+            if field.startswith('line:'):
+                line = json.loads(value)
+                line['quantity'] = int(fields.get(f'qty:{field[5:]}', 0))
+                items.append(line)
+        if not items and not version:
+            return None
+        return make_cart(items, int(version) if version else None)
+
+    def _hydrate(self, uid):
+        """Copy a cart from carts_col into Redis unless it is already there."""
+        key = self._key(uid)
+        if self.redis.exists(key):
+            return
+        pipe = self.redis.pipeline()
+        for field, value in self._mapping(self._load(uid)).items():
+            pipe.hsetnx(key, field, value)
+        pipe.expire(key, REDIS_CART_TTL_SECONDS)
+        pipe.execute()
+
+    def _run(self, uid, apply):
+        """Queue ``apply(pipe, key)`` in one MULTI and return the new cart."""
+        key = self._key(uid)
+        pipe = self.redis.pipeline()
+        apply(pipe, key)
+        pipe.sadd(self.DIRTY_KEY, uid)
+        pipe.expire(key, REDIS_CART_TTL_SECONDS)
+        pipe.hgetall(key)
+        return self._decode(pipe.execute()[-1])
+
+    def _peek(self, uid):
+        return self._decode(self.redis.hgetall(self._key(uid)))
+
+    def _mark_dirty(self, uids):
+        if uids:
+            self.redis.sadd(self.DIRTY_KEY, *uids)
+
+    def _pop_dirty(self, count):
+        return self.redis.spop(self.DIRTY_KEY, count) or []
+
+    def get(self, uid):
+        self._hydrate(uid)
+        return self._peek(uid)
+
+    def apply_ops(self, uid, ops, version=None):
+        self._hydrate(uid)
+        stamp = version is not None and not any(
+            f.startswith('line:') for f in self.redis.hkeys(self._key(uid))
+        )
+
+        def apply(pipe, key):
+            if stamp:
+                pipe.hset(key, self.VERSION_FIELD, str(version))
+            for op in ops:
+                if op[0] == 'add':
+                    item = op[1]
+                    line = {k: v for k, v in item.items() if k != 'quantity'}
+                    pipe.hset(key, f"line:{item['id']}", json.dumps(line))
+                    pipe.hincrby(key, f"qty:{item['id']}", item['quantity'])
+                elif op[0] == 'set':
+                    self._set_quantity(
+                        keys=[key], args=[f'line:{op[1]}', f'qty:{op[1]}', op[2]], client=pipe,
+                    )
+                else:
+                    pipe.hdel(key, f'line:{op[1]}', f'qty:{op[1]}')
+
+        return self._run(uid, apply)
+
+    def _queue_merge(self, pipe, key, current, lines, version):
+        had_lines = bool(current and current['items'])
+        new_version = merged_version(had_lines, current and current['catalog_version'], version)
+        pipe.hset(key, self.VERSION_FIELD, '' if new_version is None else str(new_version))
+        for line in lines:
+            pipe.hsetnx(key, f"line:{line['id']}", json.dumps(
+                {k: v for k, v in line.items() if k != 'quantity'}
+            ))
+            pipe.hincrby(key, f"qty:{line['id']}", line['quantity'])
+
+    def merge_lines(self, uid, lines, version=None):
+        self._hydrate(uid)
+        current = self._peek(uid)
+        return self._run(uid, lambda pipe, key: self._queue_merge(pipe, key, current, lines, version))
+
+    def merge(self, from_uid, into_uid):
+        """Merge and clear the source in one MULTI, retried if either
+        cart changes under WATCH (so a racing merge adds nothing)."""
+        self._hydrate(from_uid)
+        self._hydrate(into_uid)
+        source_key, target_key = self._key(from_uid), self._key(into_uid)
+
+        def move(pipe):
+            source = self._decode(pipe.hgetall(source_key))
+            if not source or not source['items']:
+                return
+            current = self._decode(pipe.hgetall(target_key))
+            pipe.multi()
+            self._queue_merge(pipe, target_key, current, source['items'], source['catalog_version'])
+            pipe.expire(target_key, REDIS_CART_TTL_SECONDS)
+            pipe.delete(source_key)
+            pipe.hset(source_key, self.VERSION_FIELD, '')
+            pipe.expire(source_key, REDIS_CART_TTL_SECONDS)
+            pipe.sadd(self.DIRTY_KEY, from_uid, into_uid)
+
+        self.redis.transaction(move, source_key, target_key)
+        return self._peek(into_uid)
+
+    def take(self, uid):
+        self._hydrate(uid)
+        key = self._key(uid)
+        pipe = self.redis.pipeline()
+        pipe.hgetall(key)
+        pipe.delete(key)
+        pipe.hset(key, self.VERSION_FIELD, '')
+        pipe.expire(key, REDIS_CART_TTL_SECONDS)
+        pipe.sadd(self.DIRTY_KEY, uid)
+        return self._decode(pipe.execute()[0])
+
+    def replace(self, uid, items, version=None):
+        key = self._key(uid)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=self._mapping(make_cart(items, version)))
+        pipe.expire(key, REDIS_CART_TTL_SECONDS)
+        pipe.sadd(self.DIRTY_KEY, uid)
+        pipe.execute()
+
+    def replace_if_unchanged(self, uid, expected, items, version=None):
+        key = self._key(uid)
+
+        def swap(pipe):
+            if not _same_cart(self._decode(pipe.hgetall(key)), expected):
+                return False
+            pipe.multi()
+            pipe.delete(key)
+            pipe.hset(key, mapping=self._mapping(make_cart(items, version)))
+            pipe.expire(key, REDIS_CART_TTL_SECONDS)
+            pipe.sadd(self.DIRTY_KEY, uid)
+            return True
+
+        return self.redis.transaction(swap, key, value_from_callable=True)
+
+    def delete(self, uid):
+        # Leave an empty hash so reads don't reload the stale Mongo copy.
+        self.replace(uid, [])
+
+
+def compact_carts(ttl_seconds=guest_cart_ttl_seconds, collection=carts_col):
+    """Reclaim dead cart documents and return counts of what changed.
+
+    The TTL index expires guest carts on its own, but only those carrying
+    ``updated_at``/``is_guest``. This sweep deletes empty carts and guest
+    carts past the TTL (in case the TTL monitor is behind), then stamps
+    legacy carts so the index can see them.
+    """
+    now = datetime.utcnow()
+    stats = {'before': collection.estimated_document_count()}
+    stats['expired_guests'] = collection.delete_many({
+        'is_guest': True,
+        'updated_at': {'$lt': now - timedelta(seconds=ttl_seconds)},
+    }).deleted_count
+    stats['empty'] = collection.delete_many({
+        '$or': [{'items': {'$size': 0}}, {'items': {'$exists': False}}],
+    }).deleted_count
+
+    unstamped = {'updated_at': {'$exists': False}}
+    guest = {'user_id': {'$regex': '^' + re.escape(GUEST_ID_PREFIX)}}
+    stats['stamped'] = (
+        collection.update_many(
+            {**unstamped, **guest}, {'$set': {'updated_at': now, 'is_guest': True}}
+        ).modified_count
+        + collection.update_many(
+            unstamped, {'$set': {'updated_at': now, 'is_guest': False}}
+        ).modified_count
+    )
+    stats['after'] = collection.estimated_document_count()
+    return stats
+
+
+def create_cart_store(kind=CART_STORE):
+    if kind == 'mongo':
+        return MongoCartStore()
+    if kind == 'memory':
+        return MemoryCartStore(flush_interval=FLUSH_INTERVAL_SECONDS)
+    if kind == 'redis':
+        url = os.getenv('CART_REDIS_URL') or os.getenv('REDIS_URL') or 'redis://localhost:6379/0'
+        return RedisCartStore(url, flush_interval=FLUSH_INTERVAL_SECONDS)
+    raise ValueError(f'Unknown CART_STORE: {kind}')
+
+
+cart_store = create_cart_store()
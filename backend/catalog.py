@@ -0,0 +1,126 @@
+# ============================================
+# FLAVOUR FLEET — Catalog Versions & Cache
+# ============================================
+# Public catalog data (menu, restaurants, offers) only changes when an
+# admin edits it. Each catalog carries a version counter stored in the
+# settings collection; admin write handlers bump it, and per-process
+# caches drop their entries whenever the version they were built
+# against is no longer current.
+# ============================================
+
+import hashlib
+import os
+import threading
+import time
+
+from flask import make_response, request
+from pymongo import ReturnDocument
+
+from db import settings_col
+
+CATALOG_VERSIONS_KEY = 'catalog_versions'
+
+# Browsers and proxies revalidate once max-age lapses (immediately by
+# default); a matching ETag turns that revalidation into a bodyless 304.
+CATALOG_CACHE_CONTROL = 'public, max-age={}, must-revalidate'.format(
+    int(os.getenv('CATALOG_MAX_AGE_SECONDS', '0'))
+)
+
+# How long a process trusts its last-seen version before re-reading it
+# from Mongo. Bumps made by this process are visible immediately; bumps
+# made by other workers become visible within this window.
+VERSION_TTL_SECONDS = float(os.getenv('CATALOG_VERSION_TTL_SECONDS', '2'))
+
+_lock = threading.Lock()
+_versions = {}
+_versions_checked_at = 0.0
+
+
+def _refresh_versions():
+    global _versions, _versions_checked_at
+    doc = settings_col.find_one({'key': CATALOG_VERSIONS_KEY}) or {}
+    _versions = {k: v for k, v in doc.items() if isinstance(v, int)}
+    _versions_checked_at = time.monotonic()
+
+
+def get_catalog_version(name):
+    """Return the current version counter for a catalog (0 if never bumped)."""
+    with _lock:
+        if time.monotonic() - _versions_checked_at >= VERSION_TTL_SECONDS:
+            _refresh_versions()
+        return _versions.get(name, 0)
+
+
+def bump_catalog_version(name):
+    """Increment a catalog's version after an admin write and return it."""
+    doc = settings_col.find_one_and_update(
+        {'key': CATALOG_VERSIONS_KEY},
+        {'$inc': {name: 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    with _lock:
+        _versions[name] = doc[name]
+    return doc[name]
+
+
+class CatalogCache:
+    """Per-process cache of computed catalog payloads, keyed by query.
+
+    Entries are tagged with the catalog version they were loaded at and
+    the whole cache is dropped as soon as a newer version is observed.
+    ``max_entries`` bounds caches keyed by client-supplied values.
+    """
+
+    def __init__(self, name, max_entries=None):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        version = get_catalog_version(self.name)
+        with self._lock:
+            if self._version != version:
+                self._entries = {}
+                self._version = version
+            if key in self._entries:
+                return self._entries[key]
+
+        value = loader()
+        with self._lock:
+            if self._version == version:
+                if self.max_entries and len(self._entries) >= self.max_entries:
+                    self._entries = {}
+                self._entries[key] = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._version = None
+
+
+def catalog_etag(name, *parts):
+    """Strong ETag for a catalog response: catalog version + request shape."""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+    return f'{name}-{get_catalog_version(name)}-{digest}'
+
+
+def catalog_response(name, build):
+    """Serve a public catalog endpoint with ETag/If-None-Match support.
+
+    ``build`` is only called when the client's cached copy is stale, so a
+    revalidation costs a version lookup instead of a query and encode.
+    """
+    etag = catalog_etag(name, sorted(request.args.items(multi=True)))
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CATALOG_CACHE_CONTROL
+    return response
@@ -0,0 +1,78 @@
+# ============================================
+# FLAVOUR FLEET — Pytest Fixtures
+# ============================================
+# Integration tests talk to a real MongoDB (DATABASE_URL / MONGODB_URI,
+# default mongodb://localhost:27017/) using a throwaway database. They
+# are skipped automatically when no server is reachable.
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("TESTING_MODE", "1")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DATABASE_NAME", "flavourfleet_test")
+os.environ.setdefault("MONGO_CONNECT_TIMEOUT_MS", "1000")
+os.environ.setdefault("JOB_WORKERS", "0")  # tests run queued jobs explicitly
+
+# Registered before any test imports db.py so every MongoClient is counted.
+from utils.command_counter import command_counter  # noqa: E402
+
+TEST_USER_ID = "64b000000000000000000001"
+TEST_ADMIN_ID = "64b000000000000000000002"
+
+
+def mongo_available():
+    uri = (
+        os.getenv("DATABASE_URL")
+        or os.getenv("MONGODB_URI")
+        or os.getenv("MONGO_URI")
+        or "mongodb://localhost:27017/"
+    )
+    try:
+        MongoClient(uri, serverSelectionTimeoutMS=1000).admin.command("ping")
+        return True
+    except Exception:
+        return False
+
+
+requires_mongo = pytest.mark.skipif(
+    not mongo_available(), reason="requires a running MongoDB"
+)
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app
+
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    test_client = app.test_client()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = TEST_USER_ID
+        sess["user_role"] = "user"
+    return test_client
+
+
+@pytest.fixture
+def admin_client(app):
+    test_client = app.test_client()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = TEST_ADMIN_ID
+        sess["user_role"] = "admin"
+    return test_client
+
+
+@pytest.fixture
+def round_trips():
+    """Reset and return the process-wide MongoDB command counter."""
+    command_counter.reset()
+    return command_counter
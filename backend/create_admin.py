@@ -38,7 +38,7 @@ def create_admin_user():
         "phone": "123-456-7890",
         "address": "Admin HQ",
         "role": "admin",
-        "created_at": datetime.utcnow().isoformat(),
+        "created_at": datetime.utcnow(),
         "avatar": "assets/images/default.png",
     }
 
@@ -3,7 +3,7 @@
 # ============================================
 
 import os
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, GEOSPHERE
 
 # ─── MongoDB Connection ──────────────────────────────
 database_url = (
@@ -14,6 +14,8 @@ database_url = (
 )
 database_name = os.getenv("DATABASE_NAME", "flavourfleet")
 connect_timeout_ms = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+guest_cart_ttl_seconds = int(float(os.getenv("GUEST_CART_TTL_DAYS", "7")) * 86400)
+idempotency_key_ttl_seconds = int(float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24")) * 3600)
 
 client = MongoClient(
     database_url,
@@ -22,12 +24,35 @@ client = MongoClient(
 )
 db = client[database_name]
 
+
+def supports_transactions():
+    """True when connected to a replica set or sharded cluster (not standalone)."""
+    return client.topology_description.topology_type_name in (
+        "ReplicaSetWithPrimary",
+        "Sharded",
+        "LoadBalanced",
+    )
+
+
+def run_in_transaction(callback):
+    """Run ``callback(session)`` in a multi-document transaction.
+
+    The callback may be retried on transient errors, so it must be safe to
+    re-run. Standalone servers can't run transactions; there the callback
+    gets ``session=None`` and must compensate for its own partial writes.
+    """
+    if not supports_transactions():
+        return callback(None)
+    with client.start_session() as session:
+        return session.with_transaction(callback)
+
 # ─── Core Collections ────────────────────────────────
 users_col = db["users"]
 menu_col = db["menu_items"]
 restaurants_col = db["restaurants"]
 carts_col = db["carts"]
 orders_col = db["orders"]
+orders_archive_col = db["orders_archive"]  # old delivered/cancelled orders
 offers_col = db["offers"]
 reset_tokens_col = db["password_reset_tokens"]
 settings_col = db["settings"]
@@ -36,8 +61,29 @@ settings_col = db["settings"]
 addresses_col = db["addresses"]
 payments_col = db["payments"]
 analytics_col = db["analytics_snapshots"]
+idempotency_col = db["idempotency_keys"]
+jobs_col = db["job_outbox"]
 
 # ─── Indexes ─────────────────────────────────────────
+def ensure_ttl_index(collection, key, name, expire_after_seconds, **kwargs):
+    """Create a TTL index, or retune an existing one's expiry in place.
+
+    ``create_index`` refuses to change ``expireAfterSeconds`` on an index
+    that already exists, so a changed TTL setting is applied with collMod.
+    """
+    existing = collection.index_information().get(name)
+    if existing is None:
+        collection.create_index(
+            key, name=name, expireAfterSeconds=expire_after_seconds, **kwargs
+        )
+    elif existing.get("expireAfterSeconds") != expire_after_seconds:
+        db.command(
+            "collMod",
+            collection.name,
+            index={"name": name, "expireAfterSeconds": expire_after_seconds},
+        )
+
+
 # Users
 users_col.create_index("email", unique=True)
 users_col.create_index([("name", ASCENDING)])  # Admin user search
@@ -46,29 +92,51 @@ users_col.create_index([("created_at", DESCENDING)])  # Sort by newest
 
 # Carts
 carts_col.create_index("user_id")
+ensure_ttl_index(
+    carts_col,
+    "updated_at",
+    "guest_cart_ttl",
+    guest_cart_ttl_seconds,
+    partialFilterExpression={"is_guest": True},
+)  # Abandoned guest carts expire; signed-in users' carts are kept
 
 # Orders — compound indexes for admin queries
 orders_col.create_index("order_id", unique=True)
 orders_col.create_index("user_id")
 orders_col.create_index([("status", ASCENDING), ("created_at", DESCENDING)])
 orders_col.create_index(
-    [("user_id", ASCENDING), ("created_at", DESCENDING)]
-)  # User order history
+    [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+)  # User order history (keyset pages)
+if "user_id_1_created_at_-1" in orders_col.index_information():
+    orders_col.drop_index("user_id_1_created_at_-1")  # superseded by the index above
 orders_col.create_index(
     [("restaurant", ASCENDING), ("created_at", DESCENDING)]
 )  # By restaurant
 orders_col.create_index([("created_at", DESCENDING)])  # Global sort
 
+# Archived orders — looked up by id and in user history only
+orders_archive_col.create_index("order_id", unique=True)
+orders_archive_col.create_index(
+    [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+)
+
 # Menu
 menu_col.create_index("item_id", unique=True, sparse=True)
 menu_col.create_index([("category", ASCENDING)])
 menu_col.create_index(
     [("is_deleted", ASCENDING), ("category", ASCENDING)]
 )  # Admin filtered view
+menu_col.create_index([("category", ASCENDING), ("_id", ASCENDING)])  # Keyset pages
+menu_col.create_index(
+    [("restaurant", ASCENDING), ("is_deleted", ASCENDING)]
+)  # Restaurant detail $lookup
 
 # Restaurants
 restaurants_col.create_index([("is_deleted", ASCENDING), ("rating", DESCENDING)])
 restaurants_col.create_index([("category", ASCENDING)])
+restaurants_col.create_index([("rating", DESCENDING), ("_id", DESCENDING)])  # Keyset pages
+restaurants_col.create_index([("location", GEOSPHERE)])  # Near-me search
+restaurants_col.create_index("slug", unique=True, sparse=True)  # Readable URLs
 
 # Offers
 offers_col.create_index("code", unique=True, sparse=True)
@@ -88,3 +156,11 @@ payments_col.create_index([("order_id", ASCENDING)])
 
 # Analytics snapshots
 analytics_col.create_index([("date", DESCENDING)], unique=True)
+
+# Idempotency keys — replayed responses expire after the TTL
+ensure_ttl_index(
+    idempotency_col, "created_at", "created_at_1", idempotency_key_ttl_seconds
+)
+
+# Job outbox — workers claim the oldest due pending job
+jobs_col.create_index([("status", ASCENDING), ("run_at", ASCENDING)])
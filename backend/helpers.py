@@ -2,25 +2,38 @@
 # FLAVOUR FLEET — Shared Helpers & Decorators
 # ============================================
 
+import base64
+import json
+import re
 import secrets
+from datetime import datetime
 from functools import wraps
 
+from bson import ObjectId
 from flask import session, jsonify, request
+from pymongo import ASCENDING
 from werkzeug.exceptions import HTTPException
 
 from utils.logger import logger
 
 
 # ─── Helpers ──────────────────────────────────────────
+GUEST_ID_PREFIX = "guest_"
+
+
 def get_user_id():
     """Get user ID from session, or generate a guest ID."""
     if "user_id" in session:
         return session["user_id"]
     if "guest_id" not in session:
-        session["guest_id"] = "guest_" + secrets.token_hex(8)
+        session["guest_id"] = GUEST_ID_PREFIX + secrets.token_hex(8)
     return session["guest_id"]
 
 
+def is_guest_id(uid):
+    return str(uid).startswith(GUEST_ID_PREFIX)
+
+
 def login_required(f):
     """Decorator to require authentication."""
 
@@ -48,12 +61,110 @@ def admin_required(f):
 
 token_required = login_required
 
-def serialize_doc(doc):
-    """Convert MongoDB document to JSON-serializable dict."""
-    if doc is None:
+
+# ─── Keyset Pagination ───────────────────────────────
+MAX_PAGE_SIZE = 100
+_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*$')
+
+
+def encode_cursor(sort_value, doc_id):
+    if isinstance(sort_value, datetime):
+        sort_value = {'$date': sort_value.isoformat()}
+    raw = json.dumps([sort_value, str(doc_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value['$date'])
+        return sort_value, ObjectId(doc_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _keyset_filter(sort_key, direction, sort_value, doc_id):
+    """Match documents strictly after (sort_value, doc_id) in sort order."""
+    id_op = '$gt' if direction == ASCENDING else '$lt'
+    tie = {sort_key: sort_value, '_id': {id_op: doc_id}}
+    if sort_value is None:
+        # Missing/null keys sort first ascending and last descending.
+        if direction == ASCENDING:
+            return {'$or': [{sort_key: {'$ne': None}}, tie]}
+        return tie
+    clauses = [{sort_key: {id_op: sort_value}}, tie]
+    if direction != ASCENDING:
+        clauses.append({sort_key: None})
+    return {'$or': clauses}
+
+
+def parse_fields_param():
+    """Translate ?fields=a,b into a Mongo projection (None if absent)."""
+    raw = request.args.get('fields', '').strip()
+    if not raw:
         return None
-    doc["_id"] = str(doc["_id"])
-    return doc
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    if not fields or not all(_FIELD_NAME.match(f) for f in fields):
+        raise ValueError('Invalid fields parameter')
+    return {f: 1 for f in fields}
+
+
+def is_paginated_request():
+    return 'limit' in request.args or 'after' in request.args
+
+
+def page_limit(default=MAX_PAGE_SIZE):
+    """Page size from ?limit=, clamped to 1..MAX_PAGE_SIZE (``default`` if absent)."""
+    limit = request.args.get('limit')
+    try:
+        limit = int(limit) if limit is not None else default
+    except ValueError:
+        raise ValueError('Invalid limit')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginated_find(collection, query, sort_key, direction=ASCENDING, projection=None,
+                   default_limit=None):
+    """Run a list query honouring ?limit=, ?after= and ?fields=.
+
+    Pagination is keyset-based on ``(sort_key, _id)`` and the projection is
+    pushed down to Mongo. A fixed ``projection`` replaces ?fields=. With a
+    ``default_limit`` a request without ?limit= still gets one page of
+    that size. Returns ``(docs, next_cursor)``; ``next_cursor`` is None on
+    the last page or when no limit applies. Raises ValueError for
+    malformed parameters.
+    """
+    projection = parse_fields_param() if projection is None else dict(projection)
+    strip_sort_key = False
+    if projection is not None and sort_key not in projection and any(projection.values()):
+        projection[sort_key] = 1
+        strip_sort_key = True
+
+    after = request.args.get('after')
+    if not is_paginated_request() and default_limit is None:
+        docs = list(collection.find(query, projection))
+        next_cursor = None
+    else:
+        limit = page_limit(default_limit or MAX_PAGE_SIZE)
+        if after:
+            query = {'$and': [query, _keyset_filter(sort_key, direction, *decode_cursor(after))]}
+        docs = list(
+            collection.find(query, projection)
+            .sort([(sort_key, direction), ('_id', direction)])
+            .limit(limit + 1)
+        )
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(last.get(sort_key), last['_id'])
+
+    if strip_sort_key:
+        for doc in docs:
+            doc.pop(sort_key, None)
+    return docs, next_cursor
 
 
 def error_response(message, code=400):
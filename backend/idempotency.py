@@ -0,0 +1,117 @@
+# ============================================
+# FLAVOUR FLEET — Idempotency Keys
+# ============================================
+# Clients send an ``Idempotency-Key`` header on retry-prone POSTs
+# (checkout). The first request with a key reserves it and its response
+# is stored; repeats with the same key get that stored response back
+# without running the handler again. Keys are scoped per user and view
+# function (the same under /api and /api/v1) and expire after
+# IDEMPOTENCY_KEY_TTL_HOURS via a TTL index.
+# ============================================
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db import idempotency_col
+from helpers import get_user_id
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# A reservation older than this is assumed to belong to a crashed request
+# and may be taken over by a retry.
+LOCK_TIMEOUT_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT_SECONDS', '60'))
+
+
+def _fingerprint():
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+
+def _error(message, status):
+    return jsonify({'success': False, 'message': message}), status
+
+
+def _reserve(record_id, fingerprint):
+    """Claim a key; returns the existing record, or None if we now own it."""
+    now = datetime.utcnow()
+    try:
+        existing = idempotency_col.find_one_and_update(
+            {'_id': record_id},
+            {'$setOnInsert': {'fingerprint': fingerprint, 'locked_at': now, 'created_at': now}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:  # lost an upsert race for the same key
+        existing = idempotency_col.find_one({'_id': record_id})
+    if existing and 'response' not in existing and existing['locked_at'] < now - timedelta(
+        seconds=LOCK_TIMEOUT_SECONDS
+    ):
+        taken = idempotency_col.update_one(
+            {'_id': record_id, 'locked_at': existing['locked_at'], 'response': {'$exists': False}},
+            {'$set': {'locked_at': now}},
+        )
+        if taken.modified_count:
+            return None
+    return existing
+
+
+def _replay(record):
+    stored = record['response']
+    response = current_app.response_class(
+        stored['body'], status=stored['status'], mimetype=stored['mimetype']
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Replay the stored response for a repeated ``Idempotency-Key``.
+
+    Requests without the header run normally. 5xx responses and exceptions
+    release the key so the client can retry; anything else is stored.
+    Reusing a key with a different body is rejected with 422, and a repeat
+    that arrives while the first request is still running gets 409.
+    """
+
+    scope = f'{view.__module__}.{view.__name__}'
+
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error('Invalid Idempotency-Key', 400)
+
+        record_id = f'{get_user_id()}:{scope}:{key}'
+        fingerprint = _fingerprint()
+        existing = _reserve(record_id, fingerprint)
+        if existing:
+            if existing['fingerprint'] != fingerprint:
+                return _error('Idempotency-Key was already used for a different request', 422)
+            if 'response' not in existing:
+                return _error('A request with this Idempotency-Key is still in progress', 409)
+            return _replay(existing)
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            idempotency_col.delete_one({'_id': record_id})
+            raise
+        if response.status_code >= 500:
+            idempotency_col.delete_one({'_id': record_id})
+        else:
+            idempotency_col.update_one({'_id': record_id}, {'$set': {'response': {
+                'status': response.status_code,
+                'mimetype': response.mimetype,
+                'body': response.get_data(as_text=True),
+            }}})
+        return response
+
+    return decorated
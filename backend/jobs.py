@@ -0,0 +1,228 @@
+# ============================================
+# FLAVOUR FLEET — Background Jobs
+# ============================================
+# Post-commit side effects (emails, socket emits) run on a small, fixed
+# pool of worker threads instead of a new thread per request.
+#
+# Every job is first written to the job_outbox collection, so it
+# survives a restart; checkout writes its jobs in the same transaction
+# as the order. Workers claim a job atomically, delete it once it ran
+# and otherwise retry it with exponential backoff, up to
+# JOB_MAX_ATTEMPTS before it is parked as ``failed``. A poller picks up
+# retries, jobs that didn't fit in the in-process queue and jobs left
+# behind by other processes.
+#
+#   JOB_WORKERS=0 runs no threads; jobs wait in the outbox until
+#   `python backend/manage.py run-jobs` (used by the tests).
+# ============================================
+
+import atexit
+import os
+import queue
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from db import jobs_col
+from utils.email_service import is_email_configured, send_email
+from utils.logger import logger
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '1000'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+JOB_BACKOFF_SECONDS = float(os.getenv('JOB_BACKOFF_SECONDS', '2'))
+JOB_BACKOFF_MAX_SECONDS = 300
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv('JOB_POLL_INTERVAL_SECONDS', '5'))
+# A running job older than this is assumed lost with its process.
+JOB_LOCK_TIMEOUT_SECONDS = 300
+
+HANDLERS = {}
+
+
+def job(name):
+    """Register a function as the handler for jobs called ``name``."""
+    def register(fn):
+        HANDLERS[name] = fn
+        return fn
+    return register
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry ``attempts`` (exponential, jittered)."""
+    delay = min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobQueue:
+    """Durable outbox plus a bounded in-process queue and worker pool."""
+
+    def __init__(self, collection=jobs_col, workers=JOB_WORKERS, maxsize=JOB_QUEUE_SIZE):
+        self.collection = collection
+        self.workers = workers
+        self.stats = Counter()
+        self._queue = queue.Queue(maxsize)
+        self._app = None
+        self._running = False
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """Run handlers inside ``app``'s context and start the workers."""
+        self._app = app
+        if self.workers and not self._running:
+            self._running = True
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True).start()
+            threading.Thread(target=self._poll, name='job-poller', daemon=True).start()
+            atexit.register(self.close)
+
+    def enqueue(self, name, session=None, **payload):
+        """Write a job to the outbox and return its id.
+
+        Inside a transaction pass its ``session`` and call ``dispatch``
+        once it has committed; otherwise the job is dispatched now.
+        """
+        if name not in HANDLERS:
+            raise ValueError(f'Unknown job: {name}')
+        now = datetime.utcnow()
+        job_id = self.collection.insert_one({
+            'name': name,
+            'payload': payload,
+            'status': 'pending',
+            'attempts': 0,
+            'run_at': now,
+            'created_at': now,
+        }, session=session).inserted_id
+        self.stats['enqueued'] += 1
+        if session is None:
+            self.dispatch(job_id)
+        return job_id
+
+    def dispatch(self, job_id):
+        """Hand a committed job to the workers (the poller catches overflow)."""
+        if not self._running:
+            return
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            self.stats['overflowed'] += 1
+
+    def _claim(self, query):
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {**query, 'status': 'pending', 'run_at': {'$lte': now}},
+            {'$set': {'status': 'running', 'locked_at': now}, '$inc': {'attempts': 1}},
+            sort=[('run_at', 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _execute(self, doc):
+        try:
+            handler = HANDLERS[doc['name']]
+            if self._app is not None:
+                with self._app.app_context():
+                    handler(**doc['payload'])
+            else:
+                handler(**doc['payload'])
+        except Exception as e:
+            self._retry_or_park(doc, e)
+            return False
+        self.collection.delete_one({'_id': doc['_id']})
+        self.stats['succeeded'] += 1
+        return True
+
+    def _retry_or_park(self, doc, error):
+        update = {'last_error': f'{type(error).__name__}: {error}'}
+        if doc['attempts'] >= JOB_MAX_ATTEMPTS:
+            update['status'] = 'failed'
+            self.stats['failed'] += 1
+            logger.error('Job %s %s failed permanently: %s', doc['name'], doc['_id'], error)
+        else:
+            update['status'] = 'pending'
+            update['run_at'] = datetime.utcnow() + timedelta(seconds=backoff_delay(doc['attempts']))
+            self.stats['retried'] += 1
+            logger.warning('Job %s %s failed (attempt %s), will retry: %s',
+                           doc['name'], doc['_id'], doc['attempts'], error)
+        self.collection.update_one({'_id': doc['_id']}, {'$set': update})
+
+    def run_job(self, job_id):
+        """Run one job if it is still pending and due; returns True on success."""
+        doc = self._claim({'_id': job_id})
+        return self._execute(doc) if doc else False
+
+    def run_pending(self, limit=None):
+        """Run due jobs in this thread until none are left; returns the count run."""
+        self._requeue_stale()
+        ran = 0
+        while limit is None or ran < limit:
+            doc = self._claim({})
+            if not doc:
+                break
+            self._execute(doc)
+            ran += 1
+        return ran
+
+    def _requeue_stale(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_LOCK_TIMEOUT_SECONDS)
+        self.collection.update_many(
+            {'status': 'running', 'locked_at': {'$lt': cutoff}},
+            {'$set': {'status': 'pending'}},
+        )
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self.run_job(job_id)
+            except Exception as e:
+                logger.error('Job worker error for %s: %s', job_id, e)
+            finally:
+                self._queue.task_done()
+
+    def _poll(self):
+        while not self._stop.wait(JOB_POLL_INTERVAL_SECONDS):
+            try:
+                self._requeue_stale()
+                room = self._queue.maxsize - self._queue.qsize()
+                if room <= 0:
+                    continue
+                due = self.collection.find(
+                    {'status': 'pending', 'run_at': {'$lte': datetime.utcnow()}}, {'_id': 1}
+                ).sort('run_at', 1).limit(room)
+                for doc in due:
+                    self._queue.put_nowait(doc['_id'])
+            except queue.Full:
+                pass
+            except Exception as e:
+                logger.warning('Job poller error: %s', e)
+
+    def metrics(self):
+        """Queue depth, counters since start and outbox jobs by status."""
+        outbox = {
+            row['_id']: row['count']
+            for row in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+        }
+        return {
+            'workers': self.workers if self._running else 0,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            **{key: self.stats[key] for key in ('enqueued', 'succeeded', 'retried', 'failed', 'overflowed')},
+            'outbox': {status: outbox.get(status, 0) for status in ('pending', 'running', 'failed')},
+        }
+
+    def close(self):
+        self._stop.set()
+
+
+job_queue = JobQueue()
+
+
+@job('send_email')
+def send_email_job(to, subject, html):
+    if is_email_configured() and not send_email(to, subject, html):
+        raise RuntimeError(f'Email delivery to {to} failed')
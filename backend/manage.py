@@ -0,0 +1,146 @@
+# ============================================
+# FLAVOUR FLEET — Maintenance Commands
+# ============================================
+# Usage: python backend/manage.py <command>
+# Run `python backend/manage.py --help` for the list of commands.
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).parent / ".env")
+
+from utils.logger import logger
+
+
+def materialize_menu(args):
+    """Store canonical price and is_veg on menu documents."""
+    from catalog import bump_catalog_version
+    from routes.menu import MENU_CATALOG, materialize_menu_items
+
+    scanned, updated = materialize_menu_items(batch_size=args.batch_size)
+    if updated:
+        bump_catalog_version(MENU_CATALOG)
+    logger.info("Menu materialization: scanned=%s updated=%s", scanned, updated)
+
+
+def backfill_slugs(args):
+    """Generate unique URL slugs for restaurants that lack one."""
+    from catalog import bump_catalog_version
+    from routes.restaurants import RESTAURANTS_CATALOG, backfill_restaurant_slugs
+
+    updated = backfill_restaurant_slugs(batch_size=args.batch_size)
+    if updated:
+        bump_catalog_version(RESTAURANTS_CATALOG)
+    logger.info("Restaurant slug backfill: updated=%s", updated)
+
+
+def compact_carts(args):
+    """Delete expired guest carts and empty carts; stamp legacy carts for TTL."""
+    from cart_store import compact_carts as run_compaction
+
+    kwargs = {"ttl_seconds": int(args.ttl_days * 86400)} if args.ttl_days is not None else {}
+    stats = run_compaction(**kwargs)
+    logger.info(
+        "Cart compaction: reclaimed=%s (expired_guests=%s empty=%s) stamped=%s carts %s -> %s",
+        stats["expired_guests"] + stats["empty"],
+        stats["expired_guests"],
+        stats["empty"],
+        stats["stamped"],
+        stats["before"],
+        stats["after"],
+    )
+
+
+def migrate_timestamps(args):
+    """Convert ISO-string timestamps (created_at etc.) to BSON dates."""
+    from migrations import migrate_iso_timestamps
+
+    stats = migrate_iso_timestamps(batch_size=args.batch_size)
+    logger.info("Timestamp migration: updated=%s %s", sum(stats.values()), stats)
+
+
+def archive_orders(args):
+    """Move old delivered/cancelled orders to the orders_archive collection."""
+    from archive import ORDER_ARCHIVE_AFTER_DAYS, archive_orders as run_archive, hot_collection_report
+
+    before = hot_collection_report()
+    moved = run_archive(
+        older_than_days=args.days if args.days is not None else ORDER_ARCHIVE_AFTER_DAYS,
+        batch_size=args.batch_size,
+    )
+    after = hot_collection_report()
+    logger.info(
+        "Order archive: moved=%s orders %s -> %s, index bytes %s -> %s, data bytes %s -> %s",
+        moved,
+        before["count"],
+        after["count"],
+        before["total_index_size"],
+        after["total_index_size"],
+        before["size"],
+        after["size"],
+    )
+    for probe, ms in before["latency_ms"].items():
+        logger.info("Order archive: %s %.2fms -> %.2fms", probe, ms, after["latency_ms"][probe])
+
+
+def run_jobs(args):
+    """Run due background jobs from the outbox (emails, socket emits)."""
+    os.environ["JOB_WORKERS"] = "0"  # run them here, not on worker threads
+    import app  # noqa: F401  registers handlers and the app context
+    from jobs import job_queue
+
+    ran = job_queue.run_pending(limit=args.limit)
+    logger.info("Background jobs: ran=%s %s", ran, job_queue.metrics())
+
+
+COMMANDS = {
+    "materialize-menu": materialize_menu,
+    "backfill-slugs": backfill_slugs,
+    "compact-carts": compact_carts,
+    "migrate-timestamps": migrate_timestamps,
+    "archive-orders": archive_orders,
+    "run-jobs": run_jobs,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Flavour Fleet maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("materialize-menu", help=materialize_menu.__doc__)
+    p.add_argument("--batch-size", type=int, default=500)
+
+    p = sub.add_parser("backfill-slugs", help=backfill_slugs.__doc__)
+    p.add_argument("--batch-size", type=int, default=500)
+
+    p = sub.add_parser("compact-carts", help=compact_carts.__doc__)
+    p.add_argument(
+        "--ttl-days", type=float, default=None,
+        help="guest cart age to expire (default: GUEST_CART_TTL_DAYS)",
+    )
+
+    p = sub.add_parser("migrate-timestamps", help=migrate_timestamps.__doc__)
+    p.add_argument("--batch-size", type=int, default=500)
+
+    p = sub.add_parser("archive-orders", help=archive_orders.__doc__)
+    p.add_argument(
+        "--days", type=int, default=None,
+        help="order age to archive (default: ORDER_ARCHIVE_AFTER_DAYS)",
+    )
+    p.add_argument("--batch-size", type=int, default=500)
+
+    p = sub.add_parser("run-jobs", help=run_jobs.__doc__)
+    p.add_argument("--limit", type=int, default=None)
+
+    return parser
+
+
+if __name__ == "__main__":
+    cli_args = build_parser().parse_args()
+    COMMANDS[cli_args.command](cli_args)
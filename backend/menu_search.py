@@ -0,0 +1,207 @@
+# ============================================
+# FLAVOUR FLEET — In-Memory Menu Search Index
+# ============================================
+# Inverted index over public menu items (name + description tokens)
+# with prefix autocomplete and facet filters. Built from menu_col on
+# first use, patched in place by the admin menu endpoints, and rebuilt
+# whenever another worker has bumped the menu catalog version. The
+# version lookup is passed in, so this module needs no database.
+# ============================================
+
+import bisect
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text or '').lower())
+
+
+def is_public_item(item):
+    return not item.get('is_deleted') and item.get('active') is not False
+
+
+class MenuSearchIndex:
+    def __init__(self, current_version):
+        self.current_version = current_version  # () -> catalog version
+        self.version = None
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._postings = defaultdict(dict)  # token -> {doc_key: weight}
+        self._terms = []  # sorted token list for prefix lookups
+        self._by_category = defaultdict(set)
+        self._by_restaurant = defaultdict(set)
+        self._veg = set()
+        self._price = {}
+        self._rating = {}
+
+    # ─── Building ────────────────────────────────────
+    def rebuild(self, collection, query, version=None):
+        if version is None:
+            version = self.current_version()
+        items = list(collection.find(query))
+        with self._lock:
+            self._docs = {}
+            self._postings = defaultdict(dict)
+            self._by_category = defaultdict(set)
+            self._by_restaurant = defaultdict(set)
+            self._veg = set()
+            self._price = {}
+            self._rating = {}
+            for item in items:
+                self._add(item, maintain_terms=False)
+            self._terms = sorted(self._postings)
+            self.version = version
+        return len(items)
+
+    def ensure_fresh(self, collection, query):
+        if self.version != self.current_version():
+            self.rebuild(collection, query)
+
+    def apply_change(self, item, version):
+        """Patch one item after an admin write that produced ``version``.
+
+        Falls back to a lazy full rebuild when the index has missed other
+        bumps (e.g. edits made through another worker).
+        """
+        with self._lock:
+            if self.version is None or self.version != version - 1:
+                self.version = None
+                return
+            key = str(item['_id'])
+            self._remove(key)
+            if is_public_item(item):
+                self._add(item)
+            self.version = version
+
+    def _add(self, item, maintain_terms=True):
+        key = str(item['_id'])
+        doc = dict(item)
+        doc['_id'] = key
+        self._docs[key] = doc
+        self._by_category[doc.get('category')].add(key)
+        self._by_restaurant[doc.get('restaurant')].add(key)
+        if doc.get('is_veg'):
+            self._veg.add(key)
+        self._price[key] = float(doc.get('price') or 0)
+        self._rating[key] = float(doc.get('rating') or 0)
+
+        weights = Counter()
+        for token in tokenize(doc.get('name')):
+            weights[token] += NAME_WEIGHT
+        for token in tokenize(doc.get('description')):
+            weights[token] += DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            if maintain_terms and token not in self._postings:
+                bisect.insort(self._terms, token)
+            self._postings[token][key] = weight
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if not doc:
+            return
+        for groups, value in ((self._by_category, doc.get('category')),
+                              (self._by_restaurant, doc.get('restaurant'))):
+            groups[value].discard(key)
+            if not groups[value]:
+                del groups[value]
+        self._veg.discard(key)
+        self._price.pop(key, None)
+        self._rating.pop(key, None)
+        for token in set(tokenize(doc.get('name')) + tokenize(doc.get('description'))):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                i = bisect.bisect_left(self._terms, token)
+                if i < len(self._terms) and self._terms[i] == token:
+                    self._terms.pop(i)
+
+    # ─── Querying ────────────────────────────────────
+    def complete(self, prefix, limit=None):
+        """Indexed terms starting with ``prefix``, in lexical order."""
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + '\uffff')
+        terms = self._terms[start:end]
+        return terms if limit is None else terms[:limit]
+
+    def _score(self, tokens):
+        """Map doc key -> score for docs matching every token (last as prefix)."""
+        scores = None
+        for i, token in enumerate(tokens):
+            if i < len(tokens) - 1:
+                matched = self._postings.get(token, {})
+            else:
+                terms = self.complete(token)
+                if len(terms) == 1:
+                    matched = self._postings[terms[0]]
+                else:
+                    matched = {}
+                    for term in terms:
+                        for key, weight in self._postings[term].items():
+                            if weight > matched.get(key, 0):
+                                matched[key] = weight
+            if scores is None:
+                scores = matched
+            else:
+                smaller, larger = (matched, scores) if len(matched) < len(scores) else (scores, matched)
+                scores = {k: w + larger[k] for k, w in smaller.items() if k in larger}
+            if not scores:
+                return {}
+        return scores
+
+    def search(self, q='', category=None, is_veg=None, min_price=None,
+               max_price=None, restaurant=None, limit=20):
+        """Rank items matching the query and facet filters."""
+        tokens = tokenize(q)
+        with self._lock:
+            if tokens:
+                scores = self._score(tokens)
+                suggestions = self.complete(tokens[-1], limit=5)
+            else:
+                scores = dict.fromkeys(self._docs, 0)
+                suggestions = []
+
+            keys = set(scores)
+            if category:
+                keys = keys & self._by_category.get(category, set())
+            if restaurant:
+                keys = keys & self._by_restaurant.get(restaurant, set())
+            if is_veg is True:
+                keys = keys & self._veg
+            elif is_veg is False:
+                keys = keys - self._veg
+            if min_price is not None or max_price is not None:
+                low = float('-inf') if min_price is None else min_price
+                high = float('inf') if max_price is None else max_price
+                keys = {k for k in keys if low <= self._price[k] <= high}
+
+            top = heapq.nlargest(limit, keys, key=lambda k: (scores[k], self._rating[k]))
+            facets = {
+                'category': self._facet_counts(self._by_category, keys),
+                'restaurant': self._facet_counts(self._by_restaurant, keys),
+            }
+            return {
+                'items': [self._docs[k] for k in top],
+                'total': len(keys),
+                'suggestions': suggestions,
+                'facets': facets,
+            }
+
+    @staticmethod
+    def _facet_counts(groups, keys):
+        counts = {}
+        for value, members in groups.items():
+            n = len(members & keys)
+            if n:
+                counts[value] = n
+        return counts
@@ -0,0 +1,90 @@
+# ============================================
+# FLAVOUR FLEET — Data Migrations
+# ============================================
+# Online, batched, re-runnable data migrations driven from manage.py.
+# Each batch only rewrites a document if the value it read is still in
+# place, so the app can keep serving (and writing) while one runs.
+# ============================================
+
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from db import (
+    addresses_col, analytics_col, menu_col, offers_col, orders_col,
+    payments_col, reset_tokens_col, restaurants_col, users_col,
+)
+from utils.logger import logger
+
+# Fields that used to be written as datetime.utcnow().isoformat().
+# ``status_history.timestamp`` is a field inside each array element.
+ISO_TIMESTAMP_FIELDS = {
+    users_col: ['created_at'],
+    orders_col: ['created_at', 'status_history.timestamp'],
+    payments_col: ['created_at'],
+    reset_tokens_col: ['created_at'],
+    menu_col: ['created_at', 'deleted_at'],
+    restaurants_col: ['created_at', 'deleted_at'],
+    offers_col: ['created_at', 'deleted_at'],
+    addresses_col: ['created_at'],
+    analytics_col: ['computed_at'],
+}
+
+
+def _to_date(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value  # not an ISO timestamp; leave it alone
+    return value
+
+
+def _converted(doc, field):
+    """``(top_level_field, old_value, new_value)`` or None if nothing to do."""
+    top, _, sub = field.partition('.')
+    old = doc.get(top)
+    if sub:
+        if not isinstance(old, list):
+            return None
+        new = [
+            {**entry, sub: _to_date(entry[sub])} if isinstance(entry, dict) and sub in entry else entry
+            for entry in old
+        ]
+    else:
+        new = _to_date(old)
+    return None if new == old else (top, old, new)
+
+
+def migrate_collection_timestamps(collection, fields, batch_size=500):
+    """Convert ISO-string ``fields`` to BSON dates; returns documents updated."""
+    query = {'$or': [{field: {'$type': 'string'}} for field in fields]}
+    projection = {field.split('.')[0]: 1 for field in fields}
+    updated = 0
+    last_id = None
+    while True:
+        batch_query = query if last_id is None else {'$and': [query, {'_id': {'$gt': last_id}}]}
+        docs = list(collection.find(batch_query, projection).sort('_id', 1).limit(batch_size))
+        if not docs:
+            return updated
+        last_id = docs[-1]['_id']
+
+        ops = []
+        for doc in docs:
+            changes = [c for c in (_converted(doc, field) for field in fields) if c]
+            if changes:
+                ops.append(UpdateOne(
+                    {'_id': doc['_id'], **{top: old for top, old, _ in changes}},
+                    {'$set': {top: new for top, _, new in changes}},
+                ))
+        if ops:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+
+
+def migrate_iso_timestamps(batch_size=500):
+    """Run the timestamp migration on every collection; returns per-collection counts."""
+    stats = {}
+    for collection, fields in ISO_TIMESTAMP_FIELDS.items():
+        stats[collection.name] = migrate_collection_timestamps(collection, fields, batch_size)
+        logger.info('Timestamp migration: %s updated=%s', collection.name, stats[collection.name])
+    return stats
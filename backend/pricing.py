@@ -0,0 +1,50 @@
+# ============================================
+# FLAVOUR FLEET — Cart & Order Pricing Rules
+# ============================================
+# Single source of the delivery-fee and tax rules. Carts store the
+# totals produced here (or by the equivalent update-pipeline stages
+# below, for carts maintained inside MongoDB) so readers never have to
+# re-sum line items.
+# ============================================
+
+FREE_DELIVERY_ABOVE = 499
+DELIVERY_FEE = 49
+TAX_RATE = 0.05
+
+TOTAL_FIELDS = ('subtotal', 'delivery_fee', 'tax', 'item_count')
+
+
+def delivery_fee_for(subtotal):
+    return 0 if subtotal <= 0 or subtotal > FREE_DELIVERY_ABOVE else DELIVERY_FEE
+
+
+def cart_totals(items):
+    """Subtotal, delivery fee, tax and item count for priced line items."""
+    subtotal = sum(i.get('price', 0) * i.get('quantity', 0) for i in items)
+    return {
+        'subtotal': subtotal,
+        'delivery_fee': delivery_fee_for(subtotal),
+        'tax': round(subtotal * TAX_RATE, 2),
+        'item_count': sum(i.get('quantity', 0) for i in items),
+    }
+
+
+def cart_totals_stages(items_field='items'):
+    """Update-pipeline stages that recompute ``cart_totals`` in MongoDB."""
+    items = {'$ifNull': ['$' + items_field, []]}
+    return [
+        {'$set': {
+            'subtotal': {'$sum': {'$map': {
+                'input': items, 'as': 'i', 'in': {'$multiply': ['$$i.price', '$$i.quantity']},
+            }}},
+            'item_count': {'$sum': {'$map': {'input': items, 'as': 'i', 'in': '$$i.quantity'}}},
+        }},
+        {'$set': {
+            'delivery_fee': {'$cond': [
+                {'$and': [{'$gt': ['$subtotal', 0]}, {'$lte': ['$subtotal', FREE_DELIVERY_ABOVE]}]},
+                DELIVERY_FEE,
+                0,
+            ]},
+            'tax': {'$round': [{'$multiply': ['$subtotal', TAX_RATE]}, 2]},
+        }},
+    ]
@@ -16,8 +16,6 @@ addresses_bp = Blueprint('addresses', __name__, url_prefix='/api/addresses')
 def get_addresses():
     uid = get_user_id()
     addrs = list(addresses_col.find({'user_id': uid}).sort('is_default', -1))
-    for a in addrs:
-        a['_id'] = str(a['_id'])
     return jsonify({'success': True, 'addresses': addrs})
 
 
@@ -48,7 +46,7 @@ def add_address():
         'phone': data.get('phone', ''),
         'instructions': data.get('instructions', ''),
         'is_default': is_default,
-        'created_at': datetime.utcnow().isoformat(),
+        'created_at': datetime.utcnow(),
     }
     result = addresses_col.insert_one(address)
     address['_id'] = str(result.inserted_id)
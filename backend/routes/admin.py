@@ -3,19 +3,27 @@
 # ============================================
 
 import secrets
-import threading
 from datetime import datetime, timedelta
 
 from bson import ObjectId
 from flask import Blueprint, request, jsonify, session
+from pymongo import ReturnDocument
 
+from archive import aggregate_orders, archive_summary, find_order, order_breakdowns
 from db import (
     users_col, menu_col, restaurants_col,
-    orders_col, offers_col, settings_col
+    orders_col, orders_archive_col, offers_col, settings_col
 )
+from catalog import bump_catalog_version
 from helpers import admin_required, logger
+from jobs import job, job_queue, send_email_job
+from routes.menu import MENU_CATALOG, menu_search_index, normalize_menu_item
+from routes.offers import OFFERS_CATALOG
+from routes.orders import ORDER_TRANSITIONS, transition_order_status
+from routes.restaurants import (
+    RESTAURANTS_CATALOG, parse_location, resolve_restaurant_id, save_with_unique_slug
+)
 
-from utils.email_service import send_email
 from utils.email_templates import order_delivered_template
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
@@ -25,18 +33,17 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 @admin_bp.route('/stats', methods=['GET'])
 @admin_required
 def admin_stats():
-    total_orders = orders_col.count_documents({})
+    archived = archive_summary()
+    total_orders = orders_col.count_documents({}) + archived['count']
     total_users = users_col.count_documents({})
     total_menu = menu_col.count_documents({})
     total_restaurants = restaurants_col.count_documents({})
 
     pipeline = [{'$group': {'_id': None, 'total': {'$sum': '$total'}}}]
     rev_result = list(orders_col.aggregate(pipeline))
-    total_revenue = round(rev_result[0]['total'], 2) if rev_result else 0
+    total_revenue = round((rev_result[0]['total'] if rev_result else 0) + archived['revenue'], 2)
 
     recent_orders = list(orders_col.find().sort('created_at', -1).limit(5))
-    for o in recent_orders:
-        o['_id'] = str(o['_id'])
 
     return jsonify({
         'success': True,
@@ -55,6 +62,9 @@ def admin_stats():
 @admin_bp.route('/orders', methods=['GET'])
 @admin_required
 def admin_get_orders():
+    """List orders; ``?archived=1`` lists the archive, and a search with
+    no hits among current orders falls back to it."""
+    archived = request.args.get('archived') in ('1', 'true')
     status_filter = request.args.get('status')
     search = request.args.get('search', '')
     page = int(request.args.get('page', 1))
@@ -66,12 +76,31 @@ def admin_get_orders():
     if search:
         query['order_id'] = {'$regex': search, '$options': 'i'}
 
-    total = orders_col.count_documents(query)
-    orders = list(orders_col.find(query).sort('created_at', -1).skip((page - 1) * per_page).limit(per_page))
-    for o in orders:
-        o['_id'] = str(o['_id'])
+    collection = orders_archive_col if archived else orders_col
+    total = collection.count_documents(query)
+    if search and not total and not archived:
+        archive_total = orders_archive_col.count_documents(query)
+        if archive_total:
+            archived, collection, total = True, orders_archive_col, archive_total
+    orders = list(collection.find(query).sort('created_at', -1).skip((page - 1) * per_page).limit(per_page))
+
+    return jsonify({
+        'success': True, 'orders': orders, 'total': total, 'page': page, 'per_page': per_page,
+        'archived': archived,
+    })
+
 
-    return jsonify({'success': True, 'orders': orders, 'total': total, 'page': page, 'per_page': per_page})
+@job('order_delivered_email')
+def send_order_delivered(order_id, user_id=None):
+    if user_id is None:
+        user_id = (find_order({'order_id': order_id}, {'user_id': 1}) or {}).get('user_id', '')
+    user = users_col.find_one({'_id': ObjectId(user_id)}, {'name': 1, 'email': 1}) if ObjectId.is_valid(user_id) else None
+    if user and user.get('email'):
+        html = order_delivered_template(
+            user_name=user.get('name', 'Customer'),
+            order_id=order_id
+        )
+        send_email_job(user['email'], 'Order Delivered 🎉', html)
 
 
 @admin_bp.route('/orders/<order_id>', methods=['PUT'])
@@ -79,43 +108,29 @@ def admin_get_orders():
 def admin_update_order(order_id):
     data = request.get_json()
     new_status = data.get('status')
-    allowed = ['placed', 'preparing', 'out_for_delivery', 'delivered', 'cancelled']
-    if new_status not in allowed:
+    if new_status not in ORDER_TRANSITIONS:
         return jsonify({'success': False, 'message': 'Invalid status'}), 400
 
-    result = orders_col.update_one(
-        {'order_id': order_id},
-        {
-            '$set': {'status': new_status},
-            '$push': {'status_history': {'status': new_status, 'changed_by': session.get('user_id', 'system'), 'timestamp': datetime.utcnow().isoformat()}}
-        }
+    order = transition_order_status(
+        order_id, new_status, session.get('user_id', 'system'), data.get('expected_status')
     )
-    if result.matched_count == 0:
-        return jsonify({'success': False, 'message': 'Order not found'}), 404
-
-    # Emit real-time update to tracking clients
-    from flask import current_app
-    sio = current_app.config.get('socketio')
-    if sio:
-        from routes.realtime import emit_order_update
-        eta_map = {'placed': '30 min', 'preparing': '20 min', 'out_for_delivery': '10 min', 'delivered': 'Delivered!', 'cancelled': 'Cancelled'}
-        emit_order_update(sio, order_id, new_status, eta_map.get(new_status))
-
+    if order is None:
+        current = find_order({'order_id': order_id}, {'status': 1})
+        if not current:
+            return jsonify({'success': False, 'message': 'Order not found'}), 404
+        return jsonify({
+            'success': False,
+            'message': f"Cannot change order status from {current.get('status')} to {new_status}",
+            'status': current.get('status'),
+        }), 409
+
+    # Real-time update for tracking clients, then email on delivery
+    eta_map = {'placed': '30 min', 'preparing': '20 min', 'out_for_delivery': '10 min', 'delivered': 'Delivered!', 'cancelled': 'Cancelled'}
+    job_queue.enqueue('order_update', order_id=order_id, status=new_status, eta=eta_map.get(new_status))
     if new_status == 'delivered':
-        order = orders_col.find_one({'order_id': order_id})
-        if order:
-            user = users_col.find_one({'_id': ObjectId(order['user_id'])}) if ObjectId.is_valid(order.get('user_id', '')) else None
-            if user and user.get('email'):
-                html = order_delivered_template(
-                    user_name=user.get('name', 'Customer'),
-                    order_id=order_id
-                )
-                threading.Thread(
-                    target=send_email,
-                    args=(user['email'], 'Order Delivered 🎉', html)
-                ).start()
-
-    return jsonify({'success': True, 'message': f'Order status updated to {new_status}'})
+        job_queue.enqueue('order_delivered_email', order_id=order_id, user_id=order.get('user_id', ''))
+
+    return jsonify({'success': True, 'message': f'Order status updated to {new_status}', 'status': new_status})
 
 
 # ─── Menu ────────────────────────────────────────────
@@ -123,8 +138,6 @@ def admin_update_order(order_id):
 @admin_required
 def admin_get_menu():
     items = list(menu_col.find())
-    for item in items:
-        item['_id'] = str(item['_id'])
     return jsonify({'success': True, 'items': items, 'count': len(items)})
 
 
@@ -147,11 +160,14 @@ def admin_add_menu_item():
         'restaurant': data.get('restaurant', ''),
         'rating': float(data.get('rating', 4.5)),
         'badge': data.get('badge', ''),
+        'is_veg': data.get('is_veg'),
         'active': data.get('active', True),
-        'created_at': datetime.utcnow().isoformat(),
+        'created_at': datetime.utcnow(),
     }
+    normalize_menu_item(item)
     result = menu_col.insert_one(item)
     item['_id'] = str(result.inserted_id)
+    menu_search_index.apply_change(item, bump_catalog_version(MENU_CATALOG))
     return jsonify({'success': True, 'message': 'Menu item added', 'item': item}), 201
 
 
@@ -159,7 +175,7 @@ def admin_add_menu_item():
 @admin_required
 def admin_update_menu_item(item_id):
     data = request.get_json()
-    allowed = ['name', 'price', 'category', 'description', 'image', 'restaurant', 'rating', 'badge', 'active']
+    allowed = ['name', 'price', 'category', 'description', 'image', 'restaurant', 'rating', 'badge', 'is_veg', 'active']
     update_data = {k: v for k, v in data.items() if k in allowed}
     if 'price' in update_data:
         update_data['price'] = float(update_data['price'])
@@ -167,25 +183,36 @@ def admin_update_menu_item(item_id):
         update_data['rating'] = float(update_data['rating'])
 
     try:
-        result = menu_col.update_one({'_id': ObjectId(item_id)}, {'$set': update_data})
+        query = {'_id': ObjectId(item_id)}
     except Exception:
-        result = menu_col.update_one({'item_id': item_id}, {'$set': update_data})
+        query = {'item_id': item_id}
+    item = menu_col.find_one_and_update(query, {'$set': update_data}, return_document=ReturnDocument.AFTER)
 
-    if result.matched_count == 0:
+    if not item:
         return jsonify({'success': False, 'message': 'Item not found'}), 404
+
+    # Keep the stored document canonical so public reads stay pass-through
+    canonical = normalize_menu_item(dict(item))
+    drift = {k: canonical[k] for k in ('price', 'is_veg') if k in canonical and item.get(k) != canonical[k]}
+    if drift:
+        menu_col.update_one({'_id': item['_id']}, {'$set': drift})
+        item.update(drift)
+    menu_search_index.apply_change(item, bump_catalog_version(MENU_CATALOG))
     return jsonify({'success': True, 'message': 'Menu item updated'})
 
 
 @admin_bp.route('/menu/<item_id>', methods=['DELETE'])
 @admin_required
 def admin_delete_menu_item(item_id):
-    soft_delete = {'$set': {'is_deleted': True, 'deleted_at': datetime.utcnow().isoformat()}}
+    soft_delete = {'$set': {'is_deleted': True, 'deleted_at': datetime.utcnow()}}
     try:
-        result = menu_col.update_one({'_id': ObjectId(item_id)}, soft_delete)
+        query = {'_id': ObjectId(item_id)}
     except Exception:
-        result = menu_col.update_one({'item_id': item_id}, soft_delete)
-    if result.matched_count == 0:
+        query = {'item_id': item_id}
+    item = menu_col.find_one_and_update(query, soft_delete, return_document=ReturnDocument.AFTER)
+    if not item:
         return jsonify({'success': False, 'message': 'Item not found'}), 404
+    menu_search_index.apply_change(item, bump_catalog_version(MENU_CATALOG))
     return jsonify({'success': True, 'message': 'Menu item deleted'})
 
 
@@ -194,8 +221,6 @@ def admin_delete_menu_item(item_id):
 @admin_required
 def admin_get_restaurants():
     restaurants = list(restaurants_col.find())
-    for r in restaurants:
-        r['_id'] = str(r['_id'])
     return jsonify({'success': True, 'restaurants': restaurants, 'count': len(restaurants)})
 
 
@@ -216,10 +241,24 @@ def admin_add_restaurant():
         'image': data.get('image', 'assets/images/default.png'),
         'address': data.get('address', ''),
         'active': data.get('active', True),
-        'created_at': datetime.utcnow().isoformat(),
+        'created_at': datetime.utcnow(),
     }
-    result = restaurants_col.insert_one(restaurant)
+    try:
+        location = parse_location(data.get('location'))
+        if location:
+            restaurant['location'] = location
+        if data.get('delivery_radius_km') is not None:
+            restaurant['delivery_radius_km'] = float(data['delivery_radius_km'])
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid location'}), 400
+
+    def insert(slug):
+        restaurant['slug'] = slug
+        return restaurants_col.insert_one(restaurant)
+
+    result = save_with_unique_slug(data.get('slug') or data['name'], insert)
     restaurant['_id'] = str(result.inserted_id)
+    bump_catalog_version(RESTAURANTS_CATALOG)
     return jsonify({'success': True, 'message': 'Restaurant added', 'restaurant': restaurant}), 201
 
 
@@ -227,31 +266,63 @@ def admin_add_restaurant():
 @admin_required
 def admin_update_restaurant(restaurant_id):
     data = request.get_json()
-    allowed = ['name', 'category', 'description', 'rating', 'delivery_time', 'price_range', 'image', 'address', 'active']
+    allowed = ['name', 'slug', 'category', 'description', 'rating', 'delivery_time', 'price_range', 'image', 'address', 'active', 'location', 'delivery_radius_km']
     update_data = {k: v for k, v in data.items() if k in allowed}
     if 'rating' in update_data:
         update_data['rating'] = float(update_data['rating'])
 
+    object_id = resolve_restaurant_id(restaurant_id)
+    if object_id is None:
+        return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
+    # Slugs stay stable across renames so public URLs keep working
+    requested_slug = update_data.pop('slug', None)
     try:
-        result = restaurants_col.update_one({'_id': ObjectId(restaurant_id)}, {'$set': update_data})
-    except Exception:
-        result = restaurants_col.update_one({'name': restaurant_id}, {'$set': update_data})
+        if 'location' in update_data:
+            update_data['location'] = parse_location(update_data['location'])
+        if update_data.get('delivery_radius_km') is not None:
+            update_data['delivery_radius_km'] = float(update_data['delivery_radius_km'])
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid location'}), 400
+
+    # A null location/radius clears the field (a null 2dsphere key is invalid)
+    update = {}
+    unset_fields = {k: '' for k in ('location', 'delivery_radius_km') if k in update_data and update_data[k] is None}
+    set_fields = {k: v for k, v in update_data.items() if k not in unset_fields}
+    if set_fields:
+        update['$set'] = set_fields
+    if unset_fields:
+        update['$unset'] = unset_fields
+    if not update and not requested_slug:
+        return jsonify({'success': False, 'message': 'No valid fields to update'}), 400
+
+    if requested_slug:
+        result = save_with_unique_slug(
+            requested_slug,
+            lambda slug: restaurants_col.update_one(
+                {'_id': object_id}, {**update, '$set': {**update.get('$set', {}), 'slug': slug}}
+            ),
+            exclude_id=object_id,
+        )
+    else:
+        result = restaurants_col.update_one({'_id': object_id}, update)
 
     if result.matched_count == 0:
         return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
+    bump_catalog_version(RESTAURANTS_CATALOG)
     return jsonify({'success': True, 'message': 'Restaurant updated'})
 
 
 @admin_bp.route('/restaurants/<restaurant_id>', methods=['DELETE'])
 @admin_required
 def admin_delete_restaurant(restaurant_id):
-    soft_delete = {'$set': {'is_deleted': True, 'deleted_at': datetime.utcnow().isoformat()}}
-    try:
-        result = restaurants_col.update_one({'_id': ObjectId(restaurant_id)}, soft_delete)
-    except Exception:
-        result = restaurants_col.update_one({'name': restaurant_id}, soft_delete)
+    object_id = resolve_restaurant_id(restaurant_id)
+    if object_id is None:
+        return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
+    soft_delete = {'$set': {'is_deleted': True, 'deleted_at': datetime.utcnow()}}
+    result = restaurants_col.update_one({'_id': object_id}, soft_delete)
     if result.matched_count == 0:
         return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
+    bump_catalog_version(RESTAURANTS_CATALOG)
     return jsonify({'success': True, 'message': 'Restaurant deleted'})
 
 
@@ -260,8 +331,6 @@ def admin_delete_restaurant(restaurant_id):
 @admin_required
 def admin_get_offers():
     offers = list(offers_col.find())
-    for o in offers:
-        o['_id'] = str(o['_id'])
     return jsonify({'success': True, 'offers': offers, 'count': len(offers)})
 
 
@@ -287,10 +356,11 @@ def admin_add_offer():
         'tag': data.get('tag', ''),
         'min_order': float(data.get('min_order', 0)),
         'active': data.get('active', True),
-        'created_at': datetime.utcnow().isoformat(),
+        'created_at': datetime.utcnow(),
     }
     result = offers_col.insert_one(offer)
     offer['_id'] = str(result.inserted_id)
+    bump_catalog_version(OFFERS_CATALOG)
     return jsonify({'success': True, 'message': 'Offer created', 'offer': offer}), 201
 
 
@@ -310,19 +380,21 @@ def admin_update_offer(offer_id):
 
     if result.matched_count == 0:
         return jsonify({'success': False, 'message': 'Offer not found'}), 404
+    bump_catalog_version(OFFERS_CATALOG)
     return jsonify({'success': True, 'message': 'Offer updated'})
 
 
 @admin_bp.route('/offers/<offer_id>', methods=['DELETE'])
 @admin_required
 def admin_delete_offer(offer_id):
-    soft_delete = {'$set': {'is_deleted': True, 'deleted_at': datetime.utcnow().isoformat()}}
+    soft_delete = {'$set': {'is_deleted': True, 'deleted_at': datetime.utcnow()}}
     try:
         result = offers_col.update_one({'_id': ObjectId(offer_id)}, soft_delete)
     except Exception:
         result = offers_col.update_one({'code': offer_id}, soft_delete)
     if result.matched_count == 0:
         return jsonify({'success': False, 'message': 'Offer not found'}), 404
+    bump_catalog_version(OFFERS_CATALOG)
     return jsonify({'success': True, 'message': 'Offer deleted'})
 
 
@@ -345,9 +417,16 @@ def admin_get_users():
     users = list(users_col.find(query, {'password_hash': 0}).sort('created_at', -1).skip((page - 1) * per_page).limit(per_page))
 
     for u in users:
-        uid = str(u['_id'])
-        u['_id'] = uid
-        u['order_count'] = orders_col.count_documents({'user_id': uid})
+        u['_id'] = str(u['_id'])
+    order_counts = {
+        doc['_id']: doc['count']
+        for doc in aggregate_orders(
+            [{'$group': {'_id': '$user_id', 'count': {'$sum': 1}}}],
+            match={'user_id': {'$in': [u['_id'] for u in users]}},
+        )
+    }
+    for u in users:
+        u['order_count'] = order_counts.get(u['_id'], 0)
 
     return jsonify({'success': True, 'users': users, 'total': total, 'page': page})
 
@@ -371,32 +450,36 @@ def admin_update_user_role(user_id):
 @admin_required
 def admin_analytics():
     days = 14
-    daily_data = []
-
-    for i in range(days - 1, -1, -1):
-        day_start = (datetime.utcnow() - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-
-        day_orders = list(orders_col.find({
-            'created_at': {'$gte': day_start.isoformat(), '$lt': day_end.isoformat()}
-        }))
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = today - timedelta(days=days - 1)
+
+    # One pass over the window, bucketed by UTC day on the server
+    window = {'created_at': {'$gte': first_day, '$lt': today + timedelta(days=1)}}
+    daily_pipeline = [
+        {'$group': {
+            '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}},
+            'orders': {'$sum': 1},
+            'revenue': {'$sum': '$total'},
+        }},
+    ]
+    buckets = {doc['_id']: doc for doc in aggregate_orders(daily_pipeline, match=window)}
 
+    daily_data = []
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        bucket = buckets.get(day.strftime('%Y-%m-%d'), {})
         daily_data.append({
-            'date': day_start.strftime('%b %d'),
-            'orders': len(day_orders),
-            'revenue': round(sum(o.get('total', 0) for o in day_orders), 2)
+            'date': day.strftime('%b %d'),
+            'orders': bucket.get('orders', 0),
+            'revenue': round(bucket.get('revenue', 0), 2)
         })
 
-    status_pipeline = [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]
-    status_data = {doc['_id']: doc['count'] for doc in orders_col.aggregate(status_pipeline)}
-
-    top_pipeline = [
-        {'$unwind': '$items'},
-        {'$group': {'_id': '$items.name', 'count': {'$sum': '$items.quantity'}}},
-        {'$sort': {'count': -1}},
-        {'$limit': 5}
+    breakdowns = order_breakdowns()
+    status_data = {row['name']: row['count'] for row in breakdowns['status']}
+    top_items = [
+        {'name': row['name'], 'count': row['count']}
+        for row in sorted(breakdowns['items'], key=lambda row: -row['count'])[:5]
     ]
-    top_items = [{'name': doc['_id'], 'count': doc['count']} for doc in orders_col.aggregate(top_pipeline)]
 
     return jsonify({
         'success': True,
@@ -411,9 +494,7 @@ def admin_analytics():
 @admin_required
 def admin_get_settings():
     settings = settings_col.find_one({'key': 'platform'})
-    if settings:
-        settings['_id'] = str(settings['_id'])
-    else:
+    if not settings:
         settings = {
             'platform_name': 'Flavour Fleet',
             'delivery_fee': 4.99,
@@ -435,6 +516,14 @@ def admin_update_settings():
     return jsonify({'success': True, 'message': 'Settings saved'})
 
 
+# ─── Background Jobs ─────────────────────────────────
+@admin_bp.route('/jobs', methods=['GET'])
+@admin_required
+def admin_job_metrics():
+    """Background job queue depth, counters and outbox backlog."""
+    return jsonify({'success': True, 'jobs': job_queue.metrics()})
+
+
 # ─── Materialized Analytics Snapshots ────────────────
 @admin_bp.route('/analytics/snapshot', methods=['POST'])
 @admin_required
@@ -447,45 +536,39 @@ def build_analytics_snapshot():
 
     # Revenue totals
     revenue_pipeline = [
-        {'$match': {'created_at': {'$gte': today.isoformat(), '$lt': today_end.isoformat()}}},
+        {'$match': {'created_at': {'$gte': today, '$lt': today_end}}},
         {'$group': {'_id': None, 'revenue': {'$sum': '$total'}, 'count': {'$sum': 1}}}
     ]
     rev = list(orders_col.aggregate(revenue_pipeline))
     daily_revenue = round(rev[0]['revenue'], 2) if rev else 0
     daily_orders = rev[0]['count'] if rev else 0
 
-    # Top 10 items (all time)
-    top_pipeline = [
-        {'$unwind': '$items'},
-        {'$group': {'_id': '$items.name', 'count': {'$sum': '$items.quantity'}, 'revenue': {'$sum': {'$multiply': ['$items.price', '$items.quantity']}}}},
-        {'$sort': {'count': -1}},
-        {'$limit': 10}
-    ]
-    top_items = [{'name': d['_id'], 'count': d['count'], 'revenue': round(d['revenue'], 2)} for d in orders_col.aggregate(top_pipeline)]
+    # All-time breakdowns: hot orders aggregated, archived ones from its summary
+    breakdowns = order_breakdowns()
+
+    # Top 10 items
+    top_items = [{'name': d['name'], 'count': d['count'], 'revenue': round(d['revenue'], 2)}
+                 for d in sorted(breakdowns['items'], key=lambda d: -d['count'])[:10]]
 
     # Status breakdown
-    status_pipeline = [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]
-    status_data = {d['_id']: d['count'] for d in orders_col.aggregate(status_pipeline)}
+    status_data = {d['name']: d['count'] for d in breakdowns['status']}
 
     # Top restaurants by order count
-    rest_pipeline = [
-        {'$group': {'_id': '$restaurant', 'orders': {'$sum': 1}, 'revenue': {'$sum': '$total'}}},
-        {'$sort': {'orders': -1}},
-        {'$limit': 10}
-    ]
-    top_restaurants = [{'name': d['_id'], 'orders': d['orders'], 'revenue': round(d['revenue'], 2)} for d in orders_col.aggregate(rest_pipeline)]
+    top_restaurants = [{'name': d['name'], 'orders': d['orders'], 'revenue': round(d['revenue'], 2)}
+                       for d in sorted(breakdowns['restaurants'], key=lambda d: -d['orders'])[:10]]
 
+    archived = archive_summary()
     snapshot = {
         'date': today.strftime('%Y-%m-%d'),
         'daily_revenue': daily_revenue,
         'daily_orders': daily_orders,
-        'total_orders': orders_col.count_documents({}),
+        'total_orders': orders_col.count_documents({}) + archived['count'],
         'total_users': users_col.count_documents({}),
-        'total_revenue': round(sum(o.get('total', 0) for o in orders_col.find({}, {'total': 1})), 2),
+        'total_revenue': round(sum(o.get('total', 0) for o in orders_col.find({}, {'total': 1})) + archived['revenue'], 2),
         'status_breakdown': status_data,
         'top_items': top_items,
         'top_restaurants': top_restaurants,
-        'computed_at': datetime.utcnow().isoformat(),
+        'computed_at': datetime.utcnow(),
     }
 
     analytics_col.update_one(
@@ -506,7 +589,5 @@ def get_analytics_snapshots():
 
     days = int(request.args.get('days', 14))
     snapshots = list(analytics_col.find().sort('date', -1).limit(days))
-    for s in snapshots:
-        s['_id'] = str(s['_id'])
     return jsonify({'success': True, 'snapshots': snapshots})
 
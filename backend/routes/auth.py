@@ -5,16 +5,17 @@
 import os
 import base64
 import secrets
-import threading
 from datetime import datetime, timedelta
 
 from flask import Blueprint, request, jsonify, session
 import bcrypt
 
-from db import users_col, carts_col, reset_tokens_col
+from cart_store import cart_store
+from db import users_col, reset_tokens_col
 from helpers import get_user_id, login_required, logger
+from jobs import job_queue
 
-from utils.email_service import is_email_configured, send_email
+from utils.email_service import is_email_configured
 from utils.email_templates import password_reset_template
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
@@ -32,6 +33,13 @@ def should_expose_dev_reset_details():
     return False
 
 
+def merge_guest_cart(user_id):
+    """Fold this session's guest cart into the user's cart (login/register)."""
+    guest_id = session.get("guest_id")
+    if guest_id:
+        cart_store.merge(guest_id, user_id)
+
+
 # ─── Register ────────────────────────────────────────
 @auth_bp.route("/register", methods=["POST"])
 def register():
@@ -65,22 +73,13 @@ def register():
         "phone": "",
         "address": "",
         "role": "user",
-        "created_at": datetime.utcnow().isoformat(),
+        "created_at": datetime.utcnow(),
     }
     result = users_col.insert_one(user)
     user_id = str(result.inserted_id)
 
     # Transfer guest cart to user
-    guest_id = session.get("guest_id")
-    if guest_id:
-        guest_cart = carts_col.find_one({"user_id": guest_id})
-        if guest_cart and guest_cart.get("items"):
-            carts_col.update_one(
-                {"user_id": user_id},
-                {"$set": {"user_id": user_id, "items": guest_cart["items"]}},
-                upsert=True,
-            )
-            carts_col.delete_one({"user_id": guest_id})
+    merge_guest_cart(user_id)
 
     session["user_id"] = user_id
     session["user_name"] = name
@@ -118,30 +117,7 @@ def login():
     user_id = str(user["_id"])
 
     # Transfer guest cart to user
-    guest_id = session.get("guest_id")
-    if guest_id:
-        guest_cart = carts_col.find_one({"user_id": guest_id})
-        if guest_cart and guest_cart.get("items"):
-            user_cart = carts_col.find_one({"user_id": user_id})
-            if user_cart and user_cart.get("items"):
-                existing_ids = {item["id"] for item in user_cart["items"]}
-                for item in guest_cart["items"]:
-                    if item["id"] not in existing_ids:
-                        user_cart["items"].append(item)
-                    else:
-                        for existing in user_cart["items"]:
-                            if existing["id"] == item["id"]:
-                                existing["quantity"] += item["quantity"]
-                carts_col.update_one(
-                    {"user_id": user_id}, {"$set": {"items": user_cart["items"]}}
-                )
-            else:
-                carts_col.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"user_id": user_id, "items": guest_cart["items"]}},
-                    upsert=True,
-                )
-            carts_col.delete_one({"user_id": guest_id})
+    merge_guest_cart(user_id)
 
     session["user_id"] = user_id
     session["user_name"] = user["name"]
@@ -248,7 +224,7 @@ def forgot_password():
             "token": token,
             "code": reset_code,
             "expires_at": datetime.utcnow() + timedelta(minutes=15),
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": datetime.utcnow(),
         }
     )
     session["password_reset_token"] = token
@@ -258,9 +234,9 @@ def forgot_password():
         user_name=user.get("name", "User"), reset_code=reset_code
     )
     if is_email_configured():
-        threading.Thread(
-            target=send_email, args=(user["email"], "Password Reset Code 🔐", html)
-        ).start()
+        job_queue.enqueue(
+            "send_email", to=user["email"], subject="Password Reset Code 🔐", html=html
+        )
 
     logger.info(f"Password reset requested for: {email}")
 
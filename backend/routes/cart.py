@@ -3,81 +3,121 @@
 # ============================================
 
 from flask import Blueprint, request, jsonify
-from db import carts_col, menu_col
+
+from cart_store import cart_store, empty_cart, make_cart
+from catalog import get_catalog_version
 from helpers import get_user_id
-from routes.menu import normalize_menu_item
+from pricing import TOTAL_FIELDS
+from routes.menu import MENU_CATALOG, build_line_item, line_item_id, resolve_menu_items
 
 cart_bp = Blueprint('cart', __name__, url_prefix='/api/cart')
 
-
-def _get_menu_item(item_id):
-    return menu_col.find_one({
-        'item_id': item_id,
-        'is_deleted': {'$ne': True},
-        'active': {'$ne': False},
-    })
+MAX_CART_OPS = 100
+SYNC_ATTEMPTS = 3  # re-price retries when the cart changes underneath
 
 
-def _canonicalize_cart_item(data):
-    item_id = str(data.get('id') or data.get('item_id') or '').strip()
+def _canonicalize_cart_item(data, menu_items=None):
+    item_id = line_item_id(data)
     if not item_id:
         raise ValueError('Missing item id')
 
     quantity = max(1, int(data.get('quantity', 1) or 1))
-    menu_item = _get_menu_item(item_id)
-    if menu_item:
-        menu_item = normalize_menu_item(dict(menu_item))
-        return {
-            'id': menu_item.get('item_id', item_id),
-            'name': menu_item.get('name', data.get('name', 'Menu item')),
-            'price': float(menu_item.get('price', 0)),
-            'image': menu_item.get('image', data.get('image', '')),
-            'restaurant': menu_item.get('restaurant', data.get('restaurant', '')),
-            'quantity': quantity,
-        }
-
-    return {
-        'id': item_id,
-        'name': data.get('name', 'Menu item'),
-        'price': float(data.get('price', 0)),
-        'image': data.get('image', ''),
-        'restaurant': data.get('restaurant', ''),
-        'quantity': quantity,
-    }
-
-
-def _sync_cart_items(uid, items):
+    if menu_items is None:
+        menu_items = resolve_menu_items([item_id])
+    return build_line_item(data, item_id, quantity, menu_items.get(item_id))
+
+
+def _reprice(items):
     canonical_items = []
-    changed = False
+    menu_items = resolve_menu_items([line_item_id(item) for item in items])
 
     for item in items:
         try:
-            canonical = _canonicalize_cart_item(item)
+            canonical = _canonicalize_cart_item(item, menu_items)
         except (TypeError, ValueError):
-            changed = True
             continue
-
-        if canonical != item:
-            changed = True
         canonical_items.append(canonical)
+    return canonical_items
 
-    if changed:
-        carts_col.update_one(
-            {'user_id': uid},
-            {'$set': {'items': canonical_items}},
-            upsert=True,
-        )
 
-    return canonical_items
+def _sync_cart(uid, cart):
+    """Re-price cart lines against the menu unless already current.
+
+    Carts are stamped with the menu catalog version they were last
+    validated against, so lines are only re-checked after an admin menu
+    edit has bumped that version. The re-priced lines only replace the
+    cart if it is unchanged since it was read; a concurrent add re-reads
+    and re-prices instead of being overwritten.
+    """
+    version = get_catalog_version(MENU_CATALOG)
+    for _ in range(SYNC_ATTEMPTS):
+        if not cart:
+            return empty_cart()
+        if cart['catalog_version'] == version:
+            return cart
+        canonical_items = _reprice(cart['items'])
+        if cart_store.replace_if_unchanged(uid, cart, canonical_items, version):
+            return make_cart(canonical_items, version)
+        cart = cart_store.get(uid)
+    return make_cart(canonical_items, version)  # still contended; a later read stores it
+
+
+def _cart_payload(cart, **extra):
+    """Response body for a cart: its line items plus stored totals."""
+    totals = {field: cart[field] for field in TOTAL_FIELDS}
+    return jsonify({'success': True, **extra, 'items': cart['items'], 'totals': totals})
 
 
 @cart_bp.route('', methods=['GET'])
 def get_cart():
     uid = get_user_id()
-    cart = carts_col.find_one({'user_id': uid})
-    items = cart['items'] if cart and 'items' in cart else []
-    items = _sync_cart_items(uid, items)
-    return jsonify({'success': True, 'items': items})
+    return _cart_payload(_sync_cart(uid, cart_store.get(uid)))
+
+
+def _parse_cart_ops(raw_ops):
+    """Validate a PATCH op list into CartStore ops, pricing every add.
+
+    Raises ValueError/TypeError on any malformed op so nothing is applied.
+    """
+    if not isinstance(raw_ops, list) or not raw_ops or len(raw_ops) > MAX_CART_OPS:
+        raise ValueError('Invalid ops')
+
+    adds = [op for op in raw_ops if isinstance(op, dict) and op.get('op') == 'add']
+    menu_items = resolve_menu_items([line_item_id(op) for op in adds])
+
+    ops = []
+    for op in raw_ops:
+        if not isinstance(op, dict):
+            raise ValueError('Invalid op')
+        kind = op.get('op')
+        if kind == 'add':
+            ops.append(('add', _canonicalize_cart_item(op, menu_items)))
+            continue
+        item_id = line_item_id(op)
+        if not item_id:
+            raise ValueError('Missing item id')
+        if kind == 'set':
+            quantity = int(op.get('quantity'))
+            ops.append(('set', item_id, quantity) if quantity > 0 else ('remove', item_id))
+        elif kind == 'remove':
+            ops.append(('remove', item_id))
+        else:
+            raise ValueError('Unknown op')
+    return ops
+
+
+@cart_bp.route('', methods=['PATCH'])
+def patch_cart():
+    """Apply a batch of add / set / remove ops in a single cart write."""
+    uid = get_user_id()
+    data = request.get_json(silent=True) or {}
+    try:
+        ops = _parse_cart_ops(data.get('ops'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid cart operations'}), 400
+
+    cart = cart_store.apply_ops(uid, ops, get_catalog_version(MENU_CATALOG))
+    return _cart_payload(_sync_cart(uid, cart))
 
 
 @cart_bp.route('/add', methods=['POST'])
@@ -89,30 +129,8 @@ def add_to_cart():
     except (TypeError, ValueError):
         return jsonify({'success': False, 'message': 'Invalid cart item'}), 400
 
-    cart = carts_col.find_one({'user_id': uid})
-    if not cart:
-        carts_col.insert_one({'user_id': uid, 'items': [item]})
-    else:
-        items = _sync_cart_items(uid, cart.get('items', []))
-        existing = next((i for i in items if i['id'] == item['id']), None)
-        if existing:
-            carts_col.update_one(
-                {'user_id': uid, 'items.id': item['id']},
-                {'$inc': {'items.$.quantity': item['quantity']}}
-            )
-        else:
-            carts_col.update_one(
-                {'user_id': uid},
-                {'$push': {'items': item}}
-            )
-
-    updated = carts_col.find_one({'user_id': uid})
-    items = _sync_cart_items(uid, updated.get('items', []) if updated else [])
-    return jsonify({
-        'success': True,
-        'message': f"{item['name']} added to cart!",
-        'items': items,
-    })
+    cart = cart_store.add_item(uid, item, get_catalog_version(MENU_CATALOG))
+    return _cart_payload(_sync_cart(uid, cart), message=f"{item['name']} added to cart!")
 
 
 @cart_bp.route('/update', methods=['PUT'])
@@ -123,37 +141,21 @@ def update_cart_item():
     quantity = int(data.get('quantity', 1))
 
     if quantity <= 0:
-        carts_col.update_one(
-            {'user_id': uid},
-            {'$pull': {'items': {'id': item_id}}}
-        )
+        cart = cart_store.remove_item(uid, item_id)
     else:
-        carts_col.update_one(
-            {'user_id': uid, 'items.id': item_id},
-            {'$set': {'items.$.quantity': quantity}}
-        )
-
-    cart = carts_col.find_one({'user_id': uid})
-    items = cart['items'] if cart else []
-    items = _sync_cart_items(uid, items)
-    return jsonify({'success': True, 'items': items})
+        cart = cart_store.set_quantity(uid, item_id, quantity)
+    return _cart_payload(_sync_cart(uid, cart))
 
 
 @cart_bp.route('/remove/<item_id>', methods=['DELETE'])
 def remove_from_cart(item_id):
     uid = get_user_id()
-    carts_col.update_one(
-        {'user_id': uid},
-        {'$pull': {'items': {'id': item_id}}}
-    )
-    cart = carts_col.find_one({'user_id': uid})
-    items = cart['items'] if cart else []
-    items = _sync_cart_items(uid, items)
-    return jsonify({'success': True, 'message': 'Item removed', 'items': items})
+    cart = cart_store.remove_item(uid, item_id)
+    return _cart_payload(_sync_cart(uid, cart), message='Item removed')
 
 
 @cart_bp.route('/clear', methods=['DELETE'])
 def clear_cart():
     uid = get_user_id()
-    carts_col.update_one({'user_id': uid}, {'$set': {'items': []}})
+    cart_store.replace(uid, [], get_catalog_version(MENU_CATALOG))
     return jsonify({'success': True, 'message': 'Cart cleared'})
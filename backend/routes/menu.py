@@ -2,11 +2,18 @@
 # FLAVOUR FLEET — Menu Routes Blueprint
 # ============================================
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, has_request_context, request, jsonify
 from db import menu_col
+from catalog import CatalogCache, catalog_response, get_catalog_version
+from helpers import is_paginated_request, paginated_find
+from menu_search import MenuSearchIndex
 
 menu_bp = Blueprint('menu', __name__, url_prefix='/api/menu')
 
+MENU_CATALOG = 'menu'
+menu_cache = CatalogCache(MENU_CATALOG, max_entries=256)  # keyed by ?category=
+menu_search_index = MenuSearchIndex(lambda: get_catalog_version(MENU_CATALOG))
+
 VEG_ITEM_IDS = {
     'p1', 'p4', 'i3', 'i5', 'm3', 'pa2', 'pa3', 'c3',
     'sa2', 'sa3', 'd1', 'd2', 'd3', 'd4',
@@ -32,6 +39,51 @@ def build_public_menu_query():
     }
 
 
+def resolve_menu_items(item_ids):
+    """Fetch public menu items by ``item_id`` with a single ``$in`` query.
+
+    Results (including misses) are memoized on ``flask.g`` so repeated
+    lookups during one request cost no further round trips. Returns a
+    dict of item_id -> menu document for the ids that exist.
+    """
+    cache = g.setdefault('menu_items_by_id', {}) if has_request_context() else {}
+    wanted = {i for i in item_ids if i}
+    missing = [i for i in wanted if i not in cache]
+    if missing:
+        query = build_public_menu_query()
+        query['item_id'] = {'$in': missing}
+        found = {doc['item_id']: doc for doc in menu_col.find(query)}
+        for item_id in missing:
+            cache[item_id] = found.get(item_id)
+    return {i: cache[i] for i in wanted if cache[i] is not None}
+
+
+def line_item_id(data):
+    return str(data.get('id') or data.get('item_id') or '').strip()
+
+
+def build_line_item(data, item_id, quantity, menu_item=None):
+    """Cart/order line priced from the menu, falling back to client data."""
+    if menu_item:
+        return {
+            'id': menu_item.get('item_id', item_id),
+            'name': menu_item.get('name', data.get('name', 'Menu item')),
+            'price': float(menu_item.get('price', 0)),
+            'image': menu_item.get('image', data.get('image', '')),
+            'restaurant': menu_item.get('restaurant', data.get('restaurant', '')),
+            'quantity': quantity,
+        }
+
+    return {
+        'id': item_id,
+        'name': data.get('name', 'Menu item'),
+        'price': float(data.get('price', 0)),
+        'image': data.get('image', ''),
+        'restaurant': data.get('restaurant', ''),
+        'quantity': quantity,
+    }
+
+
 def infer_is_veg(item):
     explicit = item.get('is_veg')
     if explicit is not None:
@@ -47,6 +99,7 @@ def infer_is_veg(item):
 
 
 def normalize_menu_item(item):
+    """Apply canonical INR pricing and veg flag. Runs at write time only."""
     item_id = item.get('item_id')
     if item_id in INR_PRICE_BY_ITEM_ID:
         item['price'] = INR_PRICE_BY_ITEM_ID[item_id]
@@ -54,19 +107,107 @@ def normalize_menu_item(item):
     return item
 
 
-@menu_bp.route('', methods=['GET'])
-def get_menu():
-    category = request.args.get('category')
+def materialize_menu_items(batch_size=500):
+    """Store canonical price/is_veg on every menu document that lacks them.
+
+    Returns ``(scanned, updated)``. Safe to re-run: documents that are
+    already canonical are left untouched.
+    """
+    from pymongo import UpdateOne
+
+    scanned = updated = 0
+    ops = []
+    projection = {'item_id': 1, 'price': 1, 'is_veg': 1, 'badge': 1}
+    for item in menu_col.find({}, projection):
+        scanned += 1
+        canonical = normalize_menu_item(dict(item))
+        changes = {
+            field: canonical[field]
+            for field in ('price', 'is_veg')
+            if field in canonical
+            and (field not in item or item[field] != canonical[field])
+        }
+        if changes:
+            ops.append(UpdateOne({'_id': item['_id']}, {'$set': changes}))
+        if len(ops) >= batch_size:
+            updated += menu_col.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += menu_col.bulk_write(ops, ordered=False).modified_count
+    return scanned, updated
+
+
+def load_public_menu(category=None):
     query = build_public_menu_query()
-    if category and category != 'all':
+    if category:
         query['category'] = category
 
-    items = list(menu_col.find(query))
-    for item in items:
-        item['_id'] = str(item['_id'])
-        normalize_menu_item(item)
+    return list(menu_col.find(query))
+
 
-    return jsonify({'success': True, 'items': items, 'count': len(items)})
+@menu_bp.route('', methods=['GET'])
+def get_menu():
+    category = request.args.get('category') or None
+    if category == 'all':
+        category = None
+
+    if is_paginated_request() or 'fields' in request.args:
+        query = build_public_menu_query()
+        if category:
+            query['category'] = category
+
+        def build_page():
+            try:
+                items, next_cursor = paginated_find(menu_col, query, 'category')
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            payload = {'success': True, 'items': items, 'count': len(items)}
+            if is_paginated_request():
+                payload['next_cursor'] = next_cursor
+            return jsonify(payload)
+
+        return catalog_response(MENU_CATALOG, build_page)
+
+    def build():
+        items = menu_cache.get_or_load(category, lambda: load_public_menu(category))
+        return jsonify({'success': True, 'items': items, 'count': len(items)})
+
+    return catalog_response(MENU_CATALOG, build)
+
+
+def _parse_optional_float(name):
+    raw = request.args.get(name)
+    if raw in (None, ''):
+        return None
+    return float(raw)
+
+
+@menu_bp.route('/search', methods=['GET'])
+def search_menu():
+    q = request.args.get('q', '').strip()
+    category = request.args.get('category') or None
+    if category == 'all':
+        category = None
+    veg = request.args.get('veg')
+    is_veg = None if veg in (None, '') else veg.lower() in {'1', 'true', 'yes', 'veg'}
+    try:
+        min_price = _parse_optional_float('min_price')
+        max_price = _parse_optional_float('max_price')
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid search parameters'}), 400
+
+    menu_search_index.ensure_fresh(menu_col, build_public_menu_query())
+    result = menu_search_index.search(
+        q,
+        category=category,
+        is_veg=is_veg,
+        min_price=min_price,
+        max_price=max_price,
+        restaurant=request.args.get('restaurant') or None,
+        limit=limit,
+    )
+    return jsonify({'success': True, 'query': q, 'count': len(result['items']), **result})
 
 
 @menu_bp.route('/<item_id>', methods=['GET'])
@@ -76,6 +217,4 @@ def get_menu_item(item_id):
     item = menu_col.find_one(query)
     if not item:
         return jsonify({'success': False, 'message': 'Item not found'}), 404
-    item['_id'] = str(item['_id'])
-    normalize_menu_item(item)
     return jsonify({'success': True, 'item': item})
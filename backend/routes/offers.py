@@ -3,11 +3,15 @@
 # ============================================
 
 from flask import Blueprint, request, jsonify
-from db import offers_col, carts_col
-from helpers import get_user_id
+from cart_store import cart_store, empty_cart
+from db import offers_col
+from helpers import get_user_id, is_paginated_request, paginated_find
+from catalog import catalog_response
 
 offers_bp = Blueprint('offers', __name__, url_prefix='/api/offers')
 
+OFFERS_CATALOG = 'offers'
+
 
 def get_public_offer(code):
     return offers_col.find_one({
@@ -46,13 +50,21 @@ def calculate_offer_discount(offer, subtotal, delivery_fee=49):
 
 @offers_bp.route('', methods=['GET'])
 def get_offers():
-    offers = list(offers_col.find({
-        'is_deleted': {'$ne': True},
-        'active': {'$ne': False},
-    }))
-    for o in offers:
-        o['_id'] = str(o['_id'])
-    return jsonify({'success': True, 'offers': offers})
+    def build():
+        query = {
+            'is_deleted': {'$ne': True},
+            'active': {'$ne': False},
+        }
+        try:
+            offers, next_cursor = paginated_find(offers_col, query, 'code')
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        payload = {'success': True, 'offers': offers}
+        if is_paginated_request():
+            payload['next_cursor'] = next_cursor
+        return jsonify(payload)
+
+    return catalog_response(OFFERS_CATALOG, build)
 
 
 @offers_bp.route('/validate', methods=['POST'])
@@ -61,10 +73,9 @@ def validate_offer():
     code = data.get('code', '').upper().strip()
 
     uid = get_user_id()
-    cart = carts_col.find_one({'user_id': uid})
-    items = cart['items'] if cart and 'items' in cart else []
-    subtotal = sum(i['price'] * i['quantity'] for i in items)
-    delivery_fee = 0 if subtotal > 499 else 49
+    cart = cart_store.get(uid) or empty_cart()
+    subtotal = cart['subtotal']
+    delivery_fee = cart['delivery_fee']
 
     offer, error_message, error_status = validate_offer_for_subtotal(code, subtotal, delivery_fee)
     if error_message:
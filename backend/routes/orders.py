@@ -2,102 +2,152 @@
 # FLAVOUR FLEET — Orders Routes Blueprint
 # ============================================
 
-import secrets
-import threading
 from datetime import datetime
 
+from bson import ObjectId
 from flask import Blueprint, request, jsonify, session
-from db import carts_col, menu_col, orders_col, users_col
-from helpers import get_user_id, logger, login_required, token_required
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from archive import find_order
+from cart_store import cart_store
+from db import orders_archive_col, orders_col, payments_col, run_in_transaction, users_col
+from helpers import (
+    encode_cursor,
+    get_user_id,
+    logger,
+    login_required,
+    page_limit,
+    paginated_find,
+    token_required,
+)
+from idempotency import idempotent
+from jobs import job, job_queue, send_email_job
+from pricing import cart_totals
+from routes.menu import build_line_item, line_item_id, resolve_menu_items
 from routes.offers import calculate_offer_discount, validate_offer_for_subtotal
-from routes.menu import normalize_menu_item
+from routes.payments import record_payment
 
-from utils.email_service import send_email
 from utils.email_templates import order_confirmation_template
+from utils.order_ids import new_order_id
 
 orders_bp = Blueprint("orders", __name__, url_prefix="/api/orders")
 
+# Checkout attempts before an order id collision is treated as an error.
+ORDER_ID_ATTEMPTS = 3
+
+# Allowed status changes; delivered and cancelled orders are final.
+ORDER_TRANSITIONS = {
+    "placed": ("preparing", "cancelled"),
+    "preparing": ("out_for_delivery", "cancelled"),
+    "out_for_delivery": ("delivered", "cancelled"),
+    "delivered": (),
+    "cancelled": (),
+}
+STATUS_HISTORY_LIMIT = 20  # newest entries kept on the order
+ORDER_HISTORY_PAGE_SIZE = 20  # history page when no ?limit= is given
+
 
 def canonicalize_order_items(items):
     canonical_items = []
+    menu_items = resolve_menu_items([line_item_id(item) for item in items])
 
     for item in items:
-        item_id = str(item.get("id") or item.get("item_id") or "").strip()
+        item_id = line_item_id(item)
         if not item_id:
             continue
 
         quantity = max(1, int(item.get("quantity", 1) or 1))
-        menu_item = menu_col.find_one(
-            {
-                "item_id": item_id,
-                "is_deleted": {"$ne": True},
-                "active": {"$ne": False},
-            }
+        canonical_items.append(
+            build_line_item(item, item_id, quantity, menu_items.get(item_id))
         )
-        if menu_item:
-            menu_item = normalize_menu_item(dict(menu_item))
-            canonical_items.append(
-                {
-                    "id": menu_item.get("item_id", item_id),
-                    "name": menu_item.get("name", item.get("name", "Menu item")),
-                    "price": float(menu_item.get("price", 0)),
-                    "image": menu_item.get("image", item.get("image", "")),
-                    "restaurant": menu_item.get(
-                        "restaurant", item.get("restaurant", "")
-                    ),
-                    "quantity": quantity,
-                }
-            )
-        else:
-            canonical_items.append(
-                {
-                    "id": item_id,
-                    "name": item.get("name", "Menu item"),
-                    "price": float(item.get("price", 0)),
-                    "image": item.get("image", ""),
-                    "restaurant": item.get("restaurant", ""),
-                    "quantity": quantity,
-                }
-            )
 
     return canonical_items
 
 
+def transition_order_status(order_id, new_status, changed_by, expected_status=None):
+    """Atomically move an order to ``new_status`` if the transition is allowed.
+
+    Only the statuses that may lead to ``new_status`` (narrowed to
+    ``expected_status`` when the caller knows what it saw) match the
+    filter, so racing updates can't both apply from the same state.
+    Returns the updated order's ``user_id`` and ``status`` in the same
+    round trip, or None if the order is missing or can't make the change.
+    """
+    sources = [s for s, targets in ORDER_TRANSITIONS.items() if new_status in targets]
+    if expected_status is not None:
+        sources = [s for s in sources if s == expected_status]
+    if not sources:
+        return None
+    entry = {"status": new_status, "changed_by": changed_by, "timestamp": datetime.utcnow()}
+    return orders_col.find_one_and_update(
+        {"order_id": order_id, "status": {"$in": sources}},
+        {
+            "$set": {"status": new_status},
+            "$push": {"status_history": {"$each": [entry], "$slice": -STATUS_HISTORY_LIMIT}},
+        },
+        projection={"_id": 0, "user_id": 1, "status": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+@job("order_confirmation_email")
+def send_order_confirmation(order_id):
+    order = orders_col.find_one(
+        {"order_id": order_id}, {"user_id": 1, "items_summary": 1, "total": 1}
+    )
+    uid = (order or {}).get("user_id", "")
+    user = (
+        users_col.find_one({"_id": ObjectId(uid)}, {"name": 1, "email": 1})
+        if ObjectId.is_valid(uid)
+        else None
+    )
+    if user and user.get("email"):
+        html = order_confirmation_template(
+            user_name=user.get("name", "Customer"),
+            order_id=order_id,
+            items_summary=order["items_summary"],
+            total=order["total"],
+        )
+        send_email_job(user["email"], "Your Order is Confirmed 🍔", html)
+
+
+ORDER_PII_FIELDS = ("user_id", "phone", "address", "city", "zip", "name", "instructions")
+
+# Order history: full orders minus PII, or just what a list row shows.
+ORDER_HISTORY_PROJECTION = dict.fromkeys(ORDER_PII_FIELDS, 0)
+ORDER_COMPACT_PROJECTION = dict.fromkeys(
+    ("order_id", "status", "total", "items_summary", "created_at"), 1
+)
+
+
 def sanitize_order(order):
     """Return an API-safe order payload without sensitive PII fields."""
     clean = dict(order)
-    clean.pop("user_id", None)
-    clean.pop("phone", None)
-    clean.pop("address", None)
-    clean.pop("city", None)
-    clean.pop("zip", None)
-    clean.pop("name", None)
-    clean.pop("instructions", None)
-    if "_id" in clean:
-        clean["_id"] = str(clean["_id"])
+    for field in ORDER_PII_FIELDS:
+        clean.pop(field, None)
     return clean
 
 
-@orders_bp.route("", methods=["POST"])
-@login_required
-def place_order():
-    """Place new order (requires authentication)."""
-    uid = get_user_id()
-    data = request.get_json()
+class CheckoutRejected(Exception):
+    """Aborts checkout (and its transaction) with an API error response."""
 
-    # Get cart items
-    cart = carts_col.find_one({"user_id": uid})
-    if not cart or not cart.get("items"):
-        return jsonify({"success": False, "message": "Cart is empty"}), 400
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
 
-    items = canonicalize_order_items(cart["items"])
+
+def _create_order(uid, cart, data, txn):
+    """Price a claimed cart, then insert the order, its payment and its
+    confirmation email job. Returns ``(order, email_job_id)``."""
+    items = canonicalize_order_items(cart["items"]) if cart else []
     if not items:
-        return jsonify({"success": False, "message": "Cart is empty"}), 400
-    carts_col.update_one({"user_id": uid}, {"$set": {"items": items}})
+        raise CheckoutRejected("Cart is empty")
 
-    subtotal = sum(i["price"] * i["quantity"] for i in items)
-    delivery_fee = 0 if subtotal > 499 else 49
-    tax = round(subtotal * 0.05, 2)
+    totals = cart_totals(items)
+    subtotal = totals["subtotal"]
+    delivery_fee = totals["delivery_fee"]
+    tax = totals["tax"]
 
     # Server-side promo code re-validation (never trust client discount)
     promo_code = data.get("promo_code", "").upper().strip()
@@ -107,12 +157,12 @@ def place_order():
             promo_code, subtotal, delivery_fee
         )
         if error_message:
-            return jsonify({"success": False, "message": error_message}), error_status
+            raise CheckoutRejected(error_message, error_status)
         discount = calculate_offer_discount(offer, subtotal, delivery_fee)
 
     total = round(subtotal + delivery_fee + tax - discount, 2)
 
-    order_id = "ORD-" + secrets.token_hex(4).upper()
+    order_id = new_order_id()
 
     order = {
         "order_id": order_id,
@@ -127,7 +177,7 @@ def place_order():
         "total": total,
         "status": "preparing",
         "status_history": [
-            {"status": "preparing", "timestamp": datetime.utcnow().isoformat()}
+            {"status": "preparing", "timestamp": datetime.utcnow()}
         ],
         "address": data.get("address", ""),
         "phone": data.get("phone", ""),
@@ -137,43 +187,82 @@ def place_order():
         "instructions": data.get("instructions", ""),
         "payment_method": data.get("payment_method", "Credit Card"),
         "restaurant": items[0].get("restaurant", "Mixed"),
-        "created_at": datetime.utcnow().isoformat(),
+        "created_at": datetime.utcnow(),
     }
 
-    orders_col.insert_one(order)
+    orders_col.insert_one(order, session=txn)
+    try:
+        record_payment(
+            uid, order_id, total, order["payment_method"], session=txn
+        )
+        email_job = job_queue.enqueue(
+            "order_confirmation_email", session=txn, order_id=order_id
+        )
+    except Exception:
+        if txn is None:  # no transaction to roll the order back
+            orders_col.delete_one({"order_id": order_id})
+            payments_col.delete_many({"order_id": order_id})
+        raise
+    return order, email_job
 
-    # Clear cart
-    carts_col.update_one({"user_id": uid}, {"$set": {"items": []}})
 
-    # Record payment
-    from routes.payments import record_payment
+def _is_order_id_collision(exc):
+    key_pattern = (exc.details or {}).get("keyPattern") or {}
+    return "order_id" in key_pattern or "index: order_id_1 " in str(exc)
 
-    record_payment(uid, order_id, total, data.get("payment_method", "Credit Card"))
 
-    # Send order confirmation email (non-blocking)
-    user = (
-        users_col.find_one({"_id": session.get("user_id")})
-        if session.get("user_id")
-        else None
-    )
-    if not user:
-        from bson import ObjectId
+@orders_bp.route("", methods=["POST"])
+@login_required
+@idempotent
+def place_order():
+    """Place new order (requires authentication).
 
-        user = (
-            users_col.find_one({"_id": ObjectId(uid)})
-            if ObjectId.is_valid(uid)
-            else None
-        )
-    if user and user.get("email"):
-        html = order_confirmation_template(
-            user_name=user.get("name", "Customer"),
-            order_id=order_id,
-            items_summary=order["items_summary"],
-            total=total,
-        )
-        threading.Thread(
-            target=send_email, args=(user["email"], "Your Order is Confirmed 🍔", html)
-        ).start()
+    Claiming the cart, inserting the order and recording the payment run
+    in one transaction, so a failed checkout leaves no partial order and
+    the cart untouched. Retries carrying the same ``Idempotency-Key`` get
+    the first response back instead of placing another order.
+    """
+    uid = get_user_id()
+    data = request.get_json() or {}
+
+    def restore(cart):
+        if cart and cart["items"]:
+            cart_store.merge_lines(uid, cart["items"], cart["catalog_version"])
+
+    # Hot-tier stores aren't part of the transaction, which the driver may
+    # re-run, so their cart is claimed once up front and put back on failure.
+    held = None if cart_store.transactional else cart_store.claim(uid)
+
+    def checkout(txn):
+        if not cart_store.transactional:
+            return _create_order(uid, held, data, txn)
+        cart = cart_store.claim(uid, session=txn)
+        try:
+            return _create_order(uid, cart, data, txn)
+        except Exception:
+            if txn is None:  # no transaction to roll the claim back
+                restore(cart)
+            raise
+
+    try:
+        for attempt in range(1, ORDER_ID_ATTEMPTS + 1):
+            try:
+                order, email_job = run_in_transaction(checkout)
+                break
+            except CheckoutRejected as exc:
+                restore(held)
+                return jsonify({"success": False, "message": exc.message}), exc.status
+            except DuplicateKeyError as exc:
+                # The aborted attempt wrote nothing; retry with a fresh order id.
+                if not _is_order_id_collision(exc) or attempt == ORDER_ID_ATTEMPTS:
+                    raise
+                logger.warning("Order id collision for user %s, retrying", uid)
+    except Exception:
+        restore(held)
+        raise
+
+    order_id = order["order_id"]
+    job_queue.dispatch(email_job)
 
     # Return a sanitized order payload
     order = sanitize_order(order)
@@ -192,13 +281,46 @@ def place_order():
     )
 
 
+def _history_key(order):
+    created_at = order.get("created_at")
+    return (isinstance(created_at, datetime), created_at or "", order["_id"])
+
+
 @orders_bp.route("", methods=["GET"])
 @login_required
 def get_orders():
+    """Order history, newest first, including archived orders.
+
+    Always one page (``ORDER_HISTORY_PAGE_SIZE`` unless ``?limit=``);
+    ``?after=`` pages on by keyset on ``(created_at, _id)``.
+    ``?view=compact`` returns only the fields an order list row needs.
+    PII is excluded by the query projection.
+    """
     uid = get_user_id()
-    orders = list(orders_col.find({"user_id": uid}).sort("created_at", -1))
-    orders = [sanitize_order(o) for o in orders]
-    return jsonify({"success": True, "orders": orders})
+    query = {"user_id": uid}
+    if request.args.get("view") == "compact":
+        projection = ORDER_COMPACT_PROJECTION
+    else:
+        projection = ORDER_HISTORY_PROJECTION
+
+    # The same keyset page from both collections, merged and cut back.
+    try:
+        limit = page_limit(ORDER_HISTORY_PAGE_SIZE)
+        pages = [
+            paginated_find(
+                col, query, "created_at", DESCENDING,
+                projection=projection, default_limit=ORDER_HISTORY_PAGE_SIZE,
+            )
+            for col in (orders_col, orders_archive_col)
+        ]
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    orders = sorted(pages[0][0] + pages[1][0], key=_history_key, reverse=True)
+    next_cursor = None
+    if len(orders) > limit or any(cursor for _, cursor in pages):
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].get("created_at"), orders[-1]["_id"])
+    return jsonify({"success": True, "orders": orders, "next_cursor": next_cursor})
 
 
 @orders_bp.route("/<order_id>", methods=["GET"])
@@ -209,7 +331,7 @@ def get_order(order_id):
     if not current_user_id or current_user_id.startswith("guest_"):
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    order = orders_col.find_one({"order_id": order_id})
+    order = find_order({"order_id": order_id})
     if not order:
         return jsonify({"success": False, "message": "Order not found"}), 404
 
@@ -26,8 +26,6 @@ def get_payments():
         .skip((page - 1) * per_page)
         .limit(per_page)
     )
-    for r in records:
-        r['_id'] = str(r['_id'])
 
     return jsonify({
         'success': True,
@@ -46,21 +44,24 @@ def get_payment_by_order(order_id):
     record = payments_col.find_one({'order_id': order_id, 'user_id': uid})
     if not record:
         return jsonify({'success': False, 'message': 'Payment not found'}), 404
-    record['_id'] = str(record['_id'])
     return jsonify({'success': True, 'payment': record})
 
 
-def record_payment(user_id, order_id, amount, method, status='completed'):
-    """Record a payment — called internally from the orders blueprint."""
+def record_payment(user_id, order_id, amount, method, status='completed', session=None):
+    """Record a payment — called internally from the orders blueprint.
+
+    Pass the checkout transaction's ``session`` so the payment commits or
+    rolls back together with its order.
+    """
     payment = {
         'user_id': user_id,
         'order_id': order_id,
         'amount': round(amount, 2),
         'method': method,        # "UPI", "Credit Card", "Debit Card", "COD"
         'status': status,        # "completed", "pending", "failed", "refunded"
-        'created_at': datetime.utcnow().isoformat(),
+        'created_at': datetime.utcnow(),
     }
-    result = payments_col.insert_one(payment)
+    result = payments_col.insert_one(payment, session=session)
     payment['_id'] = str(result.inserted_id)
     logger.info('Payment recorded: %s amount=%.2f method=%s', order_id, amount, method)
     return payment
@@ -2,9 +2,11 @@
 # FLAVOUR FLEET — Real-Time Events (Socket.IO)
 # ============================================
 
+from flask import current_app
 from flask_socketio import emit, join_room
 
 from helpers import logger
+from jobs import job
 
 
 def register_socketio_events(socketio):
@@ -48,3 +50,11 @@ def emit_order_update(socketio, order_id, status, eta=None):
         logger.info("Emitted order update for %s: %s", room, status)
     except Exception as e:
         logger.error("Socket emit failed for %s: %s", room, e, exc_info=True)
+
+
+@job("order_update")
+def emit_order_update_job(order_id, status, eta=None):
+    """Background-job wrapper; uses the app's SocketIO instance."""
+    socketio = current_app.config.get("socketio")
+    if socketio:
+        emit_order_update(socketio, order_id, status, eta)
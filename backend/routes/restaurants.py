@@ -2,11 +2,119 @@
 # FLAVOUR FLEET — Restaurants Routes Blueprint
 # ============================================
 
+import os
+import re
+import unicodedata
+
+from bson import ObjectId
 from flask import Blueprint, request, jsonify
-from db import restaurants_col
+from db import menu_col, restaurants_col
+from catalog import CatalogCache, catalog_response
+from helpers import MAX_PAGE_SIZE, is_paginated_request, paginated_find
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
 
 restaurants_bp = Blueprint('restaurants', __name__, url_prefix='/api/restaurants')
 
+RESTAURANTS_CATALOG = 'restaurants'
+
+DEFAULT_SEARCH_RADIUS_KM = float(os.getenv('DEFAULT_SEARCH_RADIUS_KM', '10'))
+MAX_SEARCH_RADIUS_KM = 50
+
+SLUG_ATTEMPTS = 5  # writes before a slug collision is treated as an error
+
+# slug -> ObjectId (or None), dropped whenever the restaurants catalog changes
+slug_cache = CatalogCache(RESTAURANTS_CATALOG, max_entries=10000)
+
+
+def slugify(text):
+    """URL slug for ``text``; empty when nothing ASCII is left."""
+    normalized = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', normalized.lower()).strip('-')
+
+
+def _base_slug(name):
+    return slugify(name) or 'restaurant'
+
+
+def generate_unique_slug(name, exclude_id=None):
+    """Slug for ``name`` that no other restaurant uses (adds -2, -3, ...)."""
+    base = _base_slug(name)
+    pattern = '^' + re.escape(base) + r'(-\d+)?$'
+    query = {'slug': {'$regex': pattern}}
+    if exclude_id is not None:
+        query['_id'] = {'$ne': exclude_id}
+    taken = {doc['slug'] for doc in restaurants_col.find(query, {'slug': 1})}
+    if base not in taken:
+        return base
+    suffix = 2
+    while f'{base}-{suffix}' in taken:
+        suffix += 1
+    return f'{base}-{suffix}'
+
+
+def _is_slug_collision(exc):
+    key_pattern = (exc.details or {}).get('keyPattern') or {}
+    return 'slug' in key_pattern or 'index: slug_1 ' in str(exc)
+
+
+def save_with_unique_slug(name, write, exclude_id=None):
+    """Call ``write(slug)`` with a free slug for ``name`` and return its result.
+
+    The slug is picked by a read, so a concurrent create can take it
+    first; the unique index then rejects the write and the next free
+    suffix is tried.
+    """
+    for attempt in range(1, SLUG_ATTEMPTS + 1):
+        slug = generate_unique_slug(name, exclude_id=exclude_id)
+        try:
+            return write(slug)
+        except DuplicateKeyError as exc:
+            if not _is_slug_collision(exc) or attempt == SLUG_ATTEMPTS:
+                raise
+
+
+def backfill_restaurant_slugs(batch_size=500):
+    """Give every restaurant without a slug a unique one. Returns the count."""
+    from pymongo import UpdateOne
+
+    taken = {doc['slug'] for doc in restaurants_col.find({'slug': {'$exists': True}}, {'slug': 1})}
+    updated = 0
+    ops = []
+    for doc in restaurants_col.find({'slug': {'$exists': False}}, {'name': 1}).sort('_id', 1):
+        base = _base_slug(doc.get('name'))
+        slug, suffix = base, 2
+        while slug in taken:
+            slug, suffix = f'{base}-{suffix}', suffix + 1
+        taken.add(slug)
+        ops.append(UpdateOne({'_id': doc['_id'], 'slug': {'$exists': False}}, {'$set': {'slug': slug}}))
+        if len(ops) >= batch_size:
+            updated += restaurants_col.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += restaurants_col.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+def resolve_restaurant_id(identifier):
+    """Map an ObjectId string, slug or legacy name to a restaurant _id.
+
+    Slugs resolve with one indexed point read, cached per process until
+    the next admin edit. Legacy name URLs resolve through their slug;
+    identifiers with no slug characters at all resolve to nothing.
+    """
+    if ObjectId.is_valid(identifier):
+        return ObjectId(identifier)
+    slug = slugify(identifier)
+    if not slug:
+        return None
+
+    def load():
+        doc = restaurants_col.find_one({'slug': slug}, {'_id': 1})
+        return doc['_id'] if doc else None
+
+    return slug_cache.get_or_load(slug, load)
+
 
 def build_public_restaurant_query():
     return {
@@ -15,6 +123,57 @@ def build_public_restaurant_query():
     }
 
 
+def parse_location(value):
+    """Normalize a location payload to a GeoJSON Point.
+
+    Accepts ``{'lat': .., 'lng': ..}`` or a GeoJSON Point. Returns None for
+    an empty value and raises ValueError for anything malformed.
+    """
+    if value in (None, '', {}):
+        return None
+    if not isinstance(value, dict):
+        raise ValueError('location must be an object')
+    if value.get('type') == 'Point':
+        lng, lat = value.get('coordinates') or (None, None)
+    else:
+        lat, lng = value.get('lat'), value.get('lng')
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('location is out of range')
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
+
+def parse_near_param(raw):
+    lat, lng = (float(part) for part in raw.split(','))
+    return parse_location({'lat': lat, 'lng': lng})
+
+
+def find_restaurants_near(query, point, radius_km, limit):
+    """Restaurants within ``radius_km`` of ``point``, nearest first.
+
+    A restaurant's own ``delivery_radius_km`` (when set) further limits
+    whether it is returned for this location.
+    """
+    pipeline = [
+        {'$geoNear': {
+            'near': point,
+            'distanceField': 'distance_m',
+            'maxDistance': radius_km * 1000,
+            'query': query,
+            'spherical': True,
+        }},
+        {'$match': {'$expr': {'$lte': [
+            '$distance_m',
+            {'$multiply': [{'$ifNull': ['$delivery_radius_km', radius_km]}, 1000]},
+        ]}}},
+        {'$limit': limit},
+    ]
+    restaurants = list(restaurants_col.aggregate(pipeline))
+    for r in restaurants:
+        r['distance_km'] = round(r.pop('distance_m') / 1000, 2)
+    return restaurants
+
+
 @restaurants_bp.route('', methods=['GET'])
 def get_restaurants():
     category = request.args.get('category')
@@ -22,26 +181,70 @@ def get_restaurants():
     if category and category != 'all':
         query['category'] = category
 
-    restaurants = list(restaurants_col.find(query))
-    for r in restaurants:
-        r['_id'] = str(r['_id'])
+    if request.args.get('near'):
+        try:
+            point = parse_near_param(request.args['near'])
+            radius_km = float(request.args.get('radius_km', DEFAULT_SEARCH_RADIUS_KM))
+            limit = int(request.args.get('limit', MAX_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'near must be lat,lng with a numeric radius_km'}), 400
+        radius_km = max(0.1, min(radius_km, MAX_SEARCH_RADIUS_KM))
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        def build_near():
+            restaurants = find_restaurants_near(query, point, radius_km, limit)
+            return jsonify({'success': True, 'restaurants': restaurants, 'count': len(restaurants)})
+
+        return catalog_response(RESTAURANTS_CATALOG, build_near)
+
+    def build():
+        try:
+            restaurants, next_cursor = paginated_find(restaurants_col, query, 'rating', DESCENDING)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        payload = {'success': True, 'restaurants': restaurants, 'count': len(restaurants)}
+        if is_paginated_request():
+            payload['next_cursor'] = next_cursor
+        return jsonify(payload)
+
+    return catalog_response(RESTAURANTS_CATALOG, build)
 
-    return jsonify({'success': True, 'restaurants': restaurants, 'count': len(restaurants)})
+
+def find_restaurant_with_menu(query):
+    """Fetch one restaurant and its visible menu items in a single aggregation."""
+    from routes.menu import build_public_menu_query
+
+    pipeline = [
+        {'$match': query},
+        {'$limit': 1},
+        {'$lookup': {  # let/$expr rather than localField + pipeline (5.0+ only)
+            'from': menu_col.name,
+            'let': {'restaurant_name': '$name'},
+            'pipeline': [{'$match': {
+                '$expr': {'$eq': ['$restaurant', '$$restaurant_name']},
+                **build_public_menu_query(),
+            }}],
+            'as': 'menu',
+        }},
+    ]
+    return next(restaurants_col.aggregate(pipeline), None)
 
 
 @restaurants_bp.route('/<restaurant_id>', methods=['GET'])
 def get_restaurant(restaurant_id):
-    from bson import ObjectId
+    object_id = resolve_restaurant_id(restaurant_id)
+    if object_id is None:
+        return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
     query = build_public_restaurant_query()
-    try:
-        query['_id'] = ObjectId(restaurant_id)
-        restaurant = restaurants_col.find_one(query)
-    except Exception:
-        query['name'] = restaurant_id
+    query['_id'] = object_id
+
+    includes = set(request.args.get('include', '').split(','))
+    if 'menu' in includes:
+        restaurant = find_restaurant_with_menu(query)
+    else:
         restaurant = restaurants_col.find_one(query)
 
     if not restaurant:
         return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
 
-    restaurant['_id'] = str(restaurant['_id'])
     return jsonify({'success': True, 'restaurant': restaurant})
@@ -40,7 +40,7 @@ admin_user = {
     "phone": "",
     "address": "",
     "role": "admin",
-    "created_at": datetime.utcnow().isoformat(),
+    "created_at": datetime.utcnow(),
 }
 
 users_col.insert_one(admin_user)
@@ -4,6 +4,8 @@
 
 from pymongo import MongoClient
 
+from routes.menu import normalize_menu_item
+from routes.restaurants import slugify
 from utils.logger import logger
 
 client = MongoClient("mongodb://localhost:27017/")
@@ -345,7 +347,7 @@ def seed_menu_items():
             "description": "Deep-fried milk dumplings soaked in rose-scented sugar syrup",
         },
     ]
-    db.menu_items.insert_many(items)
+    db.menu_items.insert_many([normalize_menu_item(item) for item in items])
     logger.info("Seeded %s menu items", len(items))
 
 
@@ -453,6 +455,8 @@ def seed_restaurants():
             "description": "Artisan cakes, pastries, and decadent desserts",
         },
     ]
+    for restaurant in restaurants:
+        restaurant["slug"] = slugify(restaurant["name"])
     db.restaurants.insert_many(restaurants)
     logger.info("Seeded %s restaurants", len(restaurants))
 
@@ -614,4 +618,8 @@ if __name__ == "__main__":
     seed_menu_items()
     seed_restaurants()
     seed_offers()
+    from catalog import bump_catalog_version
+
+    for catalog_name in ("menu", "restaurants", "offers"):
+        bump_catalog_version(catalog_name)
     logger.info("Database seeded successfully")
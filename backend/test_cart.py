@@ -0,0 +1,323 @@
+"""Cart mutation tests (run against a local mongod)."""
+
+import os
+import threading
+
+import pytest
+
+from conftest import TEST_USER_ID, requires_mongo
+
+pytestmark = requires_mongo
+
+ITEMS = [
+    {"item_id": "cart_test_1", "name": "Cart Test Pizza", "price": 250,
+     "category": "cart-test", "restaurant": "Cart Kitchen", "is_veg": True},
+    {"item_id": "cart_test_2", "name": "Cart Test Burger", "price": 180,
+     "category": "cart-test", "restaurant": "Cart Kitchen", "is_veg": False},
+]
+
+
+# Write counts only apply when carts are stored directly in MongoDB.
+mongo_cart_store = pytest.mark.skipif(
+    os.getenv("CART_STORE", "mongo") != "mongo", reason="counts carts_col writes"
+)
+
+
+@pytest.fixture(autouse=True)
+def cart_menu():
+    from cart_store import cart_store
+    from db import menu_col
+
+    menu_col.delete_many({"category": "cart-test"})
+    menu_col.insert_many([dict(item) for item in ITEMS])
+    cart_store.delete(TEST_USER_ID)
+    yield
+    menu_col.delete_many({"category": "cart-test"})
+    cart_store.delete(TEST_USER_ID)
+
+
+def _quantities(response):
+    assert response.status_code == 200
+    return {item["id"]: item["quantity"] for item in response.get_json()["items"]}
+
+
+@mongo_cart_store
+def test_add_merges_quantities_in_one_write(client, round_trips):
+    assert _quantities(client.post("/api/cart/add", json={"id": "cart_test_1"})) == {
+        "cart_test_1": 1
+    }
+    assert round_trips.writes == 1
+
+    round_trips.reset()
+    response = client.post("/api/cart/add", json={"id": "cart_test_1", "quantity": 2})
+    assert _quantities(response) == {"cart_test_1": 3}
+    assert round_trips.writes == 1
+    assert round_trips.commands["findAndModify"] == 1
+
+
+def test_add_prices_from_menu(client):
+    response = client.post(
+        "/api/cart/add", json={"id": "cart_test_2", "price": 1, "name": "Spoofed"}
+    )
+    [item] = response.get_json()["items"]
+    assert item["price"] == 180.0
+    assert item["name"] == "Cart Test Burger"
+
+
+@mongo_cart_store
+def test_update_and_remove_cost_one_write_each(client, round_trips):
+    client.post("/api/cart/add", json={"id": "cart_test_1"})
+    client.post("/api/cart/add", json={"id": "cart_test_2"})
+
+    round_trips.reset()
+    response = client.put("/api/cart/update", json={"id": "cart_test_2", "quantity": 4})
+    assert _quantities(response) == {"cart_test_1": 1, "cart_test_2": 4}
+    assert round_trips.writes == 1
+
+    round_trips.reset()
+    response = client.delete("/api/cart/remove/cart_test_1")
+    assert _quantities(response) == {"cart_test_2": 4}
+    assert round_trips.writes == 1
+
+    round_trips.reset()
+    response = client.put("/api/cart/update", json={"id": "cart_test_2", "quantity": 0})
+    assert _quantities(response) == {}
+    assert round_trips.writes == 1
+
+
+def test_update_missing_line_leaves_cart_unchanged(client):
+    client.post("/api/cart/add", json={"id": "cart_test_1"})
+    response = client.put("/api/cart/update", json={"id": "not-in-cart", "quantity": 3})
+    assert _quantities(response) == {"cart_test_1": 1}
+
+
+@mongo_cart_store
+def test_get_skips_revalidation_until_menu_changes(client, admin_client, round_trips):
+    from db import menu_col
+
+    client.post("/api/cart/add", json={"id": "cart_test_1"})
+
+    round_trips.reset()
+    assert client.get("/api/cart").status_code == 200
+    assert dict(round_trips.commands) == {"find": 1}
+
+    menu_id = str(menu_col.find_one({"item_id": "cart_test_1"})["_id"])
+    admin_client.put(f"/api/admin/menu/{menu_id}", json={"price": 275})
+
+    [item] = client.get("/api/cart").get_json()["items"]
+    assert item["price"] == 275.0
+
+
+def test_repricing_does_not_overwrite_a_concurrent_add(client, admin_client, monkeypatch):
+    import routes.cart
+    from cart_store import cart_store
+    from db import menu_col
+
+    client.post("/api/cart/add", json={"id": "cart_test_1"})
+    menu_id = str(menu_col.find_one({"item_id": "cart_test_1"})["_id"])
+    admin_client.put(f"/api/admin/menu/{menu_id}", json={"price": 275})
+
+    real_reprice = routes.cart._reprice
+    calls = []
+
+    def reprice_racing_an_add(items):
+        calls.append(len(items))
+        if len(calls) == 1:  # another tab adds between our read and write
+            line = routes.cart._canonicalize_cart_item({"id": "cart_test_2"})
+            cart_store.add_item(TEST_USER_ID, line, None)
+        return real_reprice(items)
+
+    monkeypatch.setattr(routes.cart, "_reprice", reprice_racing_an_add)
+    items = client.get("/api/cart").get_json()["items"]
+
+    assert calls == [1, 2]
+    assert {item["id"]: item["price"] for item in items} == {"cart_test_1": 275.0, "cart_test_2": 180.0}
+    assert len(cart_store.get(TEST_USER_ID)["items"]) == 2
+
+
+@mongo_cart_store
+def test_patch_applies_ops_in_one_write(client, round_trips):
+    client.post("/api/cart/add", json={"id": "cart_test_1"})
+
+    round_trips.reset()
+    response = client.patch("/api/cart", json={"ops": [
+        {"op": "add", "id": "cart_test_2", "quantity": 2},
+        {"op": "set", "id": "cart_test_1", "quantity": 4},
+        {"op": "add", "id": "cart_test_2"},
+        {"op": "remove", "id": "not-in-cart"},
+    ]})
+    assert _quantities(response) == {"cart_test_1": 4, "cart_test_2": 3}
+    assert round_trips.writes == 1
+
+
+def test_patch_rejects_the_whole_batch_on_a_bad_op(client):
+    client.post("/api/cart/add", json={"id": "cart_test_1"})
+    response = client.patch("/api/cart", json={"ops": [
+        {"op": "set", "id": "cart_test_1", "quantity": 9},
+        {"op": "explode", "id": "cart_test_1"},
+    ]})
+    assert response.status_code == 400
+    assert _quantities(client.get("/api/cart")) == {"cart_test_1": 1}
+
+
+def test_cart_carries_server_totals(client):
+    response = client.post("/api/cart/add", json={"id": "cart_test_1"})
+    assert response.get_json()["totals"] == {
+        "subtotal": 250.0, "delivery_fee": 49, "tax": 12.5, "item_count": 1
+    }
+
+    response = client.put("/api/cart/update", json={"id": "cart_test_1", "quantity": 3})
+    assert response.get_json()["totals"] == {
+        "subtotal": 750.0, "delivery_fee": 0, "tax": 37.5, "item_count": 3
+    }
+    assert client.get("/api/cart").get_json()["totals"]["subtotal"] == 750.0
+
+
+# ─── Guest → user merge on login ─────────────────────
+GUEST_ID = "guest_merge_test"
+MERGE_EMAIL = "cart-merge@example.com"
+MERGE_PASSWORD = "merge-secret-1"
+
+
+def _line(i, quantity):
+    return {"id": f"merge_{i}", "name": f"Merge item {i}", "price": 10.0,
+            "image": "", "restaurant": "Cart Kitchen", "quantity": quantity}
+
+
+@pytest.fixture
+def shopper():
+    import bcrypt
+
+    from cart_store import cart_store
+    from db import users_col
+
+    users_col.delete_many({"email": MERGE_EMAIL})
+    password_hash = bcrypt.hashpw(MERGE_PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    user_id = str(users_col.insert_one({
+        "name": "Cart Merge", "email": MERGE_EMAIL, "password_hash": password_hash, "role": "user",
+    }).inserted_id)
+    yield user_id
+    users_col.delete_many({"email": MERGE_EMAIL})
+    cart_store.delete(user_id)
+    cart_store.delete(GUEST_ID)
+
+
+def _guest_tab(app):
+    tab = app.test_client()
+    with tab.session_transaction() as sess:
+        sess["guest_id"] = GUEST_ID
+    return tab
+
+
+def _login(tab):
+    response = tab.post("/api/auth/login", json={"email": MERGE_EMAIL, "password": MERGE_PASSWORD})
+    assert response.status_code == 200
+
+
+def test_login_merges_large_guest_cart(app, shopper):
+    from cart_store import cart_store
+
+    cart_store.replace(GUEST_ID, [_line(i, 2) for i in range(0, 300)])
+    cart_store.replace(shopper, [_line(i, 1) for i in range(150, 450)])
+
+    _login(_guest_tab(app))
+
+    cart = cart_store.get(shopper)
+    quantities = {line["id"]: line["quantity"] for line in cart["items"]}
+    assert len(quantities) == 450
+    assert quantities["merge_0"] == 2      # guest only
+    assert quantities["merge_200"] == 3    # in both carts
+    assert quantities["merge_400"] == 1    # user only
+    assert cart["item_count"] == 900
+    assert cart_store.get(GUEST_ID) is None
+
+
+def test_concurrent_logins_merge_guest_cart_once(app, shopper):
+    from cart_store import cart_store
+
+    cart_store.replace(GUEST_ID, [_line(i, 1) for i in range(20)])
+    cart_store.replace(shopper, [_line(0, 5)])
+    tabs = [_guest_tab(app), _guest_tab(app)]
+    barrier = threading.Barrier(len(tabs))
+
+    def login(tab):
+        barrier.wait()
+        _login(tab)
+
+    threads = [threading.Thread(target=login, args=(tab,)) for tab in tabs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cart = cart_store.get(shopper)
+    assert cart["item_count"] == 5 + 20
+    assert {line["id"]: line["quantity"] for line in cart["items"]}["merge_0"] == 6
+    assert cart_store.get(GUEST_ID) is None
+
+
+def test_failed_merge_keeps_guest_cart_for_retry(shopper, monkeypatch):
+    from cart_store import cart_store
+
+    cart_store.replace(GUEST_ID, [_line(1, 2)])
+
+    def broken_merge(*args, **kwargs):
+        raise RuntimeError("target write failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(cart_store, "merge_lines", broken_merge)
+        with pytest.raises(RuntimeError):
+            cart_store.merge(GUEST_ID, shopper)
+    assert cart_store.get(GUEST_ID)["items"] == [_line(1, 2)]
+
+    assert cart_store.merge(GUEST_ID, shopper)["items"] == [_line(1, 2)]
+    assert cart_store.get(GUEST_ID) is None
+
+
+def test_stale_merge_claim_is_taken_over(shopper):
+    from datetime import datetime, timedelta
+
+    from cart_store import MERGE_CLAIM_TIMEOUT_SECONDS, MongoCartStore
+    from db import carts_col
+
+    store = MongoCartStore()
+    store.replace(GUEST_ID, [_line(1, 2)])
+    try:
+        # Another worker is mid-merge: leave the guest cart to it.
+        carts_col.update_one({"user_id": GUEST_ID}, {"$set": {
+            "merging_into": "someone_else", "merging_at": datetime.utcnow(),
+        }})
+        store.merge(GUEST_ID, shopper)
+        assert store.get(GUEST_ID)["items"] == [_line(1, 2)]
+
+        # That worker died before deleting the guest cart.
+        died = datetime.utcnow() - timedelta(seconds=MERGE_CLAIM_TIMEOUT_SECONDS + 1)
+        carts_col.update_one({"user_id": GUEST_ID}, {"$set": {"merging_at": died}})
+        assert store.merge(GUEST_ID, shopper)["items"] == [_line(1, 2)]
+        assert store.get(GUEST_ID) is None
+    finally:
+        store.delete(GUEST_ID)
+        store.delete(shopper)
+
+
+def test_register_adopts_guest_cart(app):
+    from cart_store import cart_store
+    from db import users_col
+
+    users_col.delete_many({"email": "cart-register@example.com"})
+    cart_store.replace(GUEST_ID, [_line(1, 2)], 3)
+    tab = _guest_tab(app)
+    response = tab.post("/api/auth/register", json={
+        "name": "Cart Register", "email": "cart-register@example.com", "password": "Register-secret-1",
+    })
+    assert response.status_code == 201
+    user_id = response.get_json()["user"]["id"]
+
+    try:
+        cart = cart_store.get(user_id)
+        assert cart["items"] == [_line(1, 2)]
+        assert cart["catalog_version"] == 3
+        assert cart_store.get(GUEST_ID) is None
+    finally:
+        users_col.delete_many({"email": "cart-register@example.com"})
+        cart_store.delete(user_id)
@@ -0,0 +1,175 @@
+"""Write-behind cart store tests (run against a local mongod; Redis via fakeredis)."""
+
+import pytest
+
+from conftest import requires_mongo
+
+pytestmark = requires_mongo
+
+UID = "cart_store_test_user"
+LINE = {"id": "p1", "name": "Pizza", "price": 199.0, "image": "",
+        "restaurant": "Pizza Paradise", "quantity": 1}
+
+
+@pytest.fixture
+def carts():
+    from db import carts_col
+
+    carts_col.delete_one({"user_id": UID})
+    yield carts_col
+    carts_col.delete_one({"user_id": UID})
+
+
+def test_memory_store_serves_mutations_without_mongo(carts, round_trips):
+    from cart_store import MemoryCartStore, make_cart
+
+    store = MemoryCartStore()
+    assert store.get(UID) is None  # cold load from carts_col
+
+    round_trips.reset()
+    store.add_item(UID, LINE, 7)
+    store.add_item(UID, {**LINE, "quantity": 2}, 7)
+    cart = store.set_quantity(UID, "p1", 5)
+    assert cart == make_cart([{**LINE, "quantity": 5}], 7)
+    assert cart["subtotal"] == 995.0 and cart["item_count"] == 5
+    assert round_trips.total == 0
+    assert carts.find_one({"user_id": UID}) is None
+
+    assert store.flush() == 1
+    doc = carts.find_one({"user_id": UID})
+    assert doc["items"] == [{**LINE, "quantity": 5}]
+    assert doc["catalog_version"] == 7
+    assert doc["subtotal"] == 995.0
+    assert store.flush() == 0
+
+
+def test_memory_store_loads_existing_cart_and_flushes_delete(carts):
+    from cart_store import MemoryCartStore, make_cart
+
+    carts.insert_one({"user_id": UID, "items": [LINE], "catalog_version": 3})
+    store = MemoryCartStore()
+
+    assert store.get(UID) == make_cart([LINE], 3)  # totals filled in for legacy docs
+    store.delete(UID)
+    assert store.get(UID) is None
+    store.flush()
+    assert carts.find_one({"user_id": UID}) is None
+
+
+def test_compact_carts_reclaims_expired_and_empty_carts(carts):
+    from datetime import datetime, timedelta
+
+    from cart_store import compact_carts
+
+    old = datetime.utcnow() - timedelta(days=30)
+    carts.delete_many({"user_id": {"$regex": "^(guest_compact|compact_)"}})
+    carts.insert_many([
+        {"user_id": "guest_compact_old", "items": [LINE], "is_guest": True, "updated_at": old},
+        {"user_id": "guest_compact_new", "items": [LINE], "is_guest": True,
+         "updated_at": datetime.utcnow()},
+        {"user_id": "compact_user_old", "items": [LINE], "is_guest": False, "updated_at": old},
+        {"user_id": "compact_user_empty", "items": []},
+        {"user_id": "guest_compact_legacy", "items": [LINE]},
+    ])
+
+    stats = compact_carts(ttl_seconds=7 * 86400)
+
+    remaining = {
+        doc["user_id"]: doc
+        for doc in carts.find({"user_id": {"$regex": "^(guest_compact|compact_)"}})
+    }
+    assert set(remaining) == {"guest_compact_new", "compact_user_old", "guest_compact_legacy"}
+    assert remaining["guest_compact_legacy"]["is_guest"] is True
+    assert "updated_at" in remaining["guest_compact_legacy"]
+    assert stats["empty"] >= 1 and stats["stamped"] >= 1
+    carts.delete_many({"user_id": {"$regex": "^(guest_compact|compact_)"}})
+
+
+def test_mongo_store_stamps_guest_carts_for_ttl(carts):
+    from cart_store import MongoCartStore
+
+    store = MongoCartStore()
+    store.add_item("guest_ttl_test", LINE, 1)
+    doc = carts.find_one({"user_id": "guest_ttl_test"})
+    assert doc["is_guest"] is True and doc["updated_at"]
+    store.delete("guest_ttl_test")
+
+    store.replace(UID, [LINE])
+    assert carts.find_one({"user_id": UID})["is_guest"] is False
+
+
+GUEST = "guest_cart_store_test"
+SIDE = {"id": "p2", "name": "Garlic Bread", "price": 99.0, "image": "",
+        "restaurant": "Pizza Paradise", "quantity": 1}
+
+
+@pytest.fixture
+def redis_store(carts, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs the quantity script with it
+    import redis
+
+    from cart_store import RedisCartStore
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", classmethod(
+        lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)
+    ))
+    carts.delete_one({"user_id": GUEST})
+    yield RedisCartStore("redis://fake")
+    carts.delete_one({"user_id": GUEST})
+
+
+def test_redis_store_applies_add_set_and_remove(redis_store):
+    from cart_store import make_cart
+
+    cart = redis_store.apply_ops(UID, [
+        ("add", LINE), ("add", {**LINE, "quantity": 2}), ("add", SIDE),
+    ], 7)
+    assert cart == make_cart([{**LINE, "quantity": 3}, SIDE], 7)
+
+    cart = redis_store.apply_ops(UID, [("set", "p1", 5), ("set", "gone", 4), ("remove", "p2")])
+    assert cart == make_cart([{**LINE, "quantity": 5}], 7)  # no line made for "gone"
+    assert redis_store.get(UID) == cart
+
+
+def test_redis_store_merges_guest_cart_once(redis_store):
+    from cart_store import make_cart
+
+    redis_store.add_item(GUEST, {**LINE, "quantity": 2}, 7)
+    redis_store.add_item(GUEST, SIDE, 7)
+    redis_store.add_item(UID, LINE, 7)
+
+    cart = redis_store.merge(GUEST, UID)
+    assert cart == make_cart([{**LINE, "quantity": 3}, SIDE], 7)
+    assert redis_store.get(GUEST) is None
+    assert redis_store.merge(GUEST, UID) == cart  # a repeated login adds nothing
+
+
+def test_redis_store_flushes_dirty_carts_to_mongo(redis_store, carts):
+    redis_store.add_item(UID, LINE, 7)
+    assert carts.find_one({"user_id": UID}) is None
+
+    assert redis_store.flush() == 1
+    doc = carts.find_one({"user_id": UID})
+    assert doc["items"] == [LINE] and doc["catalog_version"] == 7
+    assert redis_store.flush() == 0
+
+    assert redis_store.take(UID)["items"] == [LINE]
+    assert redis_store.flush() == 1
+    assert carts.find_one({"user_id": UID}) is None
+
+
+def test_redis_store_replace_if_unchanged_detects_a_concurrent_add(redis_store):
+    from cart_store import make_cart
+
+    redis_store.add_item(UID, LINE, 7)
+    seen = redis_store.get(UID)
+    redis_store.add_item(UID, SIDE, 7)
+
+    assert not redis_store.replace_if_unchanged(UID, seen, [{**LINE, "price": 149.0}], 8)
+    assert redis_store.get(UID) == make_cart([LINE, SIDE], 7)
+
+    fresh = redis_store.get(UID)
+    assert redis_store.replace_if_unchanged(UID, fresh, [{**LINE, "price": 149.0}], 8)
+    assert redis_store.get(UID) == make_cart([{**LINE, "price": 149.0}], 8)
@@ -0,0 +1,94 @@
+"""Background job queue tests (run against a local mongod)."""
+
+from datetime import datetime
+
+import pytest
+
+from conftest import requires_mongo
+
+pytestmark = requires_mongo
+
+
+@pytest.fixture
+def jobs(app):
+    from db import jobs_col
+    from jobs import HANDLERS, JobQueue
+
+    calls = []
+
+    def flaky(n, fail_times=0):
+        calls.append(n)
+        if len(calls) <= fail_times:
+            raise RuntimeError("temporary failure")
+
+    HANDLERS["test_flaky"] = flaky
+    queue = JobQueue(workers=0)
+    queue.init_app(app)
+    queue.calls = calls
+    created = []
+    enqueue = queue.enqueue
+
+    def tracked_enqueue(name, session=None, **payload):
+        job_id = enqueue(name, session=session, **payload)
+        created.append(job_id)
+        return job_id
+
+    queue.enqueue = tracked_enqueue
+    yield queue
+    jobs_col.delete_many({"_id": {"$in": created}})
+    HANDLERS.pop("test_flaky", None)
+
+
+def _make_due(job_id):
+    from db import jobs_col
+
+    jobs_col.update_one({"_id": job_id}, {"$set": {"run_at": datetime.utcnow()}})
+
+
+def test_job_waits_in_outbox_until_run(jobs):
+    from db import jobs_col
+
+    job_id = jobs.enqueue("test_flaky", n=1)
+    assert jobs_col.find_one({"_id": job_id})["status"] == "pending"
+
+    assert jobs.run_pending() == 1
+    assert jobs.calls == [1]
+    assert jobs_col.find_one({"_id": job_id}) is None
+    assert jobs.stats["succeeded"] == 1
+
+
+def test_failed_job_is_retried_with_backoff(jobs):
+    from db import jobs_col
+
+    job_id = jobs.enqueue("test_flaky", n=2, fail_times=1)
+    jobs.run_pending()
+    doc = jobs_col.find_one({"_id": job_id})
+    assert doc["status"] == "pending"
+    assert doc["attempts"] == 1
+    assert doc["run_at"] > datetime.utcnow()
+    assert jobs.run_pending() == 0  # not due yet
+
+    _make_due(job_id)
+    assert jobs.run_pending() == 1
+    assert jobs.calls == [2, 2]
+    assert jobs_col.find_one({"_id": job_id}) is None
+
+
+def test_job_is_parked_after_max_attempts(jobs):
+    from db import jobs_col
+    from jobs import JOB_MAX_ATTEMPTS
+
+    job_id = jobs.enqueue("test_flaky", n=3, fail_times=JOB_MAX_ATTEMPTS)
+    for _ in range(JOB_MAX_ATTEMPTS):
+        _make_due(job_id)
+        jobs.run_pending()
+
+    doc = jobs_col.find_one({"_id": job_id})
+    assert doc["status"] == "failed"
+    assert "temporary failure" in doc["last_error"]
+    assert jobs.metrics()["outbox"]["failed"] >= 1
+
+
+def test_unknown_job_is_rejected(jobs):
+    with pytest.raises(ValueError):
+        jobs.enqueue("no_such_job")
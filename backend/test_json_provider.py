@@ -0,0 +1,85 @@
+"""JSON provider tests (no database needed)."""
+
+import datetime
+import decimal
+import json
+
+import pytest
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils.json_provider import MongoJSONProvider
+
+OID = ObjectId("64b000000000000000000001")
+DOC = {
+    "_id": OID,
+    "ids": [OID],
+    "created_at": datetime.datetime(2026, 1, 2, 3, 4, 5, 678000),
+    "day": datetime.date(2026, 1, 2),
+    "price": Decimal128("12.50"),
+    "tax": decimal.Decimal("1.25"),
+    "nested": {"at": datetime.datetime(2026, 1, 2, 3, 4, 5)},
+    "name": "Café ☕",
+}
+EXPECTED = {
+    "_id": "64b000000000000000000001",
+    "ids": ["64b000000000000000000001"],
+    "created_at": "2026-01-02T03:04:05.678000",
+    "day": "2026-01-02",
+    "price": 12.5,
+    "tax": 1.25,
+    "nested": {"at": "2026-01-02T03:04:05"},
+    "name": "Café ☕",
+}
+
+
+@pytest.fixture
+def json_app():
+    app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
+    return app
+
+
+@pytest.fixture
+def provider(json_app):
+    return json_app.json
+
+
+def test_bson_types_encode_to_plain_json(provider):
+    assert json.loads(provider.dumps(DOC)) == EXPECTED
+
+
+def test_kwargs_fall_back_to_the_stdlib_encoder_with_the_same_output(provider):
+    fallback = provider.dumps(DOC, indent=2)
+    assert "\n" in fallback  # really went through json.dumps
+    assert json.loads(fallback) == json.loads(provider.dumps(DOC))
+    assert "Café ☕" in fallback  # ensure_ascii stays off
+
+
+def test_plain_payloads_match_flasks_default_provider(provider):
+    payload = {"success": True, "items": [{"name": "Pizza", "price": 299.0, "tags": None}], "count": 1}
+    default = DefaultJSONProvider(Flask(__name__))
+    assert json.loads(provider.dumps(payload)) == json.loads(default.dumps(payload))
+    assert provider.loads(provider.dumps(payload)) == payload
+
+
+def test_response_body_and_mimetype(json_app):
+    with json_app.app_context():
+        response = json_app.json.response({"order": DOC})
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == {"order": EXPECTED}
+
+
+def test_unknown_types_still_raise(provider):
+    with pytest.raises(TypeError):
+        provider.dumps({"value": object()})
+    with pytest.raises(TypeError):
+        provider.dumps({"value": object()}, indent=2)
+
+
+def test_stdlib_backend_without_orjson_matches(provider, monkeypatch):
+    fast = json.loads(provider.dumps(DOC))
+    monkeypatch.setattr("utils.json_provider.orjson", None)
+    assert json.loads(provider.dumps(DOC)) == fast == EXPECTED
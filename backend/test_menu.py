@@ -0,0 +1,125 @@
+"""Public menu tests (run against a local mongod)."""
+
+import pytest
+
+from conftest import requires_mongo
+
+pytestmark = requires_mongo
+
+ITEMS = [
+    {"item_id": "menu_test_1", "name": "Menu Test Margherita", "price": 250,
+     "category": "menu-test", "restaurant": "Menu Kitchen", "is_veg": True},
+    {"item_id": "menu_test_2", "name": "Menu Test Pepperoni", "price": 320,
+     "category": "menu-test", "restaurant": "Menu Kitchen", "is_veg": False},
+    {"item_id": "menu_test_3", "name": "Menu Test Garlic Bread", "price": 150,
+     "category": "menu-test", "restaurant": "Menu Kitchen", "is_veg": True},
+]
+
+
+@pytest.fixture(autouse=True)
+def menu_items():
+    from db import menu_col
+
+    menu_col.delete_many({"category": "menu-test"})
+    menu_col.insert_many([dict(item) for item in ITEMS])
+    yield
+    menu_col.delete_many({"category": "menu-test"})
+
+
+def _menu_ids(response):
+    assert response.status_code == 200
+    return sorted(item["item_id"] for item in response.get_json()["items"])
+
+
+def test_admin_write_invalidates_cached_menu(client, admin_client):
+    from db import menu_col
+
+    url = "/api/menu?category=menu-test"
+    assert _menu_ids(client.get(url)) == ["menu_test_1", "menu_test_2", "menu_test_3"]
+
+    menu_col.delete_one({"item_id": "menu_test_3"})  # bypasses the catalog version
+    assert len(client.get(url).get_json()["items"]) == 3  # still served from cache
+
+    menu_id = str(menu_col.find_one({"item_id": "menu_test_1"})["_id"])
+    assert admin_client.delete(f"/api/admin/menu/{menu_id}").status_code == 200
+    assert _menu_ids(client.get(url)) == ["menu_test_2"]
+
+
+def test_menu_cache_is_bounded():
+    from catalog import CatalogCache
+
+    cache = CatalogCache("menu-test-cache", max_entries=3)
+    for i in range(10):
+        cache.get_or_load(f"category-{i}", lambda: i)
+        assert len(cache._entries) <= 3
+
+
+def test_matching_etag_gets_304_until_an_admin_edit(client, admin_client):
+    from db import menu_col
+
+    url = "/api/menu?category=menu-test"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    other = client.get("/api/menu?category=menu-test&fields=name", headers={"If-None-Match": etag})
+    assert other.status_code == 200  # different request shape, different ETag
+
+    menu_id = str(menu_col.find_one({"item_id": "menu_test_2"})["_id"])
+    assert admin_client.put(f"/api/admin/menu/{menu_id}", json={"price": 330}).status_code == 200
+    fresh = client.get(url, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    prices = {item["item_id"]: item["price"] for item in fresh.get_json()["items"]}
+    assert prices["menu_test_2"] == 330
+
+
+def test_keyset_pages_are_continuous_across_tied_sort_keys(client):
+    from db import menu_col
+
+    # Every menu-test item shares the sort key (category); _id breaks ties.
+    menu_col.insert_many([
+        {"item_id": f"menu_test_page_{i}", "name": f"Menu Test Page {i}", "price": 100,
+         "category": "menu-test", "restaurant": "Menu Kitchen", "is_veg": True}
+        for i in range(4)
+    ])
+    expected = sorted(str(doc["_id"]) for doc in menu_col.find({"category": "menu-test"}))
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/menu?category=menu-test&limit=2&fields=item_id" + (f"&after={cursor}" if cursor else "")
+        payload = client.get(url).get_json()
+        assert len(payload["items"]) <= 2
+        assert all(set(item) == {"_id", "item_id"} for item in payload["items"])
+        seen += [item["_id"] for item in payload["items"]]
+        cursor = payload["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == expected
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=2&after=not-a-cursor", "fields=name,$where"])
+def test_bad_paging_parameters_get_400(client, query):
+    response = client.get(f"/api/menu?category=menu-test&{query}")
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_menu_lookup_is_one_batched_query_per_request(app, round_trips):
+    from routes.menu import resolve_menu_items
+
+    ids = ["menu_test_1", "menu_test_2", "menu_test_3", "menu_test_missing"]
+    with app.test_request_context():
+        round_trips.reset()
+        found = resolve_menu_items(ids)
+        assert sorted(found) == ids[:3]
+        assert dict(round_trips.commands) == {"find": 1}
+
+        resolve_menu_items(ids + ids)  # memoized for the rest of the request
+        assert round_trips.total == 1
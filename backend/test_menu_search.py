@@ -0,0 +1,107 @@
+"""Menu search index tests (no database needed)."""
+
+import pytest
+
+from menu_search import MenuSearchIndex, tokenize
+
+ITEMS = [
+    {"_id": "a1", "name": "Paneer Tikka Pizza", "description": "Smoky paneer",
+     "category": "pizza", "restaurant": "Pizza Paradise", "price": 349, "is_veg": True, "rating": 4.6},
+    {"_id": "a2", "name": "Pepperoni Pizza", "description": "Classic pepperoni",
+     "category": "pizza", "restaurant": "Pizza Paradise", "price": 399, "is_veg": False, "rating": 4.8},
+    {"_id": "a3", "name": "Paneer Wrap", "description": "Grilled wrap",
+     "category": "wraps", "restaurant": "Wrap Hub", "price": 199, "is_veg": True, "rating": 4.1},
+    {"_id": "a4", "name": "Garlic Bread", "description": "Goes well with pizza",
+     "category": "sides", "restaurant": "Pizza Paradise", "price": 149, "is_veg": True, "rating": 4.3},
+]
+
+
+class ListCollection:
+    """Just enough of a collection for ``rebuild``."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        return [dict(doc) for doc in self.docs]
+
+
+@pytest.fixture
+def catalog():
+    return {"version": 1}
+
+
+@pytest.fixture
+def index(catalog):
+    index = MenuSearchIndex(lambda: catalog["version"])
+    index.rebuild(ListCollection(ITEMS), {})
+    return index
+
+
+def _ids(result):
+    return [item["_id"] for item in result["items"]]
+
+
+def test_tokenize_lowercases_words():
+    assert tokenize("Paneer-Tikka  PIZZA!") == ["paneer", "tikka", "pizza"]
+
+
+def test_name_matches_outrank_description_matches(index):
+    result = index.search("pizza")
+    assert _ids(result) == ["a2", "a1", "a4"]  # name hits by rating, then description
+    assert result["total"] == 3
+
+
+def test_last_token_matches_as_prefix(index):
+    assert _ids(index.search("pan")) == ["a1", "a3"]
+    assert _ids(index.search("paneer pi")) == ["a1"]
+    assert index.search("pe")["suggestions"] == ["pepperoni"]
+    assert _ids(index.search("pizza pan")) == ["a1"]
+    assert index.search("sushi")["items"] == []
+
+
+def test_veg_price_and_category_facets(index):
+    assert _ids(index.search("pizza", is_veg=True)) == ["a1", "a4"]
+    assert _ids(index.search("pizza", is_veg=False)) == ["a2"]
+    assert _ids(index.search("", min_price=150, max_price=350)) == ["a1", "a3"]
+    assert _ids(index.search("", category="wraps")) == ["a3"]
+
+    facets = index.search("paneer")["facets"]
+    assert facets == {"category": {"pizza": 1, "wraps": 1},
+                      "restaurant": {"Pizza Paradise": 1, "Wrap Hub": 1}}
+
+
+def test_apply_change_adds_updates_and_deletes(index):
+    index.apply_change({"_id": "a5", "name": "Paneer Roll", "category": "wraps",
+                        "restaurant": "Wrap Hub", "price": 179, "is_veg": True}, 2)
+    assert "a5" in _ids(index.search("roll"))
+
+    index.apply_change({**ITEMS[2], "name": "Falafel Wrap"}, 3)
+    assert _ids(index.search("paneer")) == ["a1", "a5"]
+    assert _ids(index.search("falafel")) == ["a3"]
+
+    index.apply_change({**ITEMS[1], "is_deleted": True}, 4)
+    assert index.search("pepperoni")["items"] == []
+    assert "pepperoni" not in index.complete("pe")
+    assert index.version == 4
+
+
+def test_missed_version_forces_rebuild(index, catalog):
+    index.apply_change({**ITEMS[0], "price": 1}, 5)  # skipped versions 2-4
+    assert index.version is None
+
+    catalog["version"] = 5
+    index.ensure_fresh(ListCollection(ITEMS[:1]), {})
+    assert index.version == 5
+    assert _ids(index.search("")) == ["a1"]
+
+
+def test_catalog_bump_elsewhere_triggers_rebuild(index, catalog):
+    collection = ListCollection(ITEMS + [{"_id": "a6", "name": "Mango Lassi", "category": "drinks",
+                                          "restaurant": "Wrap Hub", "price": 99}])
+    index.ensure_fresh(collection, {})
+    assert index.search("mango")["items"] == []  # version unchanged, no rebuild
+
+    catalog["version"] = 2
+    index.ensure_fresh(collection, {})
+    assert _ids(index.search("mango")) == ["a6"]
@@ -0,0 +1,53 @@
+"""Data migration tests (run against a local mongod)."""
+
+from datetime import datetime
+
+from conftest import requires_mongo
+
+pytestmark = requires_mongo
+
+
+def test_iso_timestamps_become_dates():
+    from db import orders_col
+    from migrations import migrate_collection_timestamps
+
+    orders_col.delete_many({"order_id": {"$regex": "^ORD-MIGRATE-"}})
+    orders_col.insert_many([
+        {"order_id": "ORD-MIGRATE-1", "created_at": "2026-03-01T10:15:30.123456",
+         "status_history": [{"status": "preparing", "timestamp": "2026-03-01T10:15:30.123456"},
+                            {"status": "delivered", "timestamp": datetime(2026, 3, 1, 11)}]},
+        {"order_id": "ORD-MIGRATE-2", "created_at": datetime(2026, 3, 2)},
+        {"order_id": "ORD-MIGRATE-3", "created_at": "not a date"},
+    ])
+    try:
+        fields = ["created_at", "status_history.timestamp"]
+        assert migrate_collection_timestamps(orders_col, fields, batch_size=1) == 1
+        assert migrate_collection_timestamps(orders_col, fields) == 0  # re-runnable
+
+        first = orders_col.find_one({"order_id": "ORD-MIGRATE-1"})
+        assert first["created_at"] == datetime(2026, 3, 1, 10, 15, 30, 123000)
+        assert [h["timestamp"] for h in first["status_history"]] == [
+            datetime(2026, 3, 1, 10, 15, 30, 123000), datetime(2026, 3, 1, 11),
+        ]
+        assert orders_col.find_one({"order_id": "ORD-MIGRATE-3"})["created_at"] == "not a date"
+    finally:
+        orders_col.delete_many({"order_id": {"$regex": "^ORD-MIGRATE-"}})
+
+
+def test_admin_analytics_buckets_orders_by_day(admin_client):
+    from db import orders_col
+
+    now = datetime.utcnow()
+    orders_col.delete_many({"order_id": {"$regex": "^ORD-MIGRATE-"}})
+    orders_col.insert_many([
+        {"order_id": "ORD-MIGRATE-A", "total": 100.0, "status": "delivered", "created_at": now},
+        {"order_id": "ORD-MIGRATE-B", "total": 50.5, "status": "delivered", "created_at": now},
+    ])
+    try:
+        daily = admin_client.get("/api/admin/analytics").get_json()["daily_data"]
+        assert len(daily) == 14
+        assert daily[-1]["date"] == now.strftime("%b %d")
+        assert daily[-1]["orders"] >= 2
+        assert daily[-1]["revenue"] >= 150.5
+    finally:
+        orders_col.delete_many({"order_id": {"$regex": "^ORD-MIGRATE-"}})
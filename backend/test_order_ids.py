@@ -0,0 +1,28 @@
+"""Order id generator tests (no database needed)."""
+
+from datetime import datetime, timedelta
+
+from utils.order_ids import new_order_id, order_id_floor, order_id_range, order_id_time
+
+
+def test_ids_are_strictly_increasing_and_unique():
+    ids = [new_order_id() for _ in range(5000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(len(i) == len("ORD-") + 16 for i in ids)
+
+
+def test_id_encodes_its_creation_time():
+    before = datetime.utcnow() - timedelta(milliseconds=1)
+    created = order_id_time(new_order_id())
+    assert before <= created <= datetime.utcnow() + timedelta(milliseconds=1)
+    assert order_id_time("ORD-1A2B3C4D") is None  # legacy id
+
+
+def test_time_range_matches_ids_by_prefix():
+    order_id = new_order_id()
+    created = order_id_time(order_id)
+    window = order_id_range(created, created + timedelta(milliseconds=1))
+    assert window["$gte"] <= order_id < window["$lt"]
+    assert order_id < order_id_floor(created + timedelta(seconds=1))
+    assert order_id_floor(datetime(2020, 1, 1)) < order_id_floor(datetime(2030, 1, 1))
@@ -0,0 +1,455 @@
+"""Checkout tests (run against a local mongod; a single-node replica set
+exercises the transactional path)."""
+
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+from conftest import TEST_USER_ID, requires_mongo
+
+pytestmark = requires_mongo
+
+ITEMS = [
+    {"item_id": "order_test_1", "name": "Order Test Pizza", "price": 300,
+     "category": "order-test", "restaurant": "Order Kitchen", "is_veg": True},
+    {"item_id": "order_test_2", "name": "Order Test Burger", "price": 220,
+     "category": "order-test", "restaurant": "Order Kitchen", "is_veg": False},
+]
+
+ORDER_JOBS = ("order_confirmation_email", "order_update", "order_delivered_email")
+
+CHECKOUT = {"address": "1 Test Lane", "phone": "9999999999", "name": "Order Test",
+            "city": "Testville", "zip": "000000", "payment_method": "UPI"}
+
+
+@pytest.fixture(autouse=True)
+def order_menu():
+    from archive import refresh_archive_summary
+    from cart_store import cart_store
+    from db import (
+        idempotency_col, jobs_col, menu_col, orders_archive_col, orders_col, payments_col,
+    )
+
+    def cleanup():
+        idempotency_col.delete_many({"_id": {"$regex": f"^{TEST_USER_ID}:"}})
+        menu_col.delete_many({"category": "order-test"})
+        orders_col.delete_many({"user_id": TEST_USER_ID})
+        orders_archive_col.delete_many({"user_id": TEST_USER_ID})
+        refresh_archive_summary()
+        payments_col.delete_many({"user_id": TEST_USER_ID})
+        jobs_col.delete_many({"name": {"$in": list(ORDER_JOBS)}})
+        cart_store.delete(TEST_USER_ID)
+
+    cleanup()
+    menu_col.insert_many([dict(item) for item in ITEMS])
+    yield
+    cleanup()
+
+
+@pytest.fixture
+def filled_cart(client):
+    response = client.patch("/api/cart", json={"ops": [
+        {"op": "add", "id": "order_test_1", "quantity": 2},
+        {"op": "add", "id": "order_test_2", "quantity": 1},
+    ]})
+    assert response.status_code == 200
+    return response.get_json()["items"]
+
+
+def _order_count():
+    from db import orders_col, payments_col
+
+    return (orders_col.count_documents({"user_id": TEST_USER_ID}),
+            payments_col.count_documents({"user_id": TEST_USER_ID}))
+
+
+@pytest.mark.skipif(os.getenv("CART_STORE", "mongo") != "mongo", reason="counts carts_col writes")
+def test_checkout_costs_a_fixed_number_of_round_trips(client, filled_cart, round_trips):
+    from db import supports_transactions
+
+    round_trips.reset()
+    response = client.post("/api/orders", json=CHECKOUT)
+    assert response.status_code == 201
+
+    # claim cart, menu $in, order + payment + email job inserts
+    expected = {"findAndModify": 1, "find": 1, "insert": 3}
+    if supports_transactions():
+        expected["commitTransaction"] = 1
+    assert dict(round_trips.commands) == expected
+
+
+def test_checkout_claims_cart_and_records_payment(client, filled_cart):
+    from cart_store import cart_store
+    from db import payments_col
+
+    response = client.post("/api/orders", json=CHECKOUT)
+    assert response.status_code == 201
+    order = response.get_json()["order"]
+    assert order["subtotal"] == 2 * 300 + 220
+    assert [line["quantity"] for line in order["items"]] == [2, 1]
+
+    payment = payments_col.find_one({"order_id": order["order_id"]})
+    assert payment["amount"] == order["total"]
+    assert not (cart_store.get(TEST_USER_ID) or {}).get("items")
+
+
+def test_checkout_emails_confirmation_from_the_job_queue(client, filled_cart, monkeypatch):
+    from bson import ObjectId
+
+    from db import jobs_col, users_col
+    from jobs import job_queue
+
+    sent = []
+    monkeypatch.setattr("routes.orders.send_email_job", lambda *args: sent.append(args))
+    users_col.delete_one({"_id": ObjectId(TEST_USER_ID)})
+    users_col.insert_one({"_id": ObjectId(TEST_USER_ID), "name": "Order Test",
+                          "email": "order-test@example.com", "role": "user"})
+    try:
+        response = client.post("/api/orders", json=CHECKOUT)
+        assert response.status_code == 201
+        order_id = response.get_json()["order"]["order_id"]
+        assert sent == []  # nothing sent on the request thread
+
+        job_queue.run_pending()
+        assert [(to, subject) for to, subject, _ in sent] == [
+            ("order-test@example.com", "Your Order is Confirmed 🍔")
+        ]
+        assert order_id in sent[0][2]
+        assert jobs_col.count_documents({"payload.order_id": order_id}) == 0
+    finally:
+        users_col.delete_one({"_id": ObjectId(TEST_USER_ID)})
+
+
+def test_rejected_promo_leaves_cart_and_orders_untouched(client, filled_cart):
+    from cart_store import cart_store
+
+    response = client.post("/api/orders", json={**CHECKOUT, "promo_code": "NO-SUCH-PROMO"})
+    assert response.status_code == 404
+    assert _order_count() == (0, 0)
+    assert cart_store.get(TEST_USER_ID)["items"] == filled_cart
+
+
+def test_failed_payment_leaves_no_partial_order(client, filled_cart, monkeypatch):
+    from cart_store import cart_store
+
+    def broken_payment(*args, **kwargs):
+        raise RuntimeError("payment insert failed")
+
+    monkeypatch.setattr("routes.orders.record_payment", broken_payment)
+    try:
+        response = client.post("/api/orders", json=CHECKOUT)
+        assert response.status_code == 500
+    except RuntimeError:
+        pass  # propagated by the test client
+
+    assert _order_count() == (0, 0)
+    assert cart_store.get(TEST_USER_ID)["items"] == filled_cart
+
+
+def test_retried_transaction_keeps_the_claimed_cart(client, filled_cart, monkeypatch):
+    import routes.orders
+    from cart_store import cart_store
+
+    if cart_store.transactional:
+        pytest.skip("the Mongo store claims inside the transaction")
+
+    def run_twice(callback):
+        try:
+            callback(None)
+        except Exception:
+            pass
+        return callback(None)  # as a driver retry after a transient error would
+
+    real_create = routes.orders._create_order
+    attempts = []
+
+    def flaky_create(*args):
+        attempts.append(args[1])
+        if len(attempts) == 1:
+            raise RuntimeError("TransientTransactionError")
+        return real_create(*args)
+
+    monkeypatch.setattr(routes.orders, "run_in_transaction", run_twice)
+    monkeypatch.setattr(routes.orders, "_create_order", flaky_create)
+
+    response = client.post("/api/orders", json=CHECKOUT)
+    assert response.status_code == 201
+    assert [len(cart["items"]) for cart in attempts] == [2, 2]
+
+
+def test_concurrent_checkouts_place_one_order(app, filled_cart):
+    statuses = []
+    barrier = threading.Barrier(2)
+
+    def checkout():
+        tab = app.test_client()
+        with tab.session_transaction() as sess:
+            sess["user_id"] = TEST_USER_ID
+            sess["user_role"] = "user"
+        barrier.wait()
+        statuses.append(tab.post("/api/orders", json=CHECKOUT).status_code)
+
+    threads = [threading.Thread(target=checkout) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201, 400]
+    assert _order_count() == (1, 1)
+
+
+def test_retry_with_idempotency_key_replays_the_first_order(client, filled_cart, round_trips):
+    headers = {"Idempotency-Key": "checkout-retry-1"}
+    first = client.post("/api/orders", json=CHECKOUT, headers=headers)
+    assert first.status_code == 201
+
+    round_trips.reset()
+    retry = client.post("/api/orders", json=CHECKOUT, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json()["order"]["order_id"] == first.get_json()["order"]["order_id"]
+    assert dict(round_trips.commands) == {"findAndModify": 1}
+    assert _order_count() == (1, 1)
+
+
+def test_idempotency_key_is_shared_across_api_prefixes(client, filled_cart):
+    headers = {"Idempotency-Key": "checkout-retry-4"}
+    first = client.post("/api/orders", json=CHECKOUT, headers=headers)
+    assert first.status_code == 201
+
+    retry = client.post("/api/v1/orders", json=CHECKOUT, headers=headers)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json()["order"]["order_id"] == first.get_json()["order"]["order_id"]
+    assert _order_count() == (1, 1)
+
+
+def test_idempotency_key_reused_for_another_request_is_rejected(client, filled_cart):
+    headers = {"Idempotency-Key": "checkout-retry-2"}
+    assert client.post("/api/orders", json=CHECKOUT, headers=headers).status_code == 201
+    response = client.post("/api/orders", json={**CHECKOUT, "zip": "111111"}, headers=headers)
+    assert response.status_code == 422
+    assert _order_count() == (1, 1)
+
+
+def test_failed_checkout_releases_its_idempotency_key(client, filled_cart, monkeypatch):
+    headers = {"Idempotency-Key": "checkout-retry-3"}
+
+    def broken_payment(*args, **kwargs):
+        raise RuntimeError("payment insert failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("routes.orders.record_payment", broken_payment)
+        try:
+            assert client.post("/api/orders", json=CHECKOUT, headers=headers).status_code == 500
+        except RuntimeError:
+            pass  # propagated by the test client
+
+    response = client.post("/api/orders", json=CHECKOUT, headers=headers)
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert _order_count() == (1, 1)
+
+
+def _seed_history(count):
+    from datetime import datetime, timedelta
+
+    from db import orders_col
+
+    start = datetime(2026, 1, 1)
+    orders_col.insert_many([
+        {"order_id": f"ORD-HIST-{i:03d}", "user_id": TEST_USER_ID, "status": "delivered",
+         "total": 100.0 + i, "items_summary": f"Item {i}", "items": [{"id": "p1", "quantity": 1}],
+         "status_history": [{"status": "delivered"}], "phone": "9999999999",
+         "address": "1 Test Lane", "name": "Order Test",
+         "created_at": start + timedelta(hours=i)}
+        for i in range(count)
+    ])
+
+
+def test_order_history_pages_newest_first_without_pii(client):
+    _seed_history(7)
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/orders?limit=3" + (f"&after={cursor}" if cursor else "")
+        payload = client.get(url).get_json()
+        assert payload["success"] is True
+        for order in payload["orders"]:
+            assert not {"user_id", "phone", "address", "name"} & set(order)
+            assert "items" in order
+        seen += [order["order_id"] for order in payload["orders"]]
+        cursor = payload["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [f"ORD-HIST-{i:03d}" for i in reversed(range(7))]
+
+
+def test_compact_order_history_returns_list_fields_only(client):
+    _seed_history(2)
+
+    orders = client.get("/api/orders?view=compact").get_json()["orders"]
+    assert [order["order_id"] for order in orders] == ["ORD-HIST-001", "ORD-HIST-000"]
+    assert set(orders[0]) == {"_id", "order_id", "status", "total", "items_summary", "created_at"}
+
+
+def test_order_history_rejects_a_bad_cursor(client):
+    response = client.get("/api/orders?limit=2&after=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_order_id_collision_is_retried_with_a_fresh_id(client, filled_cart, monkeypatch):
+    from db import orders_col
+    from utils.order_ids import new_order_id
+
+    taken = new_order_id()
+    orders_col.insert_one({"order_id": taken, "user_id": TEST_USER_ID})
+    ids = iter([taken])
+    monkeypatch.setattr("routes.orders.new_order_id", lambda: next(ids, None) or new_order_id())
+
+    response = client.post("/api/orders", json=CHECKOUT)
+    assert response.status_code == 201
+    assert response.get_json()["order"]["order_id"] > taken
+    assert _order_count() == (2, 1)
+
+
+def _seed_order(status="preparing", history=1):
+    from db import orders_col
+    from utils.order_ids import new_order_id
+
+    order_id = new_order_id()
+    orders_col.insert_one({
+        "order_id": order_id, "user_id": TEST_USER_ID, "status": status, "total": 100.0,
+        "status_history": [{"status": status, "timestamp": datetime.utcnow()}] * history,
+        "created_at": datetime.utcnow(),
+    })
+    return order_id
+
+
+def _set_status(admin_client, order_id, status, **extra):
+    return admin_client.put(f"/api/admin/orders/{order_id}", json={"status": status, **extra})
+
+
+def test_status_follows_the_transition_table(admin_client):
+    from db import jobs_col, orders_col
+
+    order_id = _seed_order()
+    assert _set_status(admin_client, order_id, "out_for_delivery").status_code == 200
+    assert _set_status(admin_client, order_id, "delivered").status_code == 200
+
+    response = _set_status(admin_client, order_id, "placed")
+    assert response.status_code == 409
+    assert response.get_json()["status"] == "delivered"
+    assert orders_col.find_one({"order_id": order_id})["status"] == "delivered"
+
+    email = jobs_col.find_one({"name": "order_delivered_email", "payload.order_id": order_id})
+    assert email["payload"]["user_id"] == TEST_USER_ID
+
+
+def test_status_change_is_conditional_on_expected_status(admin_client):
+    order_id = _seed_order()
+    assert _set_status(admin_client, order_id, "cancelled", expected_status="out_for_delivery").status_code == 409
+    assert _set_status(admin_client, order_id, "cancelled", expected_status="preparing").status_code == 200
+    assert _set_status(admin_client, "ORD-MISSING", "cancelled").status_code == 404
+
+
+def test_status_history_is_capped(admin_client):
+    from db import orders_col
+    from routes.orders import STATUS_HISTORY_LIMIT
+
+    order_id = _seed_order(history=STATUS_HISTORY_LIMIT + 5)
+    assert _set_status(admin_client, order_id, "out_for_delivery").status_code == 200
+
+    history = orders_col.find_one({"order_id": order_id})["status_history"]
+    assert len(history) == STATUS_HISTORY_LIMIT
+    assert history[-1]["status"] == "out_for_delivery"
+
+
+def test_archive_moves_only_old_final_orders(client):
+    from archive import archive_orders
+    from db import orders_archive_col, orders_col
+
+    _seed_history(3)  # delivered, 2026-01-01
+    active = _seed_order(status="preparing")
+    orders_col.update_one({"order_id": active}, {"$set": {"created_at": datetime(2026, 1, 1)}})
+    recent = _seed_order(status="delivered")
+
+    assert archive_orders(older_than_days=30, batch_size=2) == 3
+    assert archive_orders(older_than_days=30) == 0
+    assert sorted(o["order_id"] for o in orders_col.find({"user_id": TEST_USER_ID})) == sorted([active, recent])
+    assert orders_archive_col.count_documents({"user_id": TEST_USER_ID}) == 3
+
+
+def test_archived_orders_stay_visible(client, admin_client):
+    from archive import archive_orders
+
+    _seed_history(3)
+    stats = admin_client.get("/api/admin/stats").get_json()["stats"]
+    archive_orders(older_than_days=30)
+
+    assert client.get("/api/orders/ORD-HIST-001").get_json()["order"]["total"] == 101.0
+    history = [o["order_id"] for o in client.get("/api/orders").get_json()["orders"]]
+    assert history == ["ORD-HIST-002", "ORD-HIST-001", "ORD-HIST-000"]
+    page = client.get("/api/orders?limit=2").get_json()
+    assert [o["order_id"] for o in page["orders"]] == ["ORD-HIST-002", "ORD-HIST-001"]
+    assert page["next_cursor"]
+
+    after = admin_client.get("/api/admin/stats").get_json()["stats"]
+    assert (after["total_orders"], after["total_revenue"]) == (stats["total_orders"], stats["total_revenue"])
+    found = admin_client.get("/api/admin/orders?search=ORD-HIST-000").get_json()
+    assert found["archived"] and [o["order_id"] for o in found["orders"]] == ["ORD-HIST-000"]
+    assert _set_status(admin_client, "ORD-HIST-000", "preparing").get_json()["status"] == "delivered"
+
+
+def test_admin_views_include_archived_orders(admin_client):
+    from bson import ObjectId
+
+    from archive import archive_orders, refresh_archive_summary
+    from db import orders_archive_col, users_col
+
+    def views():
+        analytics = admin_client.get("/api/admin/analytics").get_json()
+        users = admin_client.get("/api/admin/users?search=order-test@example.com").get_json()["users"]
+        return analytics["status_breakdown"], analytics["top_items"], [u["order_count"] for u in users]
+
+    _seed_history(3)
+    users_col.delete_one({"_id": ObjectId(TEST_USER_ID)})
+    users_col.insert_one({"_id": ObjectId(TEST_USER_ID), "name": "Order Test",
+                          "email": "order-test@example.com", "role": "user"})
+    try:
+        before = views()
+        archive_orders(older_than_days=30)
+        assert views() == before
+        assert before[2] == [3]
+
+        # Archived tallies come from the summary, not a scan of the archive.
+        orders_archive_col.insert_one({"order_id": "ORD-RAW-001", "user_id": TEST_USER_ID,
+                                       "status": "cancelled", "total": 1.0, "items": []})
+        assert views()[0] == before[0]
+        refresh_archive_summary()
+        assert views()[0].get("cancelled", 0) == before[0].get("cancelled", 0) + 1
+    finally:
+        users_col.delete_one({"_id": ObjectId(TEST_USER_ID)})
+
+    listed = admin_client.get("/api/admin/orders?archived=1&search=ORD-HIST").get_json()
+    assert (listed["archived"], listed["total"]) == (True, 3)
+    assert [o["order_id"] for o in listed["orders"]] == ["ORD-HIST-002", "ORD-HIST-001", "ORD-HIST-000"]
+    missing = admin_client.get("/api/admin/orders?search=ORD-NO-SUCH").get_json()
+    assert (missing["archived"], missing["total"], missing["orders"]) == (False, 0, [])
+
+
+def test_order_history_without_limit_returns_one_page(client):
+    from routes.orders import ORDER_HISTORY_PAGE_SIZE
+
+    _seed_history(ORDER_HISTORY_PAGE_SIZE + 3)
+
+    payload = client.get("/api/orders?view=compact").get_json()
+    assert len(payload["orders"]) == ORDER_HISTORY_PAGE_SIZE
+    assert payload["orders"][0]["order_id"] == f"ORD-HIST-{ORDER_HISTORY_PAGE_SIZE + 2:03d}"
+
+    rest = client.get(f"/api/orders?view=compact&after={payload['next_cursor']}").get_json()
+    assert [o["order_id"] for o in rest["orders"]] == ["ORD-HIST-002", "ORD-HIST-001", "ORD-HIST-000"]
+    assert rest["next_cursor"] is None
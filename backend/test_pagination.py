@@ -0,0 +1,20 @@
+"""Keyset cursor tests (no database needed)."""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from helpers import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("sort_value", ["pizza", 4.5, None, datetime(2026, 1, 2, 3, 4, 5, 678000)])
+def test_cursor_round_trips_sort_value_and_id(sort_value):
+    doc_id = ObjectId()
+    assert decode_cursor(encode_cursor(sort_value, doc_id)) == (sort_value, doc_id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", encode_cursor("x", "not-an-object-id")])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,160 @@
+"""Restaurant discovery tests (run against a local mongod)."""
+
+from conftest import requires_mongo
+
+pytestmark = requires_mongo
+
+# Bangalore-ish coordinates, roughly 1 km / 5 km / 30 km apart
+USER = (12.9716, 77.5946)
+NEAR = {"lat": 12.9800, "lng": 77.5946}
+MID = {"lat": 13.0160, "lng": 77.5946}
+FAR = {"lat": 13.2400, "lng": 77.5946}
+
+
+def _add(admin_client, name, location, **extra):
+    response = admin_client.post(
+        "/api/admin/restaurants",
+        json={"name": name, "category": "geo-test", "location": location, **extra},
+    )
+    assert response.status_code == 201
+    return response.get_json()["restaurant"]["_id"]
+
+
+def test_near_me_sorted_by_distance_within_radius(client, admin_client):
+    from db import restaurants_col
+
+    restaurants_col.delete_many({"category": "geo-test"})
+    _add(admin_client, "Geo Mid", MID)
+    _add(admin_client, "Geo Near", NEAR)
+    _add(admin_client, "Geo Far", FAR)
+    _add(admin_client, "Geo Small Radius", MID, delivery_radius_km=2)
+
+    response = client.get(
+        "/api/restaurants",
+        query_string={"near": "%s,%s" % USER, "radius_km": 10, "category": "geo-test"},
+    )
+    payload = response.get_json()
+
+    assert response.status_code == 200
+    assert [r["name"] for r in payload["restaurants"]] == ["Geo Near", "Geo Mid"]
+    distances = [r["distance_km"] for r in payload["restaurants"]]
+    assert distances == sorted(distances) and distances[-1] < 10
+
+    restaurants_col.delete_many({"category": "geo-test"})
+
+
+def test_location_can_be_set_and_cleared(admin_client):
+    from db import restaurants_col
+
+    restaurants_col.delete_many({"category": "geo-test"})
+    restaurant_id = _add(admin_client, "Geo Update", NEAR)
+
+    bad = admin_client.put(
+        f"/api/admin/restaurants/{restaurant_id}", json={"location": {"lat": 200, "lng": 0}}
+    )
+    assert bad.status_code == 400
+
+    cleared = admin_client.put(
+        f"/api/admin/restaurants/{restaurant_id}", json={"location": None}
+    )
+    assert cleared.status_code == 200
+    assert "location" not in restaurants_col.find_one({"name": "Geo Update"})
+
+    restaurants_col.delete_many({"category": "geo-test"})
+
+
+def test_invalid_near_param_is_rejected(client):
+    response = client.get("/api/restaurants", query_string={"near": "not-a-point"})
+    assert response.status_code == 400
+
+
+def test_slug_lookup_and_backfill(client, admin_client):
+    from db import restaurants_col
+    from routes.restaurants import backfill_restaurant_slugs
+
+    restaurants_col.delete_many({"category": "slug-test"})
+    first = admin_client.post(
+        "/api/admin/restaurants", json={"name": "Spice Route", "category": "slug-test"}
+    )
+    second = admin_client.post(
+        "/api/admin/restaurants", json={"name": "Spice  Route!", "category": "slug-test"}
+    )
+    assert first.get_json()["restaurant"]["slug"] == "spice-route"
+    assert second.get_json()["restaurant"]["slug"] == "spice-route-2"
+
+    by_slug = client.get("/api/restaurants/spice-route-2").get_json()
+    assert by_slug["restaurant"]["_id"] == second.get_json()["restaurant"]["_id"]
+    assert client.get("/api/restaurants/Spice Route").status_code == 200
+
+    restaurants_col.insert_one({"name": "Legacy Diner", "category": "slug-test"})
+    assert backfill_restaurant_slugs() == 1
+    assert restaurants_col.find_one({"name": "Legacy Diner"})["slug"] == "legacy-diner"
+
+    restaurants_col.delete_many({"category": "slug-test"})
+
+
+def test_detail_embeds_only_visible_menu_items(client, admin_client):
+    from db import menu_col, restaurants_col
+
+    restaurants_col.delete_many({"category": "lookup-test"})
+    menu_col.delete_many({"category": "lookup-test"})
+    created = admin_client.post(
+        "/api/admin/restaurants", json={"name": "Lookup Kitchen", "category": "lookup-test"}
+    ).get_json()["restaurant"]
+    menu_col.insert_many([
+        {"item_id": "lookup_1", "name": "Shown", "restaurant": "Lookup Kitchen", "category": "lookup-test"},
+        {"item_id": "lookup_2", "name": "Deleted", "restaurant": "Lookup Kitchen", "category": "lookup-test",
+         "is_deleted": True},
+        {"item_id": "lookup_3", "name": "Inactive", "restaurant": "Lookup Kitchen", "category": "lookup-test",
+         "active": False},
+        {"item_id": "lookup_4", "name": "Elsewhere", "restaurant": "Other Kitchen", "category": "lookup-test"},
+    ])
+
+    try:
+        restaurant = client.get(f"/api/restaurants/{created['slug']}?include=menu").get_json()["restaurant"]
+        assert [item["item_id"] for item in restaurant["menu"]] == ["lookup_1"]
+        assert "menu" not in client.get(f"/api/restaurants/{created['slug']}").get_json()["restaurant"]
+    finally:
+        restaurants_col.delete_many({"category": "lookup-test"})
+        menu_col.delete_many({"category": "lookup-test"})
+
+
+def test_slug_taken_by_a_concurrent_create_is_retried(admin_client, monkeypatch):
+    import routes.restaurants
+    from db import restaurants_col
+
+    restaurants_col.delete_many({"category": "slug-test"})
+    admin_client.post("/api/admin/restaurants", json={"name": "Race Kitchen", "category": "slug-test"})
+
+    real_pick = routes.restaurants.generate_unique_slug
+    picks = iter(["race-kitchen"])  # what a read made before that insert would pick
+    monkeypatch.setattr(routes.restaurants, "generate_unique_slug",
+                        lambda *args, **kwargs: next(picks, None) or real_pick(*args, **kwargs))
+
+    response = admin_client.post("/api/admin/restaurants", json={"name": "Race Kitchen", "category": "slug-test"})
+    assert response.status_code == 201
+    assert response.get_json()["restaurant"]["slug"] == "race-kitchen-2"
+
+    restaurants_col.delete_many({"category": "slug-test"})
+
+
+def test_identifier_without_slug_characters_is_not_found(client, admin_client):
+    from db import restaurants_col
+
+    restaurants_col.delete_many({"category": "slug-test"})
+    created = admin_client.post(
+        "/api/admin/restaurants", json={"name": "!!!", "category": "slug-test"}
+    ).get_json()["restaurant"]
+    assert created["slug"].startswith("restaurant")
+
+    try:
+        for identifier in ("!!!", "☃"):
+            assert client.get(f"/api/restaurants/{identifier}").status_code == 404
+            assert admin_client.put(
+                f"/api/admin/restaurants/{identifier}", json={"rating": 1}
+            ).status_code == 404
+            assert admin_client.delete(f"/api/admin/restaurants/{identifier}").status_code == 404
+        untouched = restaurants_col.find_one({"slug": created["slug"]})
+        assert untouched.get("rating") != 1 and not untouched.get("is_deleted")
+    finally:
+        restaurants_col.delete_many({"category": "slug-test"})
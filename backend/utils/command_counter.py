@@ -0,0 +1,45 @@
+"""MongoDB command (round-trip) counter used by benchmarks and tests.
+
+The listener must be registered before ``db.py`` creates its MongoClient,
+so import this module before anything that imports ``db``.
+"""
+
+from collections import Counter
+
+from pymongo import monitoring
+
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts MongoDB commands (round trips) issued by this process."""
+
+    IGNORED = {"hello", "ismaster", "isMaster", "ping", "endSessions"}
+
+    def __init__(self):
+        self.commands = Counter()
+
+    def reset(self):
+        self.commands = Counter()
+
+    @property
+    def total(self):
+        return sum(self.commands.values())
+
+    @property
+    def writes(self):
+        return sum(n for name, n in self.commands.items() if name in WRITE_COMMANDS)
+
+    def started(self, event):
+        if event.command_name not in self.IGNORED:
+            self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+command_counter = CommandCounter()
+monitoring.register(command_counter)
@@ -0,0 +1,81 @@
+"""Time-sortable order ids.
+
+``ORD-`` + 10 Crockford base32 characters of millisecond UTC timestamp +
+6 characters (30 bits) of randomness, e.g. ``ORD-01K7Q3ZC4M8XGJ2PRD``.
+Ids sort lexically in creation order, so inserts land at the right edge
+of the unique ``order_id`` index and a time window is a plain range scan
+(``order_id_range``). Within one millisecond a process increments the
+random part, keeping its own ids strictly increasing.
+
+Legacy ids (``ORD-`` + 8 hex characters) do not follow this layout and
+are not covered by ``order_id_range``.
+"""
+
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+PREFIX = "ORD-"
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # ascending in ASCII
+TIME_CHARS = 10
+RANDOM_CHARS = 6
+RANDOM_BITS = RANDOM_CHARS * 5
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _encode(value, width):
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def _decode(text):
+    value = 0
+    for char in text:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+def _epoch_ms(dt):
+    if dt.tzinfo is None:  # the app stores naive UTC datetimes
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def new_order_id():
+    """Return a new order id, greater than any this process made before."""
+    global _last_ms, _last_random
+    now_ms = int(time.time() * 1000)
+    with _lock:
+        if now_ms > _last_ms:
+            _last_ms, _last_random = now_ms, secrets.randbits(RANDOM_BITS)
+        elif _last_random + 1 < 2**RANDOM_BITS:
+            _last_random += 1
+        else:  # random part exhausted within this millisecond
+            _last_ms, _last_random = _last_ms + 1, secrets.randbits(RANDOM_BITS - 1)
+        return PREFIX + _encode(_last_ms, TIME_CHARS) + _encode(_last_random, RANDOM_CHARS)
+
+
+def order_id_floor(dt):
+    """Smallest possible id for an order created at ``dt`` (naive = UTC)."""
+    return PREFIX + _encode(_epoch_ms(dt), TIME_CHARS)
+
+
+def order_id_range(start, end):
+    """Mongo condition on ``order_id`` for orders created in [start, end)."""
+    return {"$gte": order_id_floor(start), "$lt": order_id_floor(end)}
+
+
+def order_id_time(order_id):
+    """Creation time (naive UTC) encoded in an id, or None for legacy ids."""
+    body = order_id[len(PREFIX):] if order_id.startswith(PREFIX) else ""
+    if len(body) != TIME_CHARS + RANDOM_CHARS or any(c not in ALPHABET for c in body):
+        return None
+    ms = _decode(body[:TIME_CHARS])
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).replace(tzinfo=None)
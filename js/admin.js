@@ -228,7 +228,7 @@ async function loadOrders(page = 1, status = 'all', search = '') {
         <td><strong>${formatINR(o.total || 0)}</strong></td>
         <td>${o.payment_method || 'Card'}</td>
         <td>
-          <select class="status-select ${o.status}" onchange="updateOrderStatus('${o.order_id}', this)">
+          <select class="status-select ${o.status}" data-status="${o.status}" onchange="updateOrderStatus('${o.order_id}', this)">
             <option value="placed" ${o.status === 'placed' ? 'selected' : ''}>Placed</option>
             <option value="preparing" ${o.status === 'preparing' ? 'selected' : ''}>Preparing</option>
             <option value="out_for_delivery" ${o.status === 'out_for_delivery' ? 'selected' : ''}>Out for Delivery</option>
@@ -249,12 +249,14 @@ async function loadOrders(page = 1, status = 'all', search = '') {
 
 async function updateOrderStatus(orderId, select) {
     const status = select.value;
-    select.className = 'status-select ' + status;
+    const previous = select.dataset.status;
+    const showStatus = (s) => { select.value = s; select.dataset.status = s; select.className = 'status-select ' + s; };
     try {
-        const data = await apiFetch(`/api/admin/orders/${orderId}`, 'PUT', { status });
-        if (data.success) toast('Order status updated ✓', 'success');
-        else toast(data.message, 'error');
-    } catch (e) { toast('Update failed', 'error'); }
+        // expected_status makes the change conditional on what this row showed
+        const data = await apiFetch(`/api/admin/orders/${orderId}`, 'PUT', { status, expected_status: previous });
+        if (data.success) { showStatus(status); toast('Order status updated ✓', 'success'); }
+        else { showStatus(data.status || previous); toast(data.message, 'error'); }
+    } catch (e) { showStatus(previous); toast('Update failed', 'error'); }
 }
 
 function viewOrder(order) {
@@ -285,7 +287,7 @@ function viewOrder(order) {
   `;
     document.getElementById('view-order-save-btn').onclick = async () => {
         const ns = document.getElementById('view-order-status-select').value;
-        const res = await apiFetch(`/api/admin/orders/${order.order_id}`, 'PUT', { status: ns });
+        const res = await apiFetch(`/api/admin/orders/${order.order_id}`, 'PUT', { status: ns, expected_status: order.status });
         if (res.success) { toast('Status updated ✓', 'success'); closeModal('view-order-modal'); loadOrders(state.ordersPage); }
         else toast(res.message, 'error');
     };
@@ -19,13 +19,13 @@ function resolveApiBase() {
 const API = {
     BASE: resolveApiBase(),
 
-    async request(method, endpoint, data = null) {
+    async request(method, endpoint, data = null, headers = {}) {
         const options = {
             method,
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', ...headers },
             credentials: 'include',   // send session cookie
         };
-        if (data && (method === 'POST' || method === 'PUT')) {
+        if (data && (method === 'POST' || method === 'PUT' || method === 'PATCH')) {
             options.body = JSON.stringify(data);
         }
         try {
@@ -35,12 +35,13 @@ const API = {
             return json;
         } catch (err) {
             console.error('API Error:', err);
-            return { success: false, message: 'Network error. Please try again.' };
+            return { success: false, networkError: true, message: 'Network error. Please try again.' };
         }
     },
 
     get(endpoint) { return this.request('GET', endpoint); },
-    post(endpoint, data) { return this.request('POST', endpoint, data); },
+    post(endpoint, data, headers) { return this.request('POST', endpoint, data, headers); },
     put(endpoint, data) { return this.request('PUT', endpoint, data); },
+    patch(endpoint, data) { return this.request('PATCH', endpoint, data); },
     delete(endpoint) { return this.request('DELETE', endpoint); },
 };
@@ -6,14 +6,22 @@
 const _inrFmt = new Intl.NumberFormat('en-IN', { style: 'currency', currency: 'INR', maximumFractionDigits: 0 });
 function formatINR(amount) { return _inrFmt.format(Math.round(amount)); }
 
+const EMPTY_TOTALS = { subtotal: 0, delivery_fee: 0, tax: 0, item_count: 0 };
+
 const Cart = {
     _items: [],   // local cache for synchronous access
+    _totals: EMPTY_TOTALS,   // server-maintained subtotal / fee / tax / count
+
+    _setFromResult(result) {
+        this._items = result.items || [];
+        this._totals = result.totals || EMPTY_TOTALS;
+    },
 
     // ── Sync from server ──
     async syncFromServer() {
         const result = await API.get('/cart');
         if (result.success) {
-            this._items = result.items || [];
+            this._setFromResult(result);
         }
         this.updateCartBadge();
         return this._items;
@@ -28,7 +36,7 @@ const Cart = {
     async addToCart(item) {
         const result = await API.post('/cart/add', item);
         if (result.success) {
-            this._items = result.items || [];
+            this._setFromResult(result);
             this.updateCartBadge();
             window.dispatchEvent(new Event('cartUpdated'));
             showToast(result.message || `${item.name} added to cart!`, 'success');
@@ -62,7 +70,7 @@ const Cart = {
     async removeFromCart(id) {
         const result = await API.delete('/cart/remove/' + id);
         if (result.success) {
-            this._items = result.items || [];
+            this._setFromResult(result);
             this.updateCartBadge();
             window.dispatchEvent(new Event('cartUpdated'));
         }
@@ -73,7 +81,19 @@ const Cart = {
     async updateQuantity(id, qty) {
         const result = await API.put('/cart/update', { id, quantity: qty });
         if (result.success) {
-            this._items = result.items || [];
+            this._setFromResult(result);
+            this.updateCartBadge();
+            window.dispatchEvent(new Event('cartUpdated'));
+        }
+        return result;
+    },
+
+    // ── Batch edits (one request, one server write) ──
+    // ops: [{ op: 'add', id, quantity }, { op: 'set', id, quantity }, { op: 'remove', id }]
+    async applyOps(ops) {
+        const result = await API.patch('/cart', { ops });
+        if (result.success) {
+            this._setFromResult(result);
             this.updateCartBadge();
             window.dispatchEvent(new Event('cartUpdated'));
         }
@@ -84,29 +104,28 @@ const Cart = {
     async clearCart() {
         const result = await API.delete('/cart/clear');
         if (result.success) {
-            this._items = [];
+            this._setFromResult({});
             this.updateCartBadge();
             window.dispatchEvent(new Event('cartUpdated'));
         }
         return result;
     },
 
-    // ── Computed values (use cached items) ──
+    // ── Totals (maintained by the server on every cart write) ──
     getItemCount() {
-        return this._items.reduce((sum, i) => sum + i.quantity, 0);
+        return this._totals.item_count;
     },
 
     getSubtotal() {
-        return this._items.reduce((sum, i) => sum + (i.price * i.quantity), 0);
+        return this._totals.subtotal;
     },
 
     getDeliveryFee() {
-        const subtotal = this.getSubtotal();
-        return subtotal > 0 ? (subtotal > 499 ? 0 : 49) : 0;
+        return this._totals.delivery_fee;
     },
 
     getTax() {
-        return Math.round(this.getSubtotal() * 0.05);
+        return this._totals.tax;
     },
 
     getTotal(discount = 0) {